@@ -1,41 +1,84 @@
+DROP TABLE IF EXISTS event_locations;
+DROP TABLE IF EXISTS event_sources;
 DROP TABLE IF EXISTS event_actors;
 DROP TABLE IF EXISTS actor_aliases;
 DROP TABLE IF EXISTS actors;
+DROP TABLE IF EXISTS locations;
 DROP TABLE IF EXISTS events;
 DROP TABLE IF EXISTS sources;
 
+-- updated_at is the start time of the transaction that last wrote a row;
+-- the graph store syncs the rows written since its previous sync by it
 CREATE TABLE actors (
     id SERIAL PRIMARY KEY,
-    label TEXT NOT NULL
+    label TEXT NOT NULL UNIQUE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
 CREATE TABLE actor_aliases (
     id SERIAL PRIMARY KEY,
     actor_id INTEGER NOT NULL REFERENCES actors(id) ON DELETE CASCADE,
-    alias TEXT NOT NULL
+    alias TEXT NOT NULL UNIQUE
 );
 
+CREATE INDEX actor_aliases_actor_id_idx ON actor_aliases (actor_id);
+
 CREATE TABLE sources (
     id SERIAL PRIMARY KEY,
     title TEXT NOT NULL,
-    url TEXT NOT NULL,
-    published_date DATE NOT NULL
+    url TEXT NOT NULL UNIQUE,
+    published_date DATE NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
+CREATE INDEX sources_published_date_idx ON sources (published_date);
+
+-- Events are identified across loads by their narrative date and a hash of
+-- their label and details; the date leads so the key also serves date lookups
 CREATE TABLE events (
     id SERIAL PRIMARY KEY,
     label TEXT NOT NULL,
-    details TEXT
+    details TEXT,
+    event_date DATE NOT NULL,
+    event_time TIME,
+    content_hash TEXT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    UNIQUE (event_date, content_hash)
 );
 
+CREATE TABLE locations (
+    id SERIAL PRIMARY KEY,
+    label TEXT NOT NULL UNIQUE
+);
+
+-- Each link table is unique on (event, other) and indexed the other way
+-- round, for lookups from either side
 CREATE TABLE event_actors (
     id SERIAL PRIMARY KEY,
     event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
-    actor_id INTEGER NOT NULL REFERENCES actors(id) ON DELETE CASCADE
+    actor_id INTEGER NOT NULL REFERENCES actors(id) ON DELETE CASCADE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    UNIQUE (event_id, actor_id)
 );
 
+CREATE INDEX event_actors_actor_id_idx ON event_actors (actor_id, event_id);
+
 CREATE TABLE event_sources (
   id SERIAL PRIMARY KEY,
   event_id INT REFERENCES events(id) ON DELETE CASCADE,
-  source_id INT REFERENCES sources(id) ON DELETE CASCADE
+  source_id INT REFERENCES sources(id) ON DELETE CASCADE,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  UNIQUE (event_id, source_id)
 );
+
+CREATE INDEX event_sources_source_id_idx ON event_sources (source_id, event_id);
+
+CREATE TABLE event_locations (
+    id SERIAL PRIMARY KEY,
+    event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    location_id INTEGER NOT NULL REFERENCES locations(id) ON DELETE CASCADE,
+    UNIQUE (event_id, location_id)
+);
+
+CREATE INDEX event_locations_location_id_idx
+    ON event_locations (location_id, event_id);
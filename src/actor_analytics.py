@@ -0,0 +1,301 @@
+import hashlib
+import os
+import sys
+
+import networkx as nx
+import numpy as np
+from dotenv import load_dotenv
+
+from src.compact_graph import CompactGraph
+from src.extract_gexf import GEXF_DATE_FROM
+from src.graph_store import GraphStore
+from src.jsonl_io import write_records
+
+ANALYTICS_PATH = 'src/actor_analytics.jsonl'
+COOCCURRENCE_GEXF_PATH = 'src/actor_cooccurrence.gexf'
+ANALYTICS_CACHE_DIR = 'src/data/temp_data/analytics_cache'
+# Length of the time windows; windows start at multiples of it counted
+# from 1970-01-01, so they stay put as new dates are loaded
+ANALYTICS_WINDOW_DAYS = int(os.getenv('ANALYTICS_WINDOW_DAYS', '30'))
+PAGERANK_DAMPING = 0.85
+# Bumped when the cached results change meaning
+ANALYTICS_VERSION = 1
+
+
+def pagerank(n, a, b, w, damping=PAGERANK_DAMPING, tol=1e-6, max_iter=100):
+    """
+    PageRank of the undirected graph of n nodes with edges (a, b) of
+    weight w, as networkx.pagerank computes it. Each power iteration is
+    one sparse matrix-vector product over the edge list (np.bincount).
+    """
+    if n == 0:
+        return np.zeros(0)
+    sources = np.concatenate([a, b])
+    targets = np.concatenate([b, a])
+    weights = np.concatenate([w, w]).astype(np.float64)
+    strength = np.bincount(sources, weights, n)
+    share = weights / strength[sources] if len(sources) else weights
+    # Nodes without edges spread their rank over all nodes
+    dangling = strength == 0
+    rank = np.full(n, 1 / n)
+    for _ in range(max_iter):
+        spread = np.bincount(targets, rank[sources] * share, n)
+        new = damping * (spread + rank[dangling].sum() / n) + (1 - damping) / n
+        converged = np.abs(new - rank).sum() < n * tol
+        rank = new
+        if converged:
+            break
+    return rank
+
+
+def label_propagation(n, a, b, w, max_iter=100, seed=0):
+    """
+    Communities of the undirected graph of n nodes with edges (a, b) of
+    weight w, numbered from 0. Each node takes the label carrying the
+    most edge weight among its neighbours. All nodes are scored at once
+    per iteration; a random half of the undecided ones moves, which keeps
+    the updates from oscillating.
+    """
+    labels = np.arange(n, dtype=np.int64)
+    sources = np.concatenate([a, b])
+    targets = np.concatenate([b, a])
+    weights = np.concatenate([w, w]).astype(np.float64)
+    rng = np.random.default_rng(seed)
+    for _ in range(max_iter):
+        if not len(sources):
+            break
+        keys, inverse = np.unique(
+            sources * n + labels[targets], return_inverse=True
+        )
+        totals = np.bincount(inverse, weights)
+        node, label = keys // n, keys % n
+        # Per node, the heaviest label, the smallest one on ties
+        order = np.lexsort((label, -totals, node))
+        first = order[np.r_[True, np.diff(node[order]) != 0]]
+        best = labels.copy()
+        best[node[first]] = label[first]
+        best_total = np.zeros(n)
+        best_total[node[first]] = totals[first]
+        own = label == labels[node]
+        own_total = np.zeros(n)
+        own_total[node[own]] = totals[own]
+        undecided = own_total < best_total
+        if not undecided.any():
+            break
+        move = undecided & (rng.random(n) < 0.5)
+        labels[move] = best[move]
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def modularity(community, a, b, w, strength):
+    """Modularity of a partition of the weighted undirected graph."""
+    m = w.sum()
+    if not m:
+        return 0.0
+    inside = w[community[a] == community[b]].sum()
+    totals = np.bincount(community, strength)
+    return float(inside / m - ((totals / (2 * m)) ** 2).sum())
+
+
+def window_analytics(graph, events):
+    """
+    Actor analytics of the events (node numbers) of a CompactGraph.
+
+    With B the event x actor incidence matrix of the events, the
+    co-occurrence weights are the off-diagonal entries of B^T B (shared
+    events per actor pair) and the event counts its diagonal. Returns a
+    dict of arrays: per actor its row id, event count, degree (distinct
+    co-actors), strength (weighted degree), PageRank and community; per
+    co-occurring pair the row ids and weight; and the window's event and
+    modularity totals.
+    """
+    _, linked = graph.event_actors(events)
+    actors, local = np.unique(linked, return_inverse=True)
+    n = len(actors)
+    a, b, w = graph.cooccurrence(events)
+    a = np.searchsorted(actors, a)
+    b = np.searchsorted(actors, b)
+    strength = np.bincount(a, w, n) + np.bincount(b, w, n)
+    community = label_propagation(n, a, b, w)
+    return {
+        'actor_ids': graph.db_ids[actors],
+        'event_count': np.bincount(local, minlength=n),
+        'degree': np.bincount(a, minlength=n) + np.bincount(b, minlength=n),
+        'strength': strength,
+        'pagerank': pagerank(n, a, b, w),
+        'community': community,
+        'pair_a': graph.db_ids[actors[a]],
+        'pair_b': graph.db_ids[actors[b]],
+        'pair_weight': w,
+        'events': np.int64(len(events)),
+        'modularity': np.float64(modularity(community, a, b, w, strength)),
+    }
+
+
+def fingerprint(graph, events):
+    """Hash of the events' ids and actor links, keying the cache."""
+    event_of, actor = graph.event_actors(events)
+    digest = hashlib.sha256(f'v{ANALYTICS_VERSION}'.encode())
+    for ids in (graph.db_ids[events], graph.db_ids[event_of]):
+        digest.update(ids.astype(np.int64).tobytes())
+    digest.update(graph.db_ids[actor].astype(np.int64).tobytes())
+    return digest.hexdigest()
+
+
+class AnalyticsCache:
+    """
+    window_analytics results on disk, one .npz file per window. A result
+    is reused while the window's events and actor links are unchanged,
+    so a re-run only recomputes the windows that received new data.
+    """
+
+    def __init__(self, directory=ANALYTICS_CACHE_DIR):
+        self.directory = directory
+        self.hits = self.misses = 0
+
+    def get(self, name, graph, events):
+        key = fingerprint(graph, events)
+        path = os.path.join(self.directory, f'{name}.npz')
+        if os.path.exists(path):
+            with np.load(path) as arrays:
+                if str(arrays['fingerprint']) == key:
+                    self.hits += 1
+                    return {
+                        k: arrays[k]
+                        for k in arrays.files
+                        if k != 'fingerprint'
+                    }
+        self.misses += 1
+        result = window_analytics(graph, events)
+        os.makedirs(self.directory, exist_ok=True)
+        # Swapped in like the graph store snapshot
+        tmp_path = f'{path}.tmp.npz'
+        np.savez(tmp_path, fingerprint=np.str_(key), **result)
+        os.replace(tmp_path, path)
+        return result
+
+
+def windows(graph, days=ANALYTICS_WINDOW_DAYS):
+    """
+    (start, end, events) of each time window holding events, with end
+    exclusive and events the window's event nodes.
+    """
+    dates = graph.event_dates.astype('datetime64[D]')
+    known = ~np.isnat(dates)
+    nodes = graph.kind_start[1] + np.flatnonzero(known)
+    starts = dates[known].astype(np.int64) // days * days
+    order = np.argsort(starts, kind='stable')
+    starts, nodes = starts[order], nodes[order]
+    boundaries = np.flatnonzero(np.diff(starts)) + 1
+    for group in np.split(np.arange(len(starts)), boundaries):
+        if len(group):
+            start = np.datetime64(int(starts[group[0]]), 'D')
+            yield start, start + np.timedelta64(days, 'D'), nodes[group]
+
+
+def window_record(graph, start, end, result):
+    """JSON record of a window, its actors ranked by PageRank."""
+    labels = graph.labels
+    nodes = graph.nodes('actor', result['actor_ids'])
+    return {
+        'window_start': str(start),
+        'window_end': str(end),
+        'events': int(result['events']),
+        'actor_count': len(nodes),
+        'pairs': len(result['pair_weight']),
+        'communities': int(result['community'].max(initial=-1)) + 1,
+        'modularity': round(float(result['modularity']), 6),
+        'actors': [
+            {
+                'id': int(result['actor_ids'][i]),
+                'label': labels[nodes[i]],
+                'events': int(result['event_count'][i]),
+                'degree': int(result['degree'][i]),
+                'strength': int(result['strength'][i]),
+                'pagerank': round(float(result['pagerank'][i]), 8),
+                'community': int(result['community'][i]),
+            }
+            for i in np.argsort(-result['pagerank'], kind='stable')
+        ],
+    }
+
+
+def write_cooccurrence_gexf(graph, result, output_path):
+    """
+    Actor co-occurrence graph with per-actor metrics as node attributes
+    and shared events as edge weights. Actor node ids match the
+    knowledge-graph GEXF.
+    """
+    G = nx.Graph()
+    nodes = graph.nodes('actor', result['actor_ids'])
+    for i, node in enumerate(nodes.tolist()):
+        G.add_node(
+            graph.key(node),
+            label=graph.labels[node],
+            events=int(result['event_count'][i]),
+            degree=int(result['degree'][i]),
+            strength=int(result['strength'][i]),
+            pagerank=float(result['pagerank'][i]),
+            community=int(result['community'][i]),
+        )
+    G.add_weighted_edges_from(
+        (f'actor_{a}', f'actor_{b}', int(w))
+        for a, b, w in zip(
+            result['pair_a'].tolist(),
+            result['pair_b'].tolist(),
+            result['pair_weight'].tolist(),
+        )
+    )
+    nx.write_gexf(G, output_path)
+
+
+def export_analytics(
+    store,
+    date_from,
+    window_days=ANALYTICS_WINDOW_DAYS,
+    output_path=ANALYTICS_PATH,
+    gexf_path=COOCCURRENCE_GEXF_PATH,
+    cache=None,
+):
+    """
+    Compute the actor analytics of a GraphStore snapshot's events from
+    date_from on: one JSONL record per time window of window_days, and
+    the co-occurrence graph of the whole period as GEXF. Returns the
+    number of windows.
+    """
+    cache = cache or AnalyticsCache()
+    graph = CompactGraph.from_store(store, date_from)
+    records = (
+        window_record(
+            graph,
+            start,
+            end,
+            cache.get(f'{start}_{window_days}d', graph, nodes),
+        )
+        for start, end, nodes in windows(graph, window_days)
+    )
+    count = write_records(output_path, records)
+    events = np.arange(graph.kind_start[1], graph.kind_start[2])
+    whole = cache.get(f'from_{date_from}', graph, events)
+    write_cooccurrence_gexf(graph, whole, gexf_path)
+    print(
+        f'Actor analytics: {count} windows of {window_days} days to '
+        f'{output_path}, co-occurrence graph to {gexf_path} '
+        f'({cache.hits} cached, {cache.misses} computed)'
+    )
+    return count
+
+
+def main(window_days=ANALYTICS_WINDOW_DAYS):
+    load_dotenv()
+    store = GraphStore()
+    store.sync()
+    export_analytics(store, GEXF_DATE_FROM, window_days)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--window' in args:
+        main(window_days=int(args[args.index('--window') + 1]))
+    else:
+        main()
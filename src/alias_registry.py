@@ -0,0 +1,203 @@
+import sqlite3
+import threading
+from collections import defaultdict
+
+from src.name_dedup import name_keys
+
+# Default location of the persistent alias registry
+ALIAS_REGISTRY_PATH = 'src/data/temp_data/alias_registry.sqlite'
+
+# Names looked up per query
+_LOOKUP_BATCH = 500
+
+
+class AliasRegistry:
+    """
+    Persistent alias -> canonical name store for actors and locations.
+
+    kind separates the name spaces ('actor', 'location'). Every canonical
+    name is also registered as an alias of itself, so a later mention of
+    it is recognized without asking the LLM again. Canonical names are
+    indexed by their name_keys, so candidates() finds the ones a new name
+    could match without reading every canonical name.
+    """
+
+    def __init__(self, path=ALIAS_REGISTRY_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS aliases (
+                    kind TEXT NOT NULL,
+                    alias TEXT NOT NULL,
+                    canonical TEXT NOT NULL,
+                    PRIMARY KEY (kind, alias)
+                )
+                """
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS aliases_canonical '
+                'ON aliases (kind, canonical)'
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS canonical_keys (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    canonical TEXT NOT NULL,
+                    PRIMARY KEY (kind, key, canonical)
+                )
+                """
+            )
+            # Kinds whose canonical names are all in canonical_keys
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS indexed_kinds '
+                '(kind TEXT PRIMARY KEY)'
+            )
+
+    def lookup(self, kind, names):
+        """{name: canonical} for the names already registered."""
+        names = list(names)
+        found = {}
+        with self._lock:
+            for start in range(0, len(names), _LOOKUP_BATCH):
+                batch = names[start : start + _LOOKUP_BATCH]
+                placeholders = ', '.join('?' * len(batch))
+                found.update(
+                    self._conn.execute(
+                        'SELECT alias, canonical FROM aliases '
+                        f'WHERE kind = ? AND alias IN ({placeholders})',
+                        [kind, *batch],
+                    )
+                )
+        return found
+
+    def canonicals(self, kind):
+        with self._lock:
+            return {
+                row[0]
+                for row in self._conn.execute(
+                    'SELECT DISTINCT canonical FROM aliases WHERE kind = ?',
+                    (kind,),
+                )
+            }
+
+    def add(self, kind, resolved):
+        """
+        Register {alias: canonical} pairs. Known aliases are kept. A
+        canonical name that is already an alias, in the registry or in
+        resolved, is followed to its own canonical name, so every alias
+        points at a final one.
+        """
+        known = self.lookup(kind, set(resolved.values()))
+
+        def final(name):
+            seen = set()
+            while name not in seen:
+                seen.add(name)
+                if name in known:
+                    return known[name]
+                target = resolved.get(name, name)
+                if target == name:
+                    return name
+                name = target
+            # Names resolved to each other in a cycle share its first one
+            return min(seen)
+
+        resolved = {
+            alias: final(canonical) for alias, canonical in resolved.items()
+        }
+        canonicals = set(resolved.values())
+        rows = [
+            (kind, alias, canonical) for alias, canonical in resolved.items()
+        ]
+        rows += [(kind, canonical, canonical) for canonical in canonicals]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO aliases (kind, alias, canonical) '
+                'VALUES (?, ?, ?)',
+                rows,
+            )
+            self._index(kind, canonicals)
+
+    def _index(self, kind, canonicals):
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO canonical_keys (kind, key, canonical) '
+            'VALUES (?, ?, ?)',
+            [
+                (kind, key, canonical)
+                for canonical in canonicals
+                for key in name_keys(canonical)
+            ],
+        )
+
+    def candidates(self, kind, names):
+        """
+        Canonical names sharing a name key with any of names: those
+        dedupe_names or an LLM bucket could match them with.
+        """
+        with self._lock, self._conn:
+            if not self._conn.execute(
+                'SELECT 1 FROM indexed_kinds WHERE kind = ?', (kind,)
+            ).fetchone():
+                # Registries from before the index: index them once
+                self._index(
+                    kind,
+                    [
+                        row[0]
+                        for row in self._conn.execute(
+                            'SELECT DISTINCT canonical FROM aliases '
+                            'WHERE kind = ?',
+                            (kind,),
+                        )
+                    ],
+                )
+                self._conn.execute(
+                    'INSERT INTO indexed_kinds (kind) VALUES (?)', (kind,)
+                )
+            keys = list({key for name in names for key in name_keys(name)})
+            found = set()
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[start : start + _LOOKUP_BATCH]
+                placeholders = ', '.join('?' * len(batch))
+                found.update(
+                    row[0]
+                    for row in self._conn.execute(
+                        'SELECT DISTINCT canonical FROM canonical_keys '
+                        f'WHERE kind = ? AND key IN ({placeholders})',
+                        [kind, *batch],
+                    )
+                )
+        return found
+
+    def add_mapping(self, kind, mapping):
+        """Register a {canonical: [aliases]} mapping, e.g. actors.json."""
+        resolved = {}
+        for canonical, aliases in mapping.items():
+            if isinstance(aliases, str):
+                aliases = [aliases]
+            for alias in aliases:
+                resolved.setdefault(alias, canonical)
+        self.add(kind, resolved)
+
+    def mapping(self, kind):
+        """The registry as a {canonical: [aliases]} mapping."""
+        mapping = defaultdict(list)
+        with self._lock:
+            for alias, canonical in self._conn.execute(
+                'SELECT alias, canonical FROM aliases WHERE kind = ? '
+                'ORDER BY canonical, alias',
+                (kind,),
+            ):
+                mapping[canonical].append(alias)
+        return dict(mapping)
+
+    def count(self, kind):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM aliases WHERE kind = ?', (kind,)
+            ).fetchone()[0]
+
+    def close(self):
+        self._conn.close()
@@ -1,11 +1,25 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from contextlib import asynccontextmanager
+from datetime import date
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query
 from pydantic import BaseModel
 from uuid import uuid4
 import json
 from pathlib import Path
 import asyncio
 
-app = FastAPI()
+from src.db import AsyncDatabase
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # The pool connects in the background, so the app starts without a DB
+    app.state.db = AsyncDatabase()
+    await app.state.db.open()
+    yield
+    await app.state.db.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 TASK_FILE = Path(__file__).parent / 'tasks.json'
 
@@ -83,3 +97,51 @@ async def get_result(task_id: str):
 @app.get('/')
 def hello_world():
     return {'message': 'Hello, World!'}
+
+
+@app.get('/health')
+async def health():
+    ok, latency_ms = await app.state.db.health_check()
+    return {
+        'database': 'ok' if ok else 'unavailable',
+        'latency_ms': latency_ms,
+        'pool': app.state.db.metrics(),
+    }
+
+
+@app.get('/events')
+async def events(
+    date_from: date, date_to: date, limit: int = Query(100, ge=1, le=1000)
+):
+    """Events dated date_from to date_to, with their actors."""
+    async with app.state.db.connection() as conn:
+        cur = await conn.execute(
+            """
+            SELECT e.id, e.event_date, e.event_time, e.label, e.details,
+                coalesce(
+                    array_agg(a.label ORDER BY a.label)
+                        FILTER (WHERE a.id IS NOT NULL),
+                    '{}'
+                )
+            FROM events e
+            LEFT JOIN event_actors ea ON ea.event_id = e.id
+            LEFT JOIN actors a ON a.id = ea.actor_id
+            WHERE e.event_date BETWEEN %s AND %s
+            GROUP BY e.id
+            ORDER BY e.event_date, e.event_time, e.id
+            LIMIT %s
+            """,
+            (date_from, date_to, limit),
+        )
+        rows = await cur.fetchall()
+    return [
+        {
+            'id': id,
+            'date': event_date,
+            'time': event_time,
+            'event': label,
+            'details': details,
+            'actors': actors,
+        }
+        for id, event_date, event_time, label, details, actors in rows
+    ]
@@ -0,0 +1,50 @@
+"""
+Time the actor analytics of a synthetic graph spanning five years: every
+30-day window and the whole period with an empty cache, then again with
+every window cached.
+
+Run from the project root:
+    uv run -m src.benchmarks.bench_actor_analytics
+"""
+
+import tempfile
+import time
+
+import numpy as np
+
+from src.actor_analytics import AnalyticsCache, windows
+from src.benchmarks.bench_compact_graph import synthetic_graph
+
+EVENTS = 1_000_000
+WINDOW_DAYS = 30
+
+
+def run(graph, cache):
+    start = time.perf_counter()
+    count = 0
+    for window_start, _, nodes in windows(graph, WINDOW_DAYS):
+        cache.get(f'{window_start}_{WINDOW_DAYS}d', graph, nodes)
+        count += 1
+    events = np.arange(graph.kind_start[1], graph.kind_start[2])
+    result = cache.get('all', graph, events)
+    return count, result, time.perf_counter() - start
+
+
+def main():
+    rng = np.random.default_rng(0)
+    graph = synthetic_graph(rng, EVENTS)
+    print(f'{graph.num_nodes} nodes, {graph.num_edges} edges')
+    with tempfile.TemporaryDirectory() as directory:
+        count, result, cold = run(graph, AnalyticsCache(directory))
+        print(
+            f'{count} windows and the whole period: {cold:.2f} s, '
+            f'{len(result["pair_weight"])} actor pairs, '
+            f'{int(result["community"].max()) + 1} communities, '
+            f'modularity {float(result["modularity"]):.3f}'
+        )
+        _, _, warm = run(graph, AnalyticsCache(directory))
+        print(f'again, all cached: {warm:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
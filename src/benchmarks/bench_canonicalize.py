@@ -0,0 +1,105 @@
+"""
+Compare per-mention canonicalization by linear scan of the alias mapping
+with the precomputed alias index, on a synthetic mapping of 100k aliases.
+
+Run from the project root:
+    uv run -m src.benchmarks.bench_canonicalize
+"""
+
+import random
+import time
+
+from src.step3_clean_extracted_events import (
+    build_alias_index,
+    canonicalize_articles,
+)
+
+CANONICAL_NAMES = 25_000
+ALIASES_PER_NAME = 4
+ARTICLES = 2_000
+EVENTS_PER_ARTICLE = 5
+ACTORS_PER_EVENT = 4
+# The linear scan is too slow to run over every mention
+LINEAR_SAMPLE = 500
+
+
+def linear_scan(name, mapping):
+    """The per-mention lookup step 3 did before the alias index."""
+    for canonical, variants in mapping.items():
+        if name in variants:
+            return canonical
+    return name
+
+
+def synthetic_mapping():
+    return {
+        f'actor {i}': [f'actor {i} alias {j}' for j in range(ALIASES_PER_NAME)]
+        for i in range(CANONICAL_NAMES)
+    }
+
+
+def synthetic_articles(rng):
+    def mention():
+        # One mention in five is a name missing from the mapping
+        if rng.random() < 0.2:
+            return f'unknown {rng.randrange(10**6)}'
+        i = rng.randrange(CANONICAL_NAMES)
+        return f'actor {i} alias {rng.randrange(ALIASES_PER_NAME)}'
+
+    return [
+        {
+            'entities': [
+                {
+                    'actors': [mention() for _ in range(ACTORS_PER_EVENT)],
+                    'location': [mention()],
+                }
+                for _ in range(EVENTS_PER_ARTICLE)
+            ]
+        }
+        for _ in range(ARTICLES)
+    ]
+
+
+def main():
+    rng = random.Random(0)
+    mapping = synthetic_mapping()
+    articles = synthetic_articles(rng)
+    mentions = [
+        actor
+        for article in articles
+        for entity in article['entities']
+        for actor in entity['actors'] + entity['location']
+    ]
+    aliases = CANONICAL_NAMES * ALIASES_PER_NAME
+    print(f'{aliases} aliases, {len(mentions)} mentions')
+
+    sample = rng.sample(mentions, LINEAR_SAMPLE)
+    start = time.perf_counter()
+    for name in sample:
+        linear_scan(name, mapping)
+    linear = (time.perf_counter() - start) / LINEAR_SAMPLE
+
+    start = time.perf_counter()
+    index = build_alias_index(mapping)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for name in mentions:
+        index.get(name, name)
+    indexed = (time.perf_counter() - start) / len(mentions)
+
+    start = time.perf_counter()
+    canonicalize_articles(articles, mapping, mapping)
+    whole = time.perf_counter() - start
+
+    print(f'linear scan:   {linear * 1e6:12.1f} us/mention')
+    print(f'alias index:   {indexed * 1e6:12.3f} us/mention')
+    print(f'index build:   {build * 1000:12.1f} ms')
+    print(
+        f'canonicalize_articles, all {len(mentions)} mentions: '
+        f'{whole:.2f} s (linear scan estimate: '
+        f'{linear * len(mentions):.0f} s)'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Build a synthetic actor -> event -> source graph of a few million edges
+as a CompactGraph and time degree, k-hop neighborhood and actor
+co-occurrence queries on it. The same graph is also built as a NetworkX
+DiGraph on a smaller sample to compare memory and query time.
+
+Run from the project root:
+    uv run -m src.benchmarks.bench_compact_graph
+"""
+
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+
+from src.compact_graph import CompactGraph
+from src.graph_store import StringTable
+
+EVENTS = 1_000_000
+ACTORS = 100_000
+SOURCES = 200_000
+ACTORS_PER_EVENT = 3
+SOURCES_PER_EVENT = 2
+# NetworkX holds a fraction of the graph in the same memory
+NETWORKX_FRACTION = 20
+QUERY_NODES = 100
+
+
+def synthetic_graph(rng, events):
+    """Events linked to Zipf-distributed actors and uniform sources."""
+    actors = min(ACTORS, events)
+    sources = min(SOURCES, events)
+    event_ids = np.arange(1, events + 1, dtype=np.int64)
+    actor_of = np.minimum(
+        rng.zipf(1.5, events * ACTORS_PER_EVENT), actors
+    ).astype(np.int64)
+    # Several links from one event to the same actor collapse into one
+    links = np.unique(
+        np.stack([np.repeat(event_ids, ACTORS_PER_EVENT), actor_of]), axis=1
+    )
+    source_of = rng.integers(1, sources + 1, events * SOURCES_PER_EVENT)
+    source_links = np.unique(
+        np.stack([np.repeat(event_ids, SOURCES_PER_EVENT), source_of]), axis=1
+    )
+
+    def labels(prefix, n):
+        return StringTable.from_strings(f'{prefix} {i}' for i in range(n))
+
+    return CompactGraph(
+        np.arange(1, actors + 1, dtype=np.int64),
+        labels('actor', actors),
+        event_ids,
+        labels('event', events),
+        labels('details', events),
+        np.datetime64('2020-01-01')
+        + rng.integers(0, 5 * 365, events).astype('timedelta64[D]'),
+        np.arange(1, sources + 1, dtype=np.int64),
+        labels('source', sources),
+        labels('https://example.com/', sources),
+        np.full(sources, np.datetime64('2020-01-01', 'D')),
+        (links[1], links[0]),
+        (source_links[0], source_links[1]),
+    )
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f'{label:<34} {time.perf_counter() - start:8.3f} s')
+    return result
+
+
+def graph_bytes(graph):
+    arrays = [
+        graph.db_ids,
+        graph.out_indptr,
+        graph.out_indices,
+        graph.in_indptr,
+        graph.in_indices,
+        graph.event_dates,
+        graph.source_dates,
+    ]
+    tables = [graph.labels, graph.event_details, graph.source_urls]
+    return sum(a.nbytes for a in arrays) + sum(
+        t.offsets.nbytes + len(t.blob) for t in tables
+    )
+
+
+def main():
+    rng = np.random.default_rng(0)
+    graph = timed('build CompactGraph', lambda: synthetic_graph(rng, EVENTS))
+    print(
+        f'{graph.num_nodes} nodes, {graph.num_edges} edges, '
+        f'{graph_bytes(graph) / 2**20:.0f} MiB'
+    )
+    timed('degree', lambda: graph.degree())
+    seeds = rng.integers(graph.kind_start[0], graph.kind_start[1], QUERY_NODES)
+    for hops in (1, 2):
+        found = timed(
+            f'{hops}-hop of {QUERY_NODES} actors',
+            lambda hops=hops: graph.neighborhood(seeds, hops),
+        )
+        print(f'  {len(found)} nodes')
+    a, _, weights = timed('actor co-occurrence', graph.cooccurrence)
+    print(f'  {len(a)} actor pairs, {weights.sum()} shared events')
+
+    small = synthetic_graph(rng, EVENTS // NETWORKX_FRACTION)
+    tracemalloc.start()
+    G = timed(
+        f'to_networkx (1/{NETWORKX_FRACTION} of the events)',
+        small.to_networkx,
+    )
+    networkx_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(
+        f'  NetworkX: {networkx_bytes / small.num_edges:.0f} bytes/edge, '
+        f'CompactGraph: {graph_bytes(small) / small.num_edges:.0f} bytes/edge'
+    )
+    actor = small.key(int(seeds[0]) % small.kind_start[1])
+    timed('NetworkX degree', lambda: dict(G.degree()))
+    timed(
+        'NetworkX 2-hop of one actor',
+        lambda: nx.single_source_shortest_path_length(
+            G.to_undirected(as_view=True), actor, cutoff=2
+        ),
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+Microbenchmark of the precompiled single-pass Nepali date/weekday rewriter
+against the previous multi-pass implementation, kept here as a reference.
+
+Run from the project root:
+    uv run -m src.benchmarks.bench_date_rewriter
+"""
+
+import contextlib
+import io
+import json
+import os
+import timeit
+
+import nepali_datetime
+from src.step1_scrape_and_preprocess_articles import (
+    parse_nepali_date,
+    replace_dates_and_days_in_text,
+)
+
+CORPUS_PATH = os.path.join(
+    os.path.dirname(__file__),
+    '..',
+    'tests',
+    'fixtures',
+    'date_rewrite_corpus.json',
+)
+REPEATS = 5
+
+
+def legacy_parse_nepali_date(date_str):
+    """
+    Parse a Nepali date string and return (nepali_datetime.date, gregorian_date, day_name) or (None, None, None) if parsing fails.
+    """
+    nepali_months = {
+        'बैशाख': 1,
+        'जेठ': 2,
+        'असार': 3,
+        'साउन': 4,
+        'भदौ': 5,
+        'आश्विन': 6,
+        'कार्तिक': 7,
+        'मंसिर': 8,
+        'पुष': 9,
+        'माघ': 10,
+        'फागुन': 11,
+        'चैत्र': 12,
+        'Baisakh': 1,
+        'Jestha': 2,
+        'Ashar': 3,
+        'Shrawan': 4,
+        'Bhadra': 5,
+        'Ashwin': 6,
+        'Kartik': 7,
+        'Mangsir': 8,
+        'Poush': 9,
+        'Magh': 10,
+        'Falgun': 11,
+        'Chaitra': 12,
+    }
+    import re
+
+    date_part = date_str.split('गते')[0].strip()
+    date_part = re.sub(r'[\d१२३४५६७८९०]{1,2}:\d{2}', '', date_part).strip()
+    nepali_date_pattern = re.compile(
+        r'([१२३४५६७८९०\d]{4})\s*([\w\u0900-\u097F]+)\s*([१२३४५६७८९०\d]{1,2})'
+    )
+    m = nepali_date_pattern.search(date_part)
+    if m:
+
+        def dev_to_ascii(s):
+            dev_map = str.maketrans('०१२३४५६७८९', '0123456789')
+            return s.translate(dev_map)
+
+        year = int(dev_to_ascii(m.group(1)))
+        month_raw = m.group(2).strip()
+        day = int(dev_to_ascii(m.group(3)))
+        month = nepali_months.get(month_raw, None)
+        if month:
+            try:
+                ndt = nepali_datetime.date(year, month, day)
+                gdt = ndt.to_datetime_date()
+                nepali_days = [
+                    'Sunday',
+                    'Monday',
+                    'Tuesday',
+                    'Wednesday',
+                    'Thursday',
+                    'Friday',
+                    'Saturday',
+                ]
+                day_name = nepali_days[ndt.weekday()]
+                return ndt, gdt, day_name
+            except Exception as e:
+                print(f'[DEBUG] Exception in nepali_datetime.date: {e}')
+    return None, None, None
+
+
+def legacy_replace_dates_and_days_in_text(text):
+    """
+    Find Nepali month/day/year mentions in text, replace with Gregorian date and English weekday.
+    Also replace Nepali weekday names with English.
+    """
+    import re
+
+    # Nepali months and days
+    nepali_months = {
+        'बैशाख': 1,
+        'जेठ': 2,
+        'असार': 3,
+        'साउन': 4,
+        'भदौ': 5,
+        'आश्विन': 6,
+        'कार्तिक': 7,
+        'मंसिर': 8,
+        'पुष': 9,
+        'माघ': 10,
+        'फागुन': 11,
+        'चैत्र': 12,
+        'Baisakh': 1,
+        'Jestha': 2,
+        'Ashar': 3,
+        'Shrawan': 4,
+        'Bhadra': 5,
+        'Ashwin': 6,
+        'Kartik': 7,
+        'Mangsir': 8,
+        'Poush': 9,
+        'Magh': 10,
+        'Falgun': 11,
+        'Chaitra': 12,
+    }
+    nepali_days = [
+        'आइतबार',
+        'सोमबार',
+        'मंगलबार',
+        'बुधबार',
+        'बिहीबार',
+        'शुक्रबार',
+        'शनिबार',
+    ]
+    english_days = [
+        'Sunday',
+        'Monday',
+        'Tuesday',
+        'Wednesday',
+        'Thursday',
+        'Friday',
+        'Saturday',
+    ]
+    nepali_day_map = dict(zip(nepali_days, english_days))
+
+    # Replace Nepali weekday names with English
+    for np_day, en_day in nepali_day_map.items():
+        text = re.sub(np_day, en_day, text)
+
+    # Regex for Nepali date: year month day, month day, or day month (Devanagari or ASCII digits)
+    # Handles: YYYY month DD, month DD, DD month, with or without whitespace
+    date_patterns = [
+        re.compile(
+            r'([१२३४५६७८९०\d]{4})\s*([\w\u0900-\u097F]+)\s*([१२३४५६७८९०\d]{1,2})\s*गते?'
+        ),  # YYYY month DD
+        re.compile(
+            r'([\w\u0900-\u097F]+)\s*([१२३४५६७८९०\d]{1,2})'
+        ),  # month DD
+        re.compile(
+            r'([१२३४५६७८९०\d]{1,2})\s*([\w\u0900-\u097F]+)'
+        ),  # DD month
+    ]
+
+    def dev_to_ascii(s):
+        dev_map = str.maketrans('०१२३४५६७८९', '0123456789')
+        return s.translate(dev_map)
+
+    def replace_date_match(m, order):
+        try:
+            if order == 'ymd':
+                year = int(dev_to_ascii(m.group(1)))
+                month_raw = m.group(2).strip()
+                day = int(dev_to_ascii(m.group(3)))
+            elif order == 'md':
+                year = nepali_datetime.date.today().year
+                month_raw = m.group(1).strip()
+                day = int(dev_to_ascii(m.group(2)))
+            elif order == 'dm':
+                year = nepali_datetime.date.today().year
+                day = int(dev_to_ascii(m.group(1)))
+                month_raw = m.group(2).strip()
+            else:
+                return m.group(0)
+            month = nepali_months.get(month_raw, None)
+            if month:
+                ndt = nepali_datetime.date(year, month, day)
+                gdt = ndt.to_datetime_date()
+                weekday = gdt.strftime('%A')
+                return f'{gdt.strftime("%Y-%m-%d")} ({weekday})'
+        except Exception as e:
+            print(f'[DEBUG] Exception in replace_date_match: {e}')
+        return m.group(0)
+
+    # Replace all Nepali date mentions with Gregorian date and weekday
+    # 1. YYYY month DD
+    text = date_patterns[0].sub(lambda m: replace_date_match(m, 'ymd'), text)
+    # 2. month DD
+    text = date_patterns[1].sub(lambda m: replace_date_match(m, 'md'), text)
+    # 3. DD month
+    text = date_patterns[2].sub(lambda m: replace_date_match(m, 'dm'), text)
+
+    return text
+
+
+def load_corpus():
+    with open(CORPUS_PATH, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+    texts = [case['input'] for case in corpus['texts']]
+    published_dates = [case['input'] for case in corpus['published_dates']]
+    return texts, published_dates
+
+
+def best_time(function, inputs):
+    return min(
+        timeit.repeat(
+            lambda: [function(value) for value in inputs],
+            number=1,
+            repeat=REPEATS,
+        )
+    )
+
+
+def main():
+    texts, published_dates = load_corpus()
+    print(
+        f'{len(texts)} texts ({sum(map(len, texts))} characters), '
+        f'{len(published_dates)} published dates'
+    )
+    for name, legacy, current, inputs in (
+        (
+            'replace_dates_and_days_in_text',
+            legacy_replace_dates_and_days_in_text,
+            replace_dates_and_days_in_text,
+            texts,
+        ),
+        (
+            'parse_nepali_date',
+            legacy_parse_nepali_date,
+            parse_nepali_date,
+            published_dates,
+        ),
+    ):
+        with contextlib.redirect_stdout(io.StringIO()):
+            legacy_time = best_time(legacy, inputs)
+            current_time = best_time(current, inputs)
+        print(
+            f'{name}: legacy {legacy_time * 1000:.1f} ms, '
+            f'current {current_time * 1000:.1f} ms, '
+            f'{legacy_time / current_time:.1f}x faster'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Time cross-date candidate generation for windowed step4 merging on a
+synthetic multi-year event set, and compare the number of candidate
+pairs with comparing every pair of events inside the window. Then
+cluster a year with a few very heavy news days, to check time and peak
+memory stay bounded when one date holds thousands of events.
+
+Run from the project root:
+    uv run -m src.benchmarks.bench_event_windows
+"""
+
+import datetime
+import random
+import time
+import tracemalloc
+
+from src.event_clustering import candidate_pairs, cluster_events_across_dates
+
+YEARS = 3
+EVENTS_PER_DAY = 60
+ACTORS = 20_000
+# Stories running at a time and their mean length in days
+STORIES = 40
+STORY_DAYS = 5
+COMMON_ACTORS = 10
+WINDOW_DAYS = 2
+# Full clustering also vectorizes every event, so it runs on one year
+CLUSTER_YEARS = 1
+# Days of the skewed year with HEAVY_DAY_EVENTS events instead of
+# EVENTS_PER_DAY
+HEAVY_DAYS = 5
+HEAVY_DAY_EVENTS = 5_000
+
+
+def synthetic_events(rng, years, heavy_days=()):
+    """
+    Events of ongoing stories, each with its own actors and a few days
+    long, plus one of a few very common actors (police, government).
+    The days numbered in heavy_days get HEAVY_DAY_EVENTS events.
+    """
+    start = datetime.date(2022, 1, 1)
+    events_by_date = {}
+    stories = []
+    for day in range(365 * years):
+        date = (start + datetime.timedelta(days=day)).isoformat()
+        # Stories run for about STORY_DAYS days
+        stories = [s for s in stories if rng.random() > 1 / STORY_DAYS]
+        while len(stories) < STORIES:
+            stories.append(
+                [f'actor {rng.randrange(ACTORS)}' for _ in range(2)]
+            )
+        events = []
+        count = HEAVY_DAY_EVENTS if day in heavy_days else EVENTS_PER_DAY
+        for i in range(count):
+            story = rng.randrange(len(stories))
+            events.append(
+                {
+                    'id': str(i + 1),
+                    'event': f'story {story} update {rng.randrange(10**6)}',
+                    'details': f'details {rng.randrange(10**6)}',
+                    'actors': stories[story]
+                    + [f'common {rng.randrange(COMMON_ACTORS)}'],
+                }
+            )
+        events_by_date[date] = events
+    return events_by_date
+
+
+def main():
+    rng = random.Random(0)
+    events_by_date = synthetic_events(rng, YEARS)
+    events, dates = [], []
+    for date in sorted(events_by_date):
+        events.extend(events_by_date[date])
+        dates.extend([date] * len(events_by_date[date]))
+
+    start = time.perf_counter()
+    pairs = candidate_pairs(events, dates, WINDOW_DAYS)
+    seconds = time.perf_counter() - start
+    window_events = EVENTS_PER_DAY * (2 * WINDOW_DAYS + 1)
+    all_pairs = len(events) * (window_events - 1) // 2
+    print(f'{len(events)} events over {YEARS} years, ±{WINDOW_DAYS} days')
+    print(f'candidate pairs:   {len(pairs):>12} in {seconds:.2f}s')
+    print(f'all window pairs: ~{all_pairs:>12}')
+
+    one_year = dict(sorted(events_by_date.items())[: 365 * CLUSTER_YEARS])
+    cluster(f'{CLUSTER_YEARS} year(s)', one_year)
+
+    heavy_days = set(rng.sample(range(365), HEAVY_DAYS))
+    skewed = synthetic_events(rng, 1, heavy_days)
+    same_date = sum(
+        len(events) * (len(events) - 1) // 2 for events in skewed.values()
+    )
+    print(
+        f'skewed year, {HEAVY_DAYS} days of {HEAVY_DAY_EVENTS} events: '
+        f'{same_date} same-date pairs'
+    )
+    cluster('skewed year', skewed)
+
+
+def cluster(label, events_by_date):
+    tracemalloc.start()
+    start = time.perf_counter()
+    clusters = cluster_events_across_dates(events_by_date, WINDOW_DAYS)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    count = sum(len(date_clusters) for date_clusters in clusters.values())
+    print(
+        f'clustering {label}: {count} clusters in {seconds:.2f}s, '
+        f'peak {peak / 2**20:.0f} MiB'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare the fast lxml/XPath extraction path with the full BeautifulSoup
+parse on stored HTML fixtures: parse time and peak memory per article.
+
+Run from the project root:
+    uv run -m src.benchmarks.bench_extraction
+"""
+
+import glob
+import os
+import statistics
+import time
+import tracemalloc
+
+from src.step1_scrape_and_preprocess_articles import (
+    extract_title_and_content_fast,
+    extract_title_and_content_full,
+)
+
+FIXTURES_GLOB = os.path.join(
+    os.path.dirname(__file__), '..', 'tests', 'fixtures', 'html', '*.html'
+)
+REPEATS = 50
+
+PATHS = {
+    'fast': extract_title_and_content_fast,
+    'full': extract_title_and_content_full,
+}
+
+
+def load_fixtures():
+    pages = []
+    for path in sorted(glob.glob(FIXTURES_GLOB)):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+
+def time_per_article(extract, pages):
+    """Median seconds per article over REPEATS passes."""
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for html in pages:
+            extract(html)
+        samples.append((time.perf_counter() - start) / len(pages))
+    return statistics.median(samples)
+
+
+def python_heap_peak_per_article(extract, pages):
+    """
+    Mean tracemalloc peak per article. Only counts Python allocations, so
+    memory held inside libxml2 is not included.
+    """
+    peaks = []
+    for html in pages:
+        tracemalloc.start()
+        extract(html)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.mean(peaks)
+
+
+def main():
+    pages = load_fixtures()
+    if not pages:
+        print(f'No fixtures found at {FIXTURES_GLOB}')
+        return
+    sizes = [len(html.encode('utf-8')) for html in pages]
+    print(
+        f'{len(pages)} fixtures, mean size {statistics.mean(sizes) / 1024:.1f} KiB, '
+        f'{REPEATS} repeats'
+    )
+    results = {}
+    for name, extract in PATHS.items():
+        results[name] = (
+            time_per_article(extract, pages),
+            python_heap_peak_per_article(extract, pages),
+        )
+        seconds, heap_peak = results[name]
+        print(
+            f'{name:>5}: {seconds * 1000:8.3f} ms/article, '
+            f'python heap peak {heap_peak / 1024:8.1f} KiB/article'
+        )
+    speedup = results['full'][0] / results['fast'][0]
+    print(f'fast path is {speedup:.1f}x faster per article')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Offline throughput benchmark of the shared LLM client against the local
+fake Gemini server, at several concurrency levels.
+
+Run from the project root:
+    uv run -m src.benchmarks.bench_llm_client
+"""
+
+import time
+
+from src.llm_client import LLMClient
+from src.tests.fake_gemini import FakeGeminiServer
+
+REQUESTS = 200
+LATENCY = 0.05
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+
+
+def run(server, max_concurrency):
+    llm = LLMClient(
+        api_key='benchmark',
+        base_url=server.base_url,
+        max_concurrency=max_concurrency,
+        requests_per_minute=1_000_000,
+        tokens_per_minute=100_000_000,
+    )
+    start = time.perf_counter()
+    for _, result in llm.map(
+        range(REQUESTS), lambda i: {'contents': f'article {i}'}
+    ):
+        if isinstance(result, Exception):
+            raise result
+    elapsed = time.perf_counter() - start
+    llm.close()
+    return elapsed
+
+
+def main():
+    print(f'{REQUESTS} requests, {LATENCY * 1000:.0f} ms simulated latency')
+    with FakeGeminiServer(latency=LATENCY) as server:
+        for level in CONCURRENCY_LEVELS:
+            elapsed = run(server, level)
+            print(
+                f'concurrency {level:>3}: {elapsed:6.2f} s, '
+                f'{REQUESTS / elapsed:7.1f} requests/s'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Compare the row-by-row step5 narrative insert with the COPY-based bulk
+load against a local Postgres, on synthetic narratives of 10k, 100k and
+1M events, and time an incremental upsert of an unchanged narrative.
+Connection settings come from the DB_* variables in .env; the tables are
+created in a scratch schema, so existing data is left alone.
+
+Run from the project root:
+    uv run -m src.benchmarks.bench_step5_load
+"""
+
+import functools
+import random
+import time
+
+import psycopg
+from dotenv import load_dotenv
+from psycopg.conninfo import make_conninfo
+
+from src import step5_insert_narratives_into_db as step5
+from src.db import Database, db_conninfo
+
+SCHEMA = 'step5_bench'
+SIZES = [10_000, 100_000, 1_000_000]
+EVENTS_PER_DATE = 50
+SOURCES_PER_EVENT = 2
+ACTORS_PER_EVENT = 3
+# Row-by-row inserts take too long beyond this
+ROW_BY_ROW_MAX = 100_000
+
+
+def synthetic_records(rng, events):
+    for start in range(0, events, EVENTS_PER_DATE):
+        day = start // EVENTS_PER_DATE
+        date = f'{2000 + day // 365}-01-01'
+        yield {
+            'date': date,
+            'events': [
+                {
+                    'event': f'event {i}',
+                    'details': f'details of event {i}',
+                    'actors': [
+                        f'actor {rng.randrange(events // 10 + 1)}'
+                        for _ in range(ACTORS_PER_EVENT)
+                    ],
+                    'sources': [
+                        {
+                            'title': f'article {url}',
+                            'article_url': f'https://example.com/{url}',
+                            'published_date': f'{date} (Monday)',
+                        }
+                        for url in (
+                            rng.randrange(events // 2 + 1)
+                            for _ in range(SOURCES_PER_EVENT)
+                        )
+                    ],
+                }
+                for i in range(start, min(start + EVENTS_PER_DATE, events))
+            ],
+        }
+
+
+def reset_schema(conninfo):
+    with open('init/init-db.sql', encoding='utf-8') as f:
+        schema_sql = f.read()
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        conn.execute(f'CREATE SCHEMA {SCHEMA}')
+        conn.execute(schema_sql)
+
+
+def timed(load, records, db):
+    start = time.perf_counter()
+    load(records, db=db)
+    return time.perf_counter() - start
+
+
+def main():
+    load_dotenv()
+    conninfo = make_conninfo(db_conninfo(), options=f'-c search_path={SCHEMA}')
+    db = Database(conninfo, min_size=1, max_size=1)
+    for size in SIZES:
+        reset_schema(conninfo)
+        bulk = timed(
+            functools.partial(step5.bulk_insert_narrative, actors=False),
+            synthetic_records(random.Random(0), size),
+            db,
+        )
+        # Upserting the same narrative again finds nothing to change
+        upsert = timed(
+            functools.partial(step5.upsert_narrative, actors=False),
+            synthetic_records(random.Random(0), size),
+            db,
+        )
+        line = (
+            f'{size:>9} events  COPY: {bulk:8.2f}s  re-upsert: {upsert:8.2f}s'
+        )
+        if size <= ROW_BY_ROW_MAX:
+            reset_schema(conninfo)
+            rows = timed(
+                step5.insert_narrative,
+                synthetic_records(random.Random(0), size),
+                db,
+            )
+            line += f'  row by row: {rows:8.2f}s  ({rows / bulk:.0f}x)'
+        print(line)
+    db.close()
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute(f'DROP SCHEMA {SCHEMA} CASCADE')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+from collections import deque
+
+from src.jsonl_io import compact_records, iter_records
+
+# Per-stage manifests of completed records
+CHECKPOINT_DIR = 'src/data/temp_data/checkpoints'
+
+
+def input_hash(value):
+    """Stable hash of a JSON-serializable stage input."""
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Checkpoint:
+    """
+    Record-level progress of one pipeline stage.
+
+    The manifest is an append-only JSONL log of {'key', 'hash'} lines, one
+    per output record, where key identifies the record (an article URL or
+    a date) and hash is the hash of the input it was computed from. A
+    record counts as done when its key is in the manifest with the same
+    input hash and is still present in the output file, so a run skips
+    finished records and only processes new or changed ones.
+
+    Output records are appended to the output file and marked done one at
+    a time, so an interrupted run loses at most the record in flight. When
+    a changed record is appended next to its old version, the output is
+    compacted once on close.
+    """
+
+    def __init__(self, stage, output_path, key, directory=CHECKPOINT_DIR):
+        self.output_path = output_path
+        self.key = key
+        self.manifest_path = os.path.join(directory, f'{stage}.jsonl')
+        os.makedirs(directory, exist_ok=True)
+        # Byte offset of the latest output line for each key
+        self._offsets = {}
+        if os.path.exists(output_path):
+            offset = 0
+            with open(output_path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        self._offsets[json.loads(line).get(key)] = offset
+                    offset += len(line)
+        self._done = {}
+        if os.path.exists(self.manifest_path):
+            for entry in iter_records(self.manifest_path):
+                if entry['key'] in self._offsets:
+                    self._done[entry['key']] = entry['hash']
+        self._hashes = {}
+        self._superseded = False
+        self.skipped = 0
+
+    def is_done(self, key, hash):
+        return self._done.get(key) == hash
+
+    def pending(self, records, hash_fn, key_fn=None, skipped=None):
+        """
+        Yield the records whose output is missing or stale. hash_fn(record)
+        is the input hash; key_fn(record) the output key, by default
+        record[self.key]. Keys of skipped records are appended to skipped,
+        when given.
+        """
+        for record in records:
+            key = key_fn(record) if key_fn else record[self.key]
+            hash = hash_fn(record)
+            if self.is_done(key, hash):
+                self.skipped += 1
+                if skipped is not None:
+                    skipped.append(key)
+                continue
+            self._hashes[key] = hash
+            yield record
+
+    def load(self, key):
+        """The latest output record for key."""
+        with open(self.output_path, 'rb') as f:
+            f.seek(self._offsets[key])
+            return json.loads(f.readline())
+
+    def appended(self, records, done=lambda record: True):
+        """
+        Append output records for keys yielded by pending(), marking each
+        done once it is on disk, and yield them on. Records for which
+        done(record) is false, e.g. failed LLM calls, are written but left
+        to be retried.
+        """
+        with (
+            open(self.output_path, 'ab') as output,
+            open(self.manifest_path, 'a', encoding='utf-8') as manifest,
+        ):
+            for record in records:
+                key = record[self.key]
+                if key in self._offsets:
+                    self._superseded = True
+                self._offsets[key] = output.tell()
+                line = json.dumps(record, ensure_ascii=False) + '\n'
+                output.write(line.encode('utf-8'))
+                output.flush()
+                if done(record) and key in self._hashes:
+                    entry = {'key': key, 'hash': self._hashes[key]}
+                    manifest.write(
+                        json.dumps(entry, ensure_ascii=False) + '\n'
+                    )
+                    manifest.flush()
+                    self._done[key] = entry['hash']
+                yield record
+
+    def write(self, records, done=lambda record: True):
+        """Consume appended(); returns the number of records written."""
+        return sum(1 for _ in self.appended(records, done))
+
+    def stream(
+        self, records, hash_fn, process, done=lambda r: True, key_fn=None
+    ):
+        """
+        Run process over the pending records and yield the stage's full
+        output: new records as they are written, and the stored output of
+        skipped records, so a downstream stage sees every record.
+        """
+        skipped = deque()
+        todo = self.pending(records, hash_fn, key_fn, skipped=skipped)
+        for record in self.appended(process(todo), done):
+            while skipped:
+                yield self.load(skipped.popleft())
+            yield record
+        for key in skipped:
+            yield self.load(key)
+
+    def close(self):
+        """Drop superseded output records, if this run wrote any."""
+        if self._superseded:
+            compact_records(self.output_path, self.key)
+            self._superseded = False
+            self._offsets = {}
@@ -0,0 +1,321 @@
+import networkx as nx
+import numpy as np
+
+from src.graph_store import StringTable
+
+KINDS = ('actor', 'event', 'source')
+
+
+def gather(indptr, indices, rows):
+    """Concatenated CSR rows, without a Python loop over them."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(
+        offsets[-1]
+    )
+    return indices[positions]
+
+
+def csr(sources, targets, n):
+    """CSR adjacency (indptr, indices) of the edges sources -> targets."""
+    order = np.argsort(sources, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    return indptr, targets[order].astype(np.int32)
+
+
+class CompactGraph:
+    """
+    The actor -> event -> source graph of build_graph with integer node
+    ids and CSR adjacency in NumPy arrays, for graphs too large to hold as
+    NetworkX objects.
+
+    Nodes are numbered by kind: actors first, then events, then sources,
+    each sorted by database id; kind_start[k] is the first node of kind
+    KINDS[k]. db_ids maps a node to its row id, labels (a StringTable)
+    to its label. Edges are stored once per direction (out_indptr /
+    out_indices and in_indptr / in_indices), about 12 bytes per edge and
+    direction. Event dates and source urls and dates are kept for
+    to_networkx and for time-windowed analytics.
+    """
+
+    def __init__(
+        self,
+        actor_ids,
+        actor_labels,
+        event_ids,
+        event_labels,
+        event_details,
+        event_dates,
+        source_ids,
+        source_titles,
+        source_urls,
+        source_dates,
+        actor_events,
+        event_sources,
+    ):
+        """
+        Node arrays per kind must be sorted by id. actor_events and
+        event_sources are (ids, ids) pairs of database ids per edge.
+        """
+        counts = [len(actor_ids), len(event_ids), len(source_ids)]
+        self.kind_start = np.zeros(4, dtype=np.int64)
+        np.cumsum(counts, out=self.kind_start[1:])
+        self.num_nodes = int(self.kind_start[-1])
+        self.db_ids = np.concatenate([actor_ids, event_ids, source_ids])
+        self.labels = actor_labels.concat(event_labels).concat(source_titles)
+        self.event_details = event_details
+        self.event_dates = event_dates
+        self.source_urls = source_urls
+        self.source_dates = source_dates
+
+        sources = np.concatenate(
+            [
+                self.nodes('actor', actor_events[0]),
+                self.nodes('event', event_sources[0]),
+            ]
+        )
+        targets = np.concatenate(
+            [
+                self.nodes('event', actor_events[1]),
+                self.nodes('source', event_sources[1]),
+            ]
+        )
+        self.num_edges = len(sources)
+        self.out_indptr, self.out_indices = csr(
+            sources, targets, self.num_nodes
+        )
+        self.in_indptr, self.in_indices = csr(targets, sources, self.num_nodes)
+
+    @classmethod
+    def from_store(cls, store, date_from=None):
+        """
+        Graph of the events in a GraphStore snapshot that have at least
+        one actor and one source, dated date_from or later if given.
+        """
+        events = store.tables['events']
+        actors = store.tables['actors']
+        sources = store.tables['sources']
+        event_actors = store.tables['event_actors']
+        event_sources = store.tables['event_sources']
+        selected = store.selected_events(date_from or '0001-01-01')
+        selected = selected[np.argsort(events['id'][selected])]
+        event_ids = events['id'][selected]
+        actor_links = np.flatnonzero(
+            np.isin(event_actors['event_id'], event_ids)
+        )
+        source_links = np.flatnonzero(
+            np.isin(event_sources['event_id'], event_ids)
+        )
+        actor_events = (
+            event_actors['actor_id'][actor_links],
+            event_actors['event_id'][actor_links],
+        )
+        event_source_pairs = (
+            event_sources['event_id'][source_links],
+            event_sources['source_id'][source_links],
+        )
+        actor_ids = np.unique(actor_events[0])
+        source_ids = np.unique(event_source_pairs[1])
+        actor_rows = store._positions('actors', actor_ids)
+        source_rows = store._positions('sources', source_ids)
+        return cls(
+            actor_ids,
+            actors['label'].take(actor_rows),
+            event_ids,
+            events['label'].take(selected),
+            events['details'].take(selected),
+            events['event_date'][selected],
+            source_ids,
+            sources['title'].take(source_rows),
+            sources['url'].take(source_rows),
+            sources['published_date'][source_rows],
+            actor_events,
+            event_source_pairs,
+        )
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Graph of fetch_joined_tuples rows, as build_graph would make."""
+        actors, events, sources = {}, {}, {}
+        actor_events, event_sources = set(), set()
+        for row in rows:
+            (
+                actor_id,
+                actor_label,
+                event_id,
+                event_label,
+                event_details,
+                source_id,
+                source_title,
+                source_url,
+                published_date,
+            ) = row
+            actors.setdefault(actor_id, actor_label)
+            events.setdefault(event_id, (event_label, event_details))
+            sources.setdefault(
+                source_id, (source_title, source_url, published_date)
+            )
+            actor_events.add((actor_id, event_id))
+            event_sources.add((event_id, source_id))
+        actor_ids, event_ids, source_ids = (
+            sorted(actors),
+            sorted(events),
+            sorted(sources),
+        )
+
+        def pairs(edges):
+            return tuple(
+                np.array(column, dtype=np.int64)
+                for column in (zip(*sorted(edges)) if edges else ((), ()))
+            )
+
+        return cls(
+            np.array(actor_ids, dtype=np.int64),
+            StringTable.from_strings(actors[i] for i in actor_ids),
+            np.array(event_ids, dtype=np.int64),
+            StringTable.from_strings(events[i][0] for i in event_ids),
+            StringTable.from_strings(events[i][1] for i in event_ids),
+            # Rows carry no event dates
+            np.full(len(event_ids), np.datetime64('NaT', 'D')),
+            np.array(source_ids, dtype=np.int64),
+            StringTable.from_strings(sources[i][0] for i in source_ids),
+            StringTable.from_strings(sources[i][1] for i in source_ids),
+            np.array(
+                [sources[i][2] for i in source_ids], dtype='datetime64[D]'
+            ),
+            pairs(actor_events),
+            pairs(event_sources),
+        )
+
+    def nodes(self, kind, ids):
+        """Node numbers of the rows ids of kind (all must be present)."""
+        k = KINDS.index(kind)
+        start, end = self.kind_start[k], self.kind_start[k + 1]
+        return start + np.searchsorted(self.db_ids[start:end], ids)
+
+    def node(self, key):
+        """Node number of a GEXF id such as 'actor_7'."""
+        kind, id = key.rsplit('_', 1)
+        return int(self.nodes(kind, [int(id)])[0])
+
+    def kinds(self, nodes):
+        """Index into KINDS of each node."""
+        return np.searchsorted(self.kind_start, nodes, side='right') - 1
+
+    def key(self, node):
+        """GEXF id of a node, e.g. 'actor_7'."""
+        return f'{KINDS[self.kinds(node)]}_{self.db_ids[node]}'
+
+    def degree(self, mode='all'):
+        """Degree of every node: 'in', 'out' or 'all' (both)."""
+        out_degree = np.diff(self.out_indptr)
+        in_degree = np.diff(self.in_indptr)
+        return {
+            'out': out_degree,
+            'in': in_degree,
+            'all': out_degree + in_degree,
+        }[mode]
+
+    def neighborhood(self, nodes, hops=1):
+        """
+        Sorted node numbers within hops edges of nodes (included),
+        ignoring edge direction. Each hop expands the whole frontier at
+        once through the CSR arrays.
+        """
+        found = np.unique(np.asarray(nodes, dtype=np.int64))
+        frontier = found
+        for _ in range(hops):
+            if not len(frontier):
+                break
+            reached = np.concatenate(
+                [
+                    gather(self.out_indptr, self.out_indices, frontier),
+                    gather(self.in_indptr, self.in_indices, frontier),
+                ]
+            )
+            frontier = np.setdiff1d(reached, found)
+            found = np.union1d(found, frontier)
+        return found
+
+    def event_actors(self, events=None):
+        """
+        (event, actor) node pairs of the actor -> event edges, grouped by
+        event; only those of events (node numbers) if given.
+        """
+        start, end = self.kind_start[1], self.kind_start[2]
+        events = (
+            np.arange(start, end, dtype=np.int64) if events is None else events
+        )
+        lengths = self.in_indptr[events + 1] - self.in_indptr[events]
+        return (
+            np.repeat(events, lengths),
+            gather(self.in_indptr, self.in_indices, events).astype(np.int64),
+        )
+
+    def cooccurrence(self, events=None):
+        """
+        Actor co-occurrence projection: (actor_a, actor_b, weight) arrays
+        of actor node pairs (a < b) that share weight events, counting
+        only events (node numbers) if given. Pairs are generated per event
+        with array operations, so the cost is the sum over events of the
+        squared number of actors.
+        """
+        event_of, actor = self.event_actors(events)
+        if not len(actor):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        # Each link is paired with every link of its event: the event's
+        # links are the run [first, first + size) of the grouped arrays
+        boundaries = np.flatnonzero(np.diff(event_of)) + 1
+        firsts = np.concatenate([[0], boundaries])
+        sizes = np.diff(np.concatenate([firsts, [len(actor)]]))
+        link_first = np.repeat(firsts, sizes)
+        link_size = np.repeat(sizes, sizes)
+        left = np.repeat(np.arange(len(actor)), link_size)
+        offsets = np.zeros(len(actor) + 1, dtype=np.int64)
+        np.cumsum(link_size, out=offsets[1:])
+        right = np.repeat(link_first - offsets[:-1], link_size) + np.arange(
+            offsets[-1]
+        )
+        a, b = actor[left], actor[right]
+        keep = a < b
+        codes = a[keep] * self.num_nodes + b[keep]
+        codes, weights = np.unique(codes, return_counts=True)
+        return codes // self.num_nodes, codes % self.num_nodes, weights
+
+    def to_networkx(self):
+        """The same DiGraph build_graph makes from the joined rows."""
+        G = nx.DiGraph()
+        labels = list(self.labels)
+        actors, events, sources = (
+            range(self.kind_start[k], self.kind_start[k + 1]) for k in range(3)
+        )
+        for node in actors:
+            G.add_node(self.key(node), label=labels[node], role='actor')
+        for i, node in enumerate(events):
+            G.add_node(
+                self.key(node),
+                label=labels[node],
+                details=self.event_details[i] or None,
+                role='event',
+            )
+        for i, node in enumerate(sources):
+            G.add_node(
+                self.key(node),
+                label=labels[node],
+                url=self.source_urls[i],
+                published_date=str(self.source_dates[i]),
+                role='source',
+            )
+        keys = [self.key(node) for node in range(self.num_nodes)]
+        sources_of = np.repeat(
+            np.arange(self.num_nodes), np.diff(self.out_indptr)
+        )
+        G.add_edges_from(
+            (keys[s], keys[t])
+            for s, t in zip(sources_of.tolist(), self.out_indices.tolist())
+        )
+        return G
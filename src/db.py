@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+# Pool sizing, overridable from the environment next to the DB_* settings
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+
+
+def db_conninfo():
+    """Connection string from the DB_* environment variables."""
+    return make_conninfo(
+        dbname=os.getenv('DB_NAME'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        host=os.getenv('DB_HOST'),
+        port=os.getenv('DB_PORT'),
+    )
+
+
+class CheckoutStats:
+    """
+    Count connection checkouts, the time spent waiting for them and the
+    connections currently checked out.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.in_use = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def metrics(self, pool):
+        """Pool state from psycopg_pool's counters plus checkout latency."""
+        stats = pool.get_stats()
+        requests = stats.get('requests_num', 0)
+        wait_ms = stats.get('requests_wait_ms', 0)
+        with self._lock:
+            return {
+                # Connections open or being opened
+                'pool_size': stats.get('pool_size', 0),
+                'in_use': self.in_use,
+                'available': stats.get('pool_available', 0),
+                'waiting': stats.get('requests_waiting', 0),
+                'requests': requests,
+                'wait_ms_total': wait_ms,
+                'wait_ms_avg': wait_ms / requests if requests else 0.0,
+                'checkouts': self.checkouts,
+                'checkout_ms_avg': (
+                    self.total_ms / self.checkouts if self.checkouts else 0.0
+                ),
+                'checkout_ms_max': self.max_ms,
+                'connection_errors': stats.get('connections_errors', 0),
+                'connections_lost': stats.get('connections_lost', 0),
+            }
+
+
+def pool_kwargs(min_size, max_size, timeout):
+    return {
+        'min_size': min_size,
+        'max_size': max_size,
+        'timeout': timeout,
+        # Connections are checked before they are handed out
+        'check': ConnectionPool.check_connection,
+        'open': False,
+    }
+
+
+class Database:
+    """
+    Shared PostgreSQL connection pool for step5, the GEXF export and the
+    scripts. Connections are health-checked on checkout. metrics()
+    reports pool usage and checkout latency.
+    """
+
+    def __init__(
+        self,
+        conninfo=None,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+    ):
+        self.pool = ConnectionPool(
+            conninfo or db_conninfo(),
+            name='narrative-db',
+            **pool_kwargs(min_size, max_size, timeout),
+        )
+        self.pool.open()
+        self.stats = CheckoutStats()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection. Its transaction is committed when the block
+        exits normally and rolled back on an exception.
+        """
+        start = time.perf_counter()
+        with self.pool.connection() as conn:
+            self.stats.record(time.perf_counter() - start)
+            try:
+                yield conn
+            finally:
+                self.stats.release()
+
+    def health_check(self):
+        """Run a trivial query; returns (ok, round trip in ms)."""
+        start = time.perf_counter()
+        try:
+            with self.connection() as conn:
+                conn.execute('SELECT 1')
+        except Exception as e:
+            print(f'Database health check failed: {e}')
+            return False, None
+        return True, (time.perf_counter() - start) * 1000
+
+    def metrics(self):
+        return self.stats.metrics(self.pool)
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncDatabase:
+    """Asyncio counterpart of Database, for the API."""
+
+    def __init__(
+        self,
+        conninfo=None,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+    ):
+        kwargs = pool_kwargs(min_size, max_size, timeout)
+        kwargs['check'] = AsyncConnectionPool.check_connection
+        self.pool = AsyncConnectionPool(
+            conninfo or db_conninfo(), name='narrative-db-async', **kwargs
+        )
+        self.stats = CheckoutStats()
+
+    async def open(self):
+        await self.pool.open()
+
+    @asynccontextmanager
+    async def connection(self):
+        start = time.perf_counter()
+        async with self.pool.connection() as conn:
+            self.stats.record(time.perf_counter() - start)
+            try:
+                yield conn
+            finally:
+                self.stats.release()
+
+    async def health_check(self):
+        start = time.perf_counter()
+        try:
+            async with self.connection() as conn:
+                await conn.execute('SELECT 1')
+        except Exception as e:
+            print(f'Database health check failed: {e}')
+            return False, None
+        return True, (time.perf_counter() - start) * 1000
+
+    def metrics(self):
+        return self.stats.metrics(self.pool)
+
+    async def close(self):
+        await self.pool.close()
+
+
+_default_database = None
+_default_database_lock = threading.Lock()
+
+
+def default_database():
+    """The process-wide Database shared by the pipeline stages."""
+    global _default_database
+    with _default_database_lock:
+        if _default_database is None:
+            _default_database = Database()
+        return _default_database
@@ -0,0 +1,279 @@
+import datetime
+import zlib
+from bisect import bisect_right
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from src.unification import UnionFind, normalize_name
+
+# Width of the hashed feature vectors
+HASH_DIM = 4096
+# Events at least this similar are merge candidates
+SIMILARITY_THRESHOLD = 0.25
+# Most events sent to the LLM in one merge call
+MAX_CLUSTER_SIZE = 25
+NGRAM_SIZE = 3
+# An actor with more events than this within one window is too common to
+# tell incidents apart (e.g. 'नेपाल प्रहरी') and yields no candidates
+MAX_ACTOR_POSTINGS = 200
+# Rows of a similarity matrix computed at a time, which bounds its memory
+# on dates with thousands of events
+SIMILARITY_BLOCK = 256
+
+
+def event_features(event):
+    """
+    Bag of features for one event: character n-grams of its title and
+    details, plus one feature per actor.
+    """
+    text = normalize_name(
+        f'{event.get("event") or ""} {event.get("details") or ""}'
+    )
+    features = Counter(
+        text[i : i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)
+    )
+    for actor in event.get('actors') or []:
+        if isinstance(actor, str):
+            features['actor:' + normalize_name(actor)] += 1
+    return features
+
+
+def feature_counts(events, dim=HASH_DIM):
+    """Hashed feature counts, one row per event."""
+    counts = np.zeros((len(events), dim), dtype=np.float32)
+    for row, event in enumerate(events):
+        for feature, count in event_features(event).items():
+            counts[row, zlib.crc32(feature.encode('utf-8')) % dim] += count
+    return counts
+
+
+def inverse_document_frequency(document_frequency, count):
+    return np.log((1 + count) / (1 + document_frequency)) + 1
+
+
+def weighted_vectors(counts, idf):
+    vectors = counts * idf
+    # Row norms without a squared copy of the matrix
+    norms = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))[:, None]
+    norms[norms == 0] = 1
+    vectors /= norms
+    return vectors
+
+
+def event_vectors(events, dim=HASH_DIM):
+    """
+    TF-IDF weighted, L2-normalized hashed feature vectors, one row per
+    event. Document frequencies are taken over events.
+    """
+    counts = feature_counts(events, dim)
+    idf = inverse_document_frequency((counts > 0).sum(axis=0), len(events))
+    return weighted_vectors(counts, idf)
+
+
+def merge_roots(roots, first, second):
+    """
+    Update roots, the smallest index of each index's connected component,
+    with the links (first[i], second[i]). Labels are propagated between
+    the linked components' roots, with pointer jumping, until stable.
+    """
+    first, second = roots[first], roots[second]
+    labels = np.arange(len(roots))
+    while True:
+        low = np.minimum(labels[first], labels[second])
+        new = labels.copy()
+        np.minimum.at(new, first, low)
+        np.minimum.at(new, second, low)
+        new = new[new]
+        if np.array_equal(new, labels):
+            break
+        labels = new
+    return labels[roots]
+
+
+def similar_roots(
+    vectors, threshold=SIMILARITY_THRESHOLD, block=SIMILARITY_BLOCK
+):
+    """
+    For each row of vectors, the smallest row linked to it by a cosine
+    similarity of at least threshold, directly or through other rows.
+    The similarity matrix is computed block rows at a time and each
+    block's links are folded into the components right away, so neither
+    the matrix nor the links of a date with thousands of similar events
+    are ever held in full.
+    """
+    roots = np.arange(len(vectors))
+    for start in range(0, len(vectors), block):
+        similarity = vectors[start : start + block] @ vectors[start:].T
+        rows, cols = np.nonzero(np.triu(similarity >= threshold, k=1))
+        if len(rows):
+            roots = merge_roots(roots, rows + start, cols + start)
+    return roots
+
+
+def root_links(roots, offset=0):
+    """(index, root) links joining each index to its component's root."""
+    indexes = np.flatnonzero(roots != np.arange(len(roots)))
+    return zip((indexes + offset).tolist(), (roots[indexes] + offset).tolist())
+
+
+def cluster_events(
+    events,
+    threshold=SIMILARITY_THRESHOLD,
+    max_cluster_size=MAX_CLUSTER_SIZE,
+):
+    """
+    Split one date's events into clusters of merge candidates: events
+    linked by a cosine similarity of at least threshold, directly or
+    through other events. Clusters larger than max_cluster_size are cut
+    into consecutive chunks. Returns lists of events in their original
+    order, ordered by their first event.
+    """
+    if len(events) < 2:
+        return [list(events)] if events else []
+    roots = similar_roots(event_vectors(events), threshold)
+    clusters = linked_clusters(
+        len(events), root_links(roots), max_cluster_size
+    )
+    return [[events[index] for index in cluster] for cluster in clusters]
+
+
+def linked_clusters(count, links, max_cluster_size=MAX_CLUSTER_SIZE):
+    """
+    Connected components of range(count) under the (first, second) index
+    links, as sorted index lists ordered by their first index. Components
+    larger than max_cluster_size are cut into consecutive chunks.
+    """
+    groups = UnionFind()
+    for index in range(count):
+        groups.find(index)
+    for first, second in links:
+        groups.union(first, second)
+    clusters = []
+    for members in groups.groups():
+        members = sorted(members)
+        for start in range(0, len(members), max_cluster_size):
+            clusters.append(members[start : start + max_cluster_size])
+    clusters.sort()
+    return clusters
+
+
+def date_ordinal(date):
+    """Day number of an ISO date string, or None if it is not one."""
+    try:
+        return datetime.date.fromisoformat(str(date)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def candidate_pairs(
+    events, dates, window_days, max_postings=MAX_ACTOR_POSTINGS
+):
+    """
+    Index pairs (first, second), first < second, of events on different
+    dates that may describe the same incident: events within window_days
+    of each other that share an actor. events must be sorted by date,
+    dates[i] being the date of events[i]. Events on the same date are all
+    compared with each other by similar_roots instead.
+
+    The pairs come from an inverted index of actors whose postings are in
+    date order, so each event is only compared with the events of its
+    actors inside its window, found by bisection, instead of with every
+    event in the window.
+    """
+    ordinals = [date_ordinal(date) for date in dates]
+    postings = defaultdict(list)
+    for index, event in enumerate(events):
+        if ordinals[index] is None:
+            continue
+        actors = {
+            normalize_name(actor)
+            for actor in event.get('actors') or []
+            if isinstance(actor, str)
+        }
+        for actor in actors - {''}:
+            postings[actor].append(index)
+
+    pairs = set()
+    for members in postings.values():
+        days = [ordinals[index] for index in members]
+        for position, first in enumerate(members):
+            end = bisect_right(days, days[position] + window_days)
+            if end - position - 1 > max_postings:
+                continue
+            pairs.update(
+                (first, second)
+                for second in members[position + 1 : end]
+                if dates[second] != dates[first]
+            )
+    return pairs
+
+
+def cluster_events_across_dates(
+    events_by_date,
+    window_days,
+    threshold=SIMILARITY_THRESHOLD,
+    max_cluster_size=MAX_CLUSTER_SIZE,
+):
+    """
+    Cluster events across dates: events on the same date, or within
+    window_days of each other and sharing an actor, are linked when their
+    cosine similarity reaches threshold. Each cluster is anchored at the
+    date of its earliest event. Returns {date: [clusters]} over the input
+    dates, a date with no anchored cluster mapping to [].
+
+    Document frequencies are counted over all events, but vectors are
+    only kept for the dates of the window being compared, so memory does
+    not grow with the corpus. Same-date similarities are folded into
+    components in blocks (similar_roots) and cross-date ones are computed
+    per candidate pair, so a date with thousands of events never needs a
+    full similarity matrix or all its links.
+    """
+    dates = sorted(events_by_date)
+    events, event_dates, starts = [], [], {}
+    for date in dates:
+        starts[date] = len(events)
+        events.extend(events_by_date[date])
+        event_dates.extend([date] * len(events_by_date[date]))
+
+    document_frequency = np.zeros(HASH_DIM, dtype=np.int64)
+    for date in dates:
+        counts = feature_counts(events_by_date[date])
+        document_frequency += (counts > 0).sum(axis=0)
+    idf = inverse_document_frequency(document_frequency, len(events))
+
+    cross = defaultdict(lambda: defaultdict(list))
+    for first, second in candidate_pairs(events, event_dates, window_days):
+        cross[event_dates[first]][event_dates[second]].append((first, second))
+    vectors = {}
+    links = []
+    for date in dates:
+        # Pairs only reach forward, so the vectors of earlier dates are no
+        # longer needed
+        for done in [done for done in vectors if done < date]:
+            del vectors[done]
+        for needed in [date, *cross[date]]:
+            if needed not in vectors:
+                vectors[needed] = weighted_vectors(
+                    feature_counts(events_by_date[needed]), idf
+                )
+        links.extend(
+            root_links(similar_roots(vectors[date], threshold), starts[date])
+        )
+        for second_date, pairs in sorted(cross[date].items()):
+            pairs = np.array(pairs)
+            for start in range(0, len(pairs), SIMILARITY_BLOCK):
+                chunk = pairs[start : start + SIMILARITY_BLOCK]
+                similarity = np.einsum(
+                    'ij,ij->i',
+                    vectors[date][chunk[:, 0] - starts[date]],
+                    vectors[second_date][chunk[:, 1] - starts[second_date]],
+                )
+                links.extend(chunk[similarity >= threshold].tolist())
+
+    clusters = {date: [] for date in dates}
+    for cluster in linked_clusters(len(events), links, max_cluster_size):
+        clusters[event_dates[cluster[0]]].append(
+            [events[index] for index in cluster]
+        )
+    return clusters
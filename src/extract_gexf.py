@@ -1,37 +1,35 @@
 import os
-import psycopg
+import shutil
+import sys
+import tempfile
+from xml.sax.saxutils import quoteattr
+
 import networkx as nx
 
+from src.db import default_database
+
 
-def fetch_joined_tuples(date_from: str):
+def fetch_joined_tuples(date_from: str, db=None):
     """
-    Connects to the database and returns joined tuples:
+    Returns joined tuples for the events dated date_from or later, read
+    through db (by default the shared pool):
     (actor_id, actor_label, event_id, event_label, event_details,
     source_id, source_title, source_url, published_date)
     """
-    DB_NAME = os.getenv('DB_NAME')
-    DB_USER = os.getenv('DB_USER')
-    DB_PASSWORD = os.getenv('DB_PASSWORD')
-    DB_HOST = os.getenv('DB_HOST')
-    DB_PORT = os.getenv('DB_PORT')
-
-    conn = psycopg.connect(
-        f'dbname={DB_NAME} user={DB_USER} password={DB_PASSWORD} host={DB_HOST} port={DB_PORT}'
-    )
-
-    with conn.cursor() as cur:
+    db = db or default_database()
+    with db.connection() as conn, conn.cursor() as cur:
         cur.execute(
             """
             SELECT
                 a.id AS actor_id, a.label AS actor_label,
                 e.id AS event_id, e.label AS event_label, e.details AS event_details,
                 s.id AS source_id, s.title AS source_title, s.url AS source_url, s.published_date
-            FROM sources s
-            JOIN event_sources es ON s.id = es.source_id
-            JOIN events e ON es.event_id = e.id
+            FROM events e
+            JOIN event_sources es ON e.id = es.event_id
+            JOIN sources s ON es.source_id = s.id
             JOIN event_actors ea ON e.id = ea.event_id
             JOIN actors a ON ea.actor_id = a.id
-            WHERE s.published_date >= %s
+            WHERE e.event_date >= %s
             """,
             (date_from,),
         )
@@ -100,10 +98,234 @@ def write_graph_to_gexf(G, output_path):
     print(f'GEXF saved at {output_path}')
 
 
-if __name__ == '__main__':
-    date_from = '2025-01-01'
-    output_path = 'src/knowledge_graph.gexf'
+class IdSet:
+    """Set of non-negative integer ids kept as a bitmap, one bit per id."""
+
+    def __init__(self):
+        self.bits = bytearray()
+
+    def add(self, id):
+        """Add id; returns True if it was not in the set yet."""
+        byte, bit = divmod(id, 8)
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(max(byte + 1 - len(self.bits), 1024)))
+        if self.bits[byte] >> bit & 1:
+            return False
+        self.bits[byte] |= 1 << bit
+        return True
+
+
+# The events fetch_joined_tuples returns: dated date_from or later and
+# linked to at least one actor and one source
+SELECTED_EVENTS = """
+    e.event_date >= %(date_from)s
+    AND EXISTS (SELECT 1 FROM event_actors x WHERE x.event_id = e.id)
+    AND EXISTS (SELECT 1 FROM event_sources x WHERE x.event_id = e.id)
+"""
+EVENT_NODES_QUERY = f"""
+    SELECT e.id, e.label, e.details
+    FROM events e
+    WHERE {SELECTED_EVENTS}
+"""
+ACTOR_EDGES_QUERY = f"""
+    SELECT a.id, a.label, e.id
+    FROM events e
+    JOIN event_actors ea ON ea.event_id = e.id
+    JOIN actors a ON a.id = ea.actor_id
+    WHERE {SELECTED_EVENTS}
+"""
+SOURCE_EDGES_QUERY = f"""
+    SELECT s.id, s.title, s.url, s.published_date, e.id
+    FROM events e
+    JOIN event_sources es ON es.event_id = e.id
+    JOIN sources s ON s.id = es.source_id
+    WHERE {SELECTED_EVENTS}
+"""
+
+# Same layout and attribute ids as nx.write_gexf gives the build_graph graph
+GEXF_HEADER = """<?xml version='1.0' encoding='utf-8'?>
+<gexf xmlns="http://www.gexf.net/1.2draft" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.gexf.net/1.2draft http://www.gexf.net/1.2draft/gexf.xsd" version="1.2">
+  <graph defaultedgetype="directed" mode="static" name="">
+    <attributes mode="static" class="node">
+      <attribute id="0" title="role" type="string" />
+      <attribute id="1" title="details" type="string" />
+      <attribute id="2" title="url" type="string" />
+      <attribute id="3" title="published_date" type="string" />
+    </attributes>
+    <nodes>
+"""
+GEXF_ATTRIBUTE_IDS = {'role': 0, 'details': 1, 'url': 2, 'published_date': 3}
+GEXF_BATCH_SIZE = int(os.getenv('GEXF_BATCH_SIZE', '10000'))
+GEXF_STREAM = os.getenv('GEXF_STREAM', '') not in ('', '0')
+# Export from the incrementally synced graph store instead
+GEXF_SNAPSHOT = os.getenv('GEXF_SNAPSHOT', '') not in ('', '0')
+# Also write actor co-occurrence and centrality analytics
+GEXF_ANALYTICS = os.getenv('GEXF_ANALYTICS', '') not in ('', '0')
+
+
+def gexf_node(node_id, label, **attributes):
+    attvalues = ''.join(
+        f'          <attvalue for="{GEXF_ATTRIBUTE_IDS[name]}" '
+        f'value={quoteattr(str(value))} />\n'
+        for name, value in attributes.items()
+        if value is not None
+    )
+    return (
+        f'      <node id="{node_id}" label={quoteattr(str(label))}>\n'
+        f'        <attvalues>\n{attvalues}        </attvalues>\n'
+        '      </node>\n'
+    )
+
+
+def streamed_rows(conn, name, query, date_from, batch_size):
+    """Rows of query read through a named server-side cursor in batches."""
+    with conn.cursor(name=name) as cur:
+        cur.itersize = batch_size
+        cur.execute(query, {'date_from': date_from})
+        yield from cur
+
+
+def write_gexf_stream(output_path, events, actor_links, source_links):
+    """
+    Write a GEXF file from streams of rows, in one pass over each:
+    events as (event_id, label, details), actor_links as (actor_id,
+    label, event_id) and source_links as (source_id, title, url,
+    published_date, event_id). Nodes are written as they are first seen
+    (actors and sources are deduplicated with IdSet bitmaps) and edges
+    are spooled to a temporary file until the nodes are done. Returns the
+    number of nodes and edges written.
+    """
+    nodes = edges = 0
+    with (
+        open(output_path, 'w', encoding='utf-8') as out,
+        tempfile.TemporaryFile('w+', encoding='utf-8') as edge_file,
+    ):
+
+        def add_edge(source, target):
+            nonlocal edges
+            edge_file.write(
+                f'      <edge source="{source}" target="{target}" '
+                f'id="{edges}" />\n'
+            )
+            edges += 1
 
-    rows = fetch_joined_tuples(date_from)
-    G = build_graph(rows)
-    write_graph_to_gexf(G, output_path)
+        out.write(GEXF_HEADER)
+        for event_id, label, details in events:
+            out.write(
+                gexf_node(
+                    f'event_{event_id}', label, details=details, role='event'
+                )
+            )
+            nodes += 1
+
+        actors = IdSet()
+        for actor_id, label, event_id in actor_links:
+            if actors.add(actor_id):
+                out.write(gexf_node(f'actor_{actor_id}', label, role='actor'))
+                nodes += 1
+            add_edge(f'actor_{actor_id}', f'event_{event_id}')
+
+        sources = IdSet()
+        for source_id, title, url, published_date, event_id in source_links:
+            if sources.add(source_id):
+                out.write(
+                    gexf_node(
+                        f'source_{source_id}',
+                        title,
+                        url=url,
+                        published_date=published_date,
+                        role='source',
+                    )
+                )
+                nodes += 1
+            add_edge(f'event_{event_id}', f'source_{source_id}')
+
+        out.write('    </nodes>\n    <edges>\n')
+        edge_file.seek(0)
+        shutil.copyfileobj(edge_file, out)
+        out.write('    </edges>\n  </graph>\n</gexf>\n')
+    print(f'GEXF saved at {output_path} ({nodes} nodes, {edges} edges)')
+    return nodes, edges
+
+
+def stream_gexf(date_from, output_path, db=None, batch_size=GEXF_BATCH_SIZE):
+    """
+    Write the graph build_graph would make from fetch_joined_tuples
+    straight to a GEXF file, without holding the join or a NetworkX graph
+    in memory. Events, actor links and source links are each read in
+    batches through a server-side cursor, so the actors x sources rows of
+    the five-way join are never produced. The three queries run in one
+    read-only transaction that sees a single database snapshot, so a load
+    committing meanwhile cannot leave edges to unwritten events. Returns
+    the number of nodes and edges written.
+    """
+    db = db or default_database()
+    with db.connection() as conn:
+        conn.execute(
+            'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY'
+        )
+        return write_gexf_stream(
+            output_path,
+            streamed_rows(
+                conn, 'gexf_events', EVENT_NODES_QUERY, date_from, batch_size
+            ),
+            streamed_rows(
+                conn, 'gexf_actors', ACTOR_EDGES_QUERY, date_from, batch_size
+            ),
+            streamed_rows(
+                conn,
+                'gexf_sources',
+                SOURCE_EDGES_QUERY,
+                date_from,
+                batch_size,
+            ),
+        )
+
+
+GEXF_DATE_FROM = '2025-01-01'
+GEXF_PATH = 'src/knowledge_graph.gexf'
+
+
+def run_stage(
+    date_from=GEXF_DATE_FROM,
+    output_path=GEXF_PATH,
+    stream=GEXF_STREAM,
+    snapshot=GEXF_SNAPSHOT,
+    analytics=GEXF_ANALYTICS,
+):
+    """
+    Pipeline stage: export the knowledge graph from the database. With
+    stream, the graph is written by stream_gexf in bounded memory. With
+    snapshot, the graph store is synced with the database's new rows and
+    the graph is exported from it. With analytics, the actor analytics of
+    src/actor_analytics.py are computed from the graph store and written
+    next to the graph.
+    """
+    store = None
+    if snapshot or analytics:
+        # graph_store and actor_analytics build on this module
+        from src.graph_store import GraphStore
+
+        store = GraphStore()
+        store.sync()
+    if snapshot:
+        store.export_gexf(output_path, date_from)
+    elif stream:
+        stream_gexf(date_from, output_path)
+    else:
+        rows = fetch_joined_tuples(date_from)
+        G = build_graph(rows)
+        write_graph_to_gexf(G, output_path)
+    if analytics:
+        from src.actor_analytics import export_analytics
+
+        export_analytics(store, date_from)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    run_stage(
+        stream=GEXF_STREAM or '--stream' in args,
+        snapshot=GEXF_SNAPSHOT or '--snapshot' in args,
+        analytics=GEXF_ANALYTICS or '--analytics' in args,
+    )
@@ -0,0 +1,467 @@
+import itertools
+import os
+import sys
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.db import default_database
+from src.extract_gexf import write_gexf_stream
+
+# Default location of the knowledge-graph snapshot
+GRAPH_STORE_PATH = 'src/data/temp_data/graph_store.npz'
+
+# Array types of the non-text column kinds
+DTYPES = {'int': np.int64, 'date': 'datetime64[D]'}
+
+# Start time of the oldest transaction open in this database, our own
+# included. Rows written by a transaction that had not committed when a
+# sync read the database have updated_at at or after it. Sessions of other
+# roles are only listed with pg_read_all_stats; step5 writes as DB_USER.
+SYNC_FROM_QUERY = """
+    SELECT min(xact_start) FROM pg_stat_activity
+    WHERE datname = current_database() AND xact_start IS NOT NULL
+"""
+# Compares before every timestamp, in Postgres and as text
+NEVER_SYNCED = '-infinity'
+
+
+class StringTable:
+    """
+    Strings packed into one UTF-8 buffer with an offsets array, so a
+    table of n strings is two NumPy arrays instead of n Python objects.
+    """
+
+    def __init__(self, offsets=None, blob=None):
+        self.offsets = (
+            np.zeros(1, dtype=np.int64) if offsets is None else offsets
+        )
+        self.blob = np.zeros(0, dtype=np.uint8) if blob is None else blob
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [(s or '').encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8).copy()
+        return cls(offsets, blob)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        data = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in itertools.pairwise(offsets):
+            yield data[start:end].decode('utf-8')
+
+    def take(self, indices):
+        """The strings at indices, as a new table."""
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.offsets[indices]
+        lengths = self.offsets[indices + 1] - starts
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # Byte positions of every kept string, gathered in one step
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(
+            offsets[-1]
+        )
+        return StringTable(offsets, self.blob[positions])
+
+    def concat(self, other):
+        return StringTable(
+            np.concatenate(
+                [self.offsets, other.offsets[1:] + self.offsets[-1]]
+            ),
+            np.concatenate([self.blob, other.blob]),
+        )
+
+
+class Table:
+    """
+    Column arrays of one database table, keyed by its id column. Integer
+    and date columns are NumPy arrays, text columns StringTables.
+    """
+
+    def __init__(self, spec, columns=None):
+        self.spec = spec
+        self.columns = columns or {
+            name: StringTable()
+            if kind == 'str'
+            else np.zeros(0, dtype=DTYPES[kind])
+            for name, kind in spec.columns
+        }
+
+    @classmethod
+    def from_rows(cls, spec, rows):
+        values = list(zip(*rows)) or [()] * len(spec.columns)
+        columns = {}
+        for (name, kind), column in zip(spec.columns, values):
+            if kind == 'str':
+                columns[name] = StringTable.from_strings(column)
+            else:
+                columns[name] = np.array(column, dtype=DTYPES[kind])
+        return cls(spec, columns)
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def take(self, indices):
+        return Table(
+            self.spec,
+            {
+                name: column.take(indices)
+                for name, column in self.columns.items()
+            },
+        )
+
+    def concat(self, other):
+        return Table(
+            self.spec,
+            {
+                name: column.concat(other.columns[name])
+                if isinstance(column, StringTable)
+                else np.concatenate([column, other.columns[name]])
+                for name, column in self.columns.items()
+            },
+        )
+
+    def arrays(self):
+        """Flat name -> array mapping for np.savez."""
+        arrays = {}
+        for name, column in self.columns.items():
+            key = f'{self.spec.name}.{name}'
+            if isinstance(column, StringTable):
+                arrays[key + '.offsets'] = column.offsets
+                arrays[key + '.blob'] = column.blob
+            else:
+                arrays[key] = column
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, spec, arrays):
+        columns = {}
+        for name, kind in spec.columns:
+            key = f'{spec.name}.{name}'
+            if kind == 'str':
+                columns[name] = StringTable(
+                    arrays[key + '.offsets'], arrays[key + '.blob']
+                )
+            else:
+                columns[name] = arrays[key]
+        return cls(spec, columns)
+
+
+class TableSpec:
+    def __init__(self, name, columns, where='TRUE'):
+        self.name = name
+        self.columns = columns
+        self.where = where
+
+    @property
+    def select(self):
+        names = ', '.join(name for name, _ in self.columns)
+        return f'SELECT {names} FROM {self.name} WHERE {self.where}'
+
+
+# Every table has a SERIAL id and an updated_at column set by each write
+TABLE_SPECS = [
+    TableSpec('actors', [('id', 'int'), ('label', 'str')]),
+    TableSpec(
+        'events',
+        [
+            ('id', 'int'),
+            ('event_date', 'date'),
+            ('label', 'str'),
+            ('details', 'str'),
+        ],
+    ),
+    TableSpec(
+        'sources',
+        [
+            ('id', 'int'),
+            ('published_date', 'date'),
+            ('title', 'str'),
+            ('url', 'str'),
+        ],
+    ),
+    TableSpec(
+        'event_actors',
+        [('id', 'int'), ('event_id', 'int'), ('actor_id', 'int')],
+    ),
+    TableSpec(
+        'event_sources',
+        [('id', 'int'), ('event_id', 'int'), ('source_id', 'int')],
+        where='event_id IS NOT NULL AND source_id IS NOT NULL',
+    ),
+]
+
+
+class GraphStore:
+    """
+    On-disk snapshot of the knowledge graph (actors, events, sources and
+    the links between them) as NumPy arrays in one .npz file.
+
+    sync() applies what changed in the database since the last sync. Each
+    sync records the start time of the oldest transaction still open when
+    it read the database; the next one fetches the rows whose updated_at
+    is at or after that time. Rows written by transactions that commit out
+    of order, or that update a row in place, are therefore picked up too.
+    Deletions are detected by counting rows: when the count differs from
+    the snapshot, the ids are compared and the deleted ones dropped (and
+    the table reloaded if ids are missing, which only happens when rows
+    were written outside step5). If a table's ids went backwards past the
+    high-water mark (the database was re-initialized), the table is
+    reloaded. rebuild() reloads everything.
+
+    Exports and neighborhood queries are served from the snapshot without
+    touching the database.
+    """
+
+    def __init__(self, path=GRAPH_STORE_PATH):
+        self.path = path
+        self.tables = {spec.name: Table(spec) for spec in TABLE_SPECS}
+        self.high_water = {spec.name: 0 for spec in TABLE_SPECS}
+        self.synced_from = NEVER_SYNCED
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with np.load(self.path) as arrays:
+            for spec in TABLE_SPECS:
+                self.tables[spec.name] = Table.from_arrays(spec, arrays)
+                self.high_water[spec.name] = int(
+                    arrays[f'{spec.name}.high_water']
+                )
+            if 'synced_from' in arrays:
+                self.synced_from = str(arrays['synced_from'])
+
+    def save(self):
+        arrays = {}
+        for name, table in self.tables.items():
+            arrays.update(table.arrays())
+            arrays[f'{name}.high_water'] = np.int64(self.high_water[name])
+        arrays['synced_from'] = np.str_(self.synced_from)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Written next to the snapshot and swapped in, so a failed save
+        # leaves the previous snapshot intact
+        tmp_path = f'{self.path}.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, self.path)
+
+    def sync(self, db=None):
+        """
+        Apply the database's changes since the last sync and save the
+        snapshot. Returns the number of rows added and removed.
+        """
+        db = db or default_database()
+        added = updated = removed = 0
+        with db.connection() as conn, conn.cursor() as cur:
+            # Read before the snapshot below is taken, so every transaction
+            # that snapshot cannot see started at or after this time
+            cur.execute(SYNC_FROM_QUERY)
+            synced_from = str(cur.fetchone()[0])
+            conn.commit()
+            # All tables are read from one consistent database snapshot
+            cur.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            for spec in TABLE_SPECS:
+                table = self.tables[spec.name]
+                mark = self.high_water[spec.name]
+                cur.execute(
+                    f'SELECT count(*), max(id) FROM {spec.name} '
+                    f'WHERE {spec.where}'
+                )
+                count, max_id = cur.fetchone()
+                since = self.synced_from
+                if (max_id or 0) < mark:
+                    # Ids went backwards: the table was recreated
+                    removed += len(table)
+                    table, mark, since = Table(spec), 0, NEVER_SYNCED
+                cur.execute(
+                    f'{spec.select} AND updated_at >= %s ORDER BY id',
+                    (since,),
+                )
+                delta = Table.from_rows(spec, cur.fetchall())
+                known = np.isin(delta['id'], table['id'])
+                added += int((~known).sum())
+                updated += int(known.sum())
+                table = table.take(
+                    np.flatnonzero(~np.isin(table['id'], delta['id']))
+                ).concat(delta)
+                if len(table) != count:
+                    cur.execute(
+                        f'SELECT id FROM {spec.name} WHERE {spec.where}'
+                    )
+                    live = np.array(
+                        [row[0] for row in cur.fetchall()], dtype=np.int64
+                    )
+                    keep = np.isin(table['id'], live)
+                    removed += int((~keep).sum())
+                    table = table.take(np.flatnonzero(keep))
+                    if len(table) < count:
+                        # Rows written without updated_at: reload the table
+                        cur.execute(f'{spec.select} ORDER BY id')
+                        reloaded = Table.from_rows(spec, cur.fetchall())
+                        added += len(reloaded) - len(table)
+                        table = reloaded
+                table = table.take(np.argsort(table['id'], kind='stable'))
+                self.tables[spec.name] = table
+                self.high_water[spec.name] = max(mark, max_id or 0)
+        self.synced_from = synced_from
+        self.save()
+        print(
+            f'Graph store synced: {added} rows added, {updated} updated, '
+            f'{removed} removed'
+        )
+        return added, removed
+
+    def rebuild(self, db=None):
+        """Drop the snapshot and reload every table."""
+        self.tables = {spec.name: Table(spec) for spec in TABLE_SPECS}
+        self.high_water = {spec.name: 0 for spec in TABLE_SPECS}
+        self.synced_from = NEVER_SYNCED
+        return self.sync(db)
+
+    def _positions(self, table, ids):
+        """Row positions in table of ids, which must all be present."""
+        table_ids = self.tables[table]['id']
+        order = np.argsort(table_ids)
+        return order[np.searchsorted(table_ids, ids, sorter=order)]
+
+    def selected_events(self, date_from):
+        """
+        Positions of the events fetch_joined_tuples would return: dated
+        date_from or later, with at least one actor and one source.
+        """
+        events = self.tables['events']
+        selected = (
+            (events['event_date'] >= np.datetime64(date_from, 'D'))
+            & np.isin(events['id'], self.tables['event_actors']['event_id'])
+            & np.isin(events['id'], self.tables['event_sources']['event_id'])
+        )
+        return np.flatnonzero(selected)
+
+    def export_gexf(self, output_path, date_from):
+        """
+        Write the graph of the events dated date_from or later to a GEXF
+        file, in the same form as extract_gexf.stream_gexf.
+        """
+        events = self.tables['events']
+        actors = self.tables['actors']
+        sources = self.tables['sources']
+        event_actors = self.tables['event_actors']
+        event_sources = self.tables['event_sources']
+        selected = self.selected_events(date_from)
+        event_ids = events['id'][selected]
+
+        def event_rows():
+            for position in selected:
+                yield (
+                    int(events['id'][position]),
+                    events['label'][position],
+                    events['details'][position] or None,
+                )
+
+        def actor_rows():
+            links = np.flatnonzero(
+                np.isin(event_actors['event_id'], event_ids)
+            )
+            actor_ids = event_actors['actor_id'][links]
+            positions = self._positions('actors', actor_ids)
+            for link, actor_id, position in zip(links, actor_ids, positions):
+                yield (
+                    int(actor_id),
+                    actors['label'][position],
+                    int(event_actors['event_id'][link]),
+                )
+
+        def source_rows():
+            links = np.flatnonzero(
+                np.isin(event_sources['event_id'], event_ids)
+            )
+            source_ids = event_sources['source_id'][links]
+            positions = self._positions('sources', source_ids)
+            for link, source_id, position in zip(links, source_ids, positions):
+                yield (
+                    int(source_id),
+                    sources['title'][position],
+                    sources['url'][position],
+                    sources['published_date'][position],
+                    int(event_sources['event_id'][link]),
+                )
+
+        return write_gexf_stream(
+            output_path, event_rows(), actor_rows(), source_rows()
+        )
+
+    def neighborhood(self, node, hops=1):
+        """
+        GEXF ids ('actor_7', 'event_3', ...) of the nodes within hops
+        links of node, which is included, ignoring link direction.
+        """
+        kind, id = node.rsplit('_', 1)
+        found = {
+            'actor': np.zeros(0, dtype=np.int64),
+            'event': np.zeros(0, dtype=np.int64),
+            'source': np.zeros(0, dtype=np.int64),
+        }
+        found[kind] = np.array([int(id)], dtype=np.int64)
+        frontier = dict(found)
+        event_actors = self.tables['event_actors']
+        event_sources = self.tables['event_sources']
+        for _ in range(hops):
+            reached = {
+                'event': np.concatenate(
+                    [
+                        event_actors['event_id'][
+                            np.isin(
+                                event_actors['actor_id'], frontier['actor']
+                            )
+                        ],
+                        event_sources['event_id'][
+                            np.isin(
+                                event_sources['source_id'], frontier['source']
+                            )
+                        ],
+                    ]
+                ),
+                'actor': event_actors['actor_id'][
+                    np.isin(event_actors['event_id'], frontier['event'])
+                ],
+                'source': event_sources['source_id'][
+                    np.isin(event_sources['event_id'], frontier['event'])
+                ],
+            }
+            frontier = {
+                kind: np.setdiff1d(ids, found[kind])
+                for kind, ids in reached.items()
+            }
+            found = {
+                kind: np.union1d(found[kind], frontier[kind]) for kind in found
+            }
+        return [f'{kind}_{id}' for kind, ids in found.items() for id in ids]
+
+
+def main(rebuild=False):
+    load_dotenv()
+    store = GraphStore()
+    if rebuild:
+        store.rebuild()
+    else:
+        store.sync()
+    for name, table in store.tables.items():
+        print(
+            f'{name}: {len(table)} rows, '
+            f'high-water mark {store.high_water[name]}'
+        )
+
+
+if __name__ == '__main__':
+    main(rebuild='--rebuild' in sys.argv[1:])
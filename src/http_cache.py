@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# Default location and limits of the scraped HTML cache
+HTTP_CACHE_PATH = 'src/data/temp_data/http_cache.sqlite'
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024
+HTTP_CACHE_TTL = 24 * 60 * 60
+
+CachedResponse = namedtuple(
+    'CachedResponse', ['body', 'etag', 'last_modified', 'expires_at']
+)
+
+
+class HTTPCache:
+    """
+    On-disk response cache keyed by URL.
+
+    Stores the response body with its ETag/Last-Modified validators. Entries
+    younger than their TTL are served without a request; older ones are
+    revalidated with a conditional GET. The total body size is capped and
+    the least recently used entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        path=HTTP_CACHE_PATH,
+        max_bytes=HTTP_CACHE_MAX_BYTES,
+        ttl=HTTP_CACHE_TTL,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS responses_last_access '
+                'ON responses (last_access)'
+            )
+
+    def get(self, url):
+        """Return the CachedResponse for url, or None if it is not cached."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT body, etag, last_modified, expires_at '
+                'FROM responses WHERE url = ?',
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                'UPDATE responses SET last_access = ? WHERE url = ?',
+                (time.time(), url),
+            )
+        return CachedResponse(*row)
+
+    def is_fresh(self, entry):
+        return entry.expires_at > time.time()
+
+    def conditional_headers(self, entry):
+        """Request headers that revalidate a cached entry."""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def put(self, url, body, etag=None, last_modified=None):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(url, body, etag, last_modified, expires_at, last_access, size) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    url,
+                    body,
+                    etag,
+                    last_modified,
+                    now + self.ttl,
+                    now,
+                    len(body),
+                ),
+            )
+            self._evict()
+
+    def refresh(self, url):
+        """Restart the TTL of an entry after a 304 Not Modified."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE responses SET expires_at = ?, last_access = ? '
+                'WHERE url = ?',
+                (now + self.ttl, now, url),
+            )
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM responses'
+            ).fetchone()[0]
+
+    def _evict(self):
+        # Drop least recently used entries until the size cap is met
+        total = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for url, size in self._conn.execute(
+            'SELECT url, size FROM responses ORDER BY last_access'
+        ):
+            if total <= self.max_bytes:
+                break
+            doomed.append((url,))
+            total -= size
+        self._conn.executemany('DELETE FROM responses WHERE url = ?', doomed)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,82 @@
+import json
+import os
+
+# Intermediate files passed between the pipeline stages
+ARTICLE_CONTENTS_PATH = 'src/data/temp_data/article_contents.jsonl'
+ARTICLE_ENTITIES_PATH = 'src/data/temp_data/article_entities.jsonl'
+GROUPED_EVENTS_PATH = 'src/data/temp_data/grouped_events_by_date.jsonl'
+NARRATIVE_PATH = 'src/data/reconstructed_narrative.jsonl'
+
+
+def legacy_json_path(path):
+    """The .json file an older run wrote in place of a .jsonl file."""
+    root, ext = os.path.splitext(path)
+    return root + '.json' if ext == '.jsonl' else path
+
+
+def iter_records(path):
+    """
+    Yield records from a JSONL file one line at a time.
+
+    If path does not exist, the legacy .json file next to it is read
+    instead. A legacy array yields its items and a legacy date-keyed object
+    yields {'date': ..., 'events': [...]} records.
+    """
+    if not os.path.exists(path) and os.path.exists(legacy_json_path(path)):
+        path = legacy_json_path(path)
+    if not path.endswith('.jsonl'):
+        yield from load_legacy_json(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_legacy_json(path):
+    """Records from a whole-file JSON array or date-keyed JSON object."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [
+            {'date': date, 'events': events} for date, events in data.items()
+        ]
+    return data
+
+
+def write_records(path, records, append=False):
+    """
+    Write records to a JSONL file as they are produced. records may be a
+    generator; each record is flushed to disk once written. Returns the
+    number of records written.
+    """
+    return sum(1 for _ in written_records(path, records, append))
+
+
+def written_records(path, records, append=False):
+    """Like write_records, but yield each record once it is on disk."""
+    with open(path, 'a' if append else 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            yield record
+
+
+def records_by_date(records):
+    """Turn {'date': ..., 'events': [...]} records back into a dict."""
+    return {record['date']: record['events'] for record in records}
+
+
+def compact_records(path, key='url'):
+    """
+    Rewrite a JSONL file keeping only the last record for each key, at the
+    position of that last record. Returns the number of records kept.
+    """
+    latest = {}
+    for record in iter_records(path):
+        latest.pop(record.get(key), None)
+        latest[record.get(key)] = record
+    tmp_path = path + '.tmp'
+    count = write_records(tmp_path, latest.values())
+    os.replace(tmp_path, path)
+    return count
@@ -0,0 +1,99 @@
+import json
+import os
+
+import google.genai as genai
+from google.genai import types
+from dotenv import load_dotenv
+
+from src.llm_client import MODEL
+
+# Job states reported by BatchBackend.state
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+_GEMINI_STATES = {
+    'JOB_STATE_SUCCEEDED': SUCCEEDED,
+    'JOB_STATE_PARTIALLY_SUCCEEDED': SUCCEEDED,
+    'JOB_STATE_FAILED': FAILED,
+    'JOB_STATE_CANCELLED': FAILED,
+    'JOB_STATE_EXPIRED': FAILED,
+}
+
+
+class BatchError(Exception):
+    """A single request inside a finished batch job failed."""
+
+
+class BatchBackend:
+    """
+    Where batch jobs run. A backend takes a list of requests (dicts with
+    'contents' and 'config', as built for LLMClient.submit), and later
+    returns one result per request, in submission order.
+    """
+
+    def submit(self, requests, display_name=None):
+        """Start a job for requests and return its name."""
+        raise NotImplementedError
+
+    def state(self, name):
+        """RUNNING, SUCCEEDED or FAILED."""
+        raise NotImplementedError
+
+    def results(self, name):
+        """Response text, or a BatchError, for each request of a job."""
+        raise NotImplementedError
+
+
+class GeminiBatchBackend(BatchBackend):
+    """Gemini Batch API jobs with inlined requests."""
+
+    def __init__(self, api_key=None, model=MODEL):
+        if api_key is None:
+            load_dotenv()
+            api_key = os.getenv('GEMINI_API_KEY')
+        self._client = genai.Client(api_key=api_key)
+        self.model = model
+
+    def submit(self, requests, display_name=None):
+        job = self._client.batches.create(
+            model=self.model,
+            src=[
+                types.InlinedRequest(
+                    contents=request['contents'], config=request.get('config')
+                )
+                for request in requests
+            ],
+            config=types.CreateBatchJobConfig(display_name=display_name),
+        )
+        return job.name
+
+    def state(self, name):
+        job = self._client.batches.get(name=name)
+        return _GEMINI_STATES.get(job.state.name, RUNNING)
+
+    def results(self, name):
+        job = self._client.batches.get(name=name)
+        results = []
+        for response in job.dest.inlined_responses or []:
+            if response.error or response.response is None:
+                results.append(BatchError(str(response.error)))
+            else:
+                results.append(response.response.text)
+        return results
+
+
+def load_batch_state(path):
+    """Jobs submitted by an earlier run that have not been merged yet."""
+    if not os.path.exists(path):
+        return {'jobs': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_batch_state(path, state):
+    # Write then rename, so a crash never leaves a truncated state file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
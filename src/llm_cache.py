@@ -0,0 +1,129 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# Default location and size cap of the LLM response cache
+LLM_CACHE_PATH = 'src/data/temp_data/llm_cache.sqlite'
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_key(model, prompt, schema, content):
+    """Hash of everything that determines an LLM response."""
+    payload = json.dumps(
+        [model, prompt, schema, content], ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent memoization of LLM responses, keyed by a hash of
+    (model, prompt, schema, content).
+
+    Each entry is tagged with the prompt version it was produced under so
+    that all results of an old prompt can be dropped at once. Total stored
+    size is capped and least recently used entries are evicted first.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    prompt_version TEXT,
+                    value TEXT NOT NULL,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS responses_last_access '
+                'ON responses (last_access)'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS responses_prompt_version '
+                'ON responses (prompt_version)'
+            )
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT value FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                'UPDATE responses SET last_access = ? WHERE key = ?',
+                (time.time(), key),
+            )
+        return json.loads(row[0])
+
+    def put(self, key, value, prompt_version=None):
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, prompt_version, value, last_access, size) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (
+                    key,
+                    prompt_version,
+                    encoded,
+                    time.time(),
+                    len(encoded.encode('utf-8')),
+                ),
+            )
+            self._evict()
+
+    def invalidate_prompt_version(self, prompt_version):
+        """Drop every entry produced under prompt_version."""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                'DELETE FROM responses WHERE prompt_version = ?',
+                (prompt_version,),
+            )
+        return cur.rowcount
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses'
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': size,
+        }
+
+    def _evict(self):
+        # Drop least recently used entries until the size cap is met
+        total = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute(
+            'SELECT key, size FROM responses ORDER BY last_access'
+        ):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', doomed)
+
+    def close(self):
+        self._conn.close()
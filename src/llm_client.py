@@ -0,0 +1,203 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import google.genai as genai
+from google.genai import errors, types
+from dotenv import load_dotenv
+
+MODEL = 'gemini-2.5-flash'
+
+# Rate limits and concurrency, overridable from the environment
+REQUESTS_PER_MINUTE = int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '60'))
+TOKENS_PER_MINUTE = int(os.getenv('GEMINI_TOKENS_PER_MINUTE', '250000'))
+MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+def estimate_tokens(text):
+    """Rough token count used to charge the tokens-per-minute bucket."""
+    return max(1, len(text) // 4)
+
+
+def is_retryable(error):
+    return isinstance(error, errors.APIError) and (
+        error.code == 429 or error.code >= 500
+    )
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket refilled continuously at rate_per_minute, holding
+    at most one minute's worth of tokens.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.tokens = float(rate_per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        # A single request larger than the bucket waits for a full bucket
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def charge(self, amount):
+        """Take tokens after the fact, e.g. once real usage is known."""
+        self._refill()
+        self.tokens -= amount
+
+
+class LLMClient:
+    """
+    Shared Gemini execution layer for the pipeline stages.
+
+    Holds one genai client and runs requests on a background event loop,
+    so synchronous stage code can submit many requests and collect them in
+    input order. Requests are throttled by requests-per-minute and
+    tokens-per-minute buckets and capped at max_concurrency in flight; 429
+    and 5xx responses are retried with jittered exponential backoff. When a
+    cache is given, responses are memoized by the caller's cache_key.
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        model=MODEL,
+        requests_per_minute=REQUESTS_PER_MINUTE,
+        tokens_per_minute=TOKENS_PER_MINUTE,
+        max_concurrency=MAX_CONCURRENCY,
+        max_retries=MAX_RETRIES,
+        backoff_base=BACKOFF_BASE,
+        base_url=None,
+        cache=None,
+    ):
+        if api_key is None:
+            load_dotenv()
+            api_key = os.getenv('GEMINI_API_KEY')
+        http_options = (
+            types.HttpOptions(base_url=base_url) if base_url else None
+        )
+        self._client = genai.Client(api_key=api_key, http_options=http_options)
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.cache = cache
+        self.retries = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name='llm-client', daemon=True
+        )
+        self._thread.start()
+        self._request_bucket = TokenBucket(requests_per_minute)
+        self._token_bucket = TokenBucket(tokens_per_minute)
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def generate(
+        self,
+        contents,
+        config=None,
+        model=None,
+        cache_key=None,
+        prompt_version=None,
+    ):
+        """Return the response text for one request."""
+        if self.cache and cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        estimate = estimate_tokens(contents)
+        for attempt in range(self.max_retries + 1):
+            await self._request_bucket.acquire()
+            await self._token_bucket.acquire(estimate)
+            try:
+                async with self._slots:
+                    response = await self._client.aio.models.generate_content(
+                        model=model or self.model,
+                        config=config,
+                        contents=contents,
+                    )
+                break
+            except errors.APIError as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = min(BACKOFF_MAX, self.backoff_base * 2**attempt)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+        usage = response.usage_metadata
+        if usage and usage.total_token_count:
+            self._token_bucket.charge(usage.total_token_count - estimate)
+        text = response.text
+        if self.cache and cache_key and text is not None:
+            self.cache.put(cache_key, text, prompt_version=prompt_version)
+        return text
+
+    def submit(self, contents, **kwargs):
+        """Schedule a request; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(
+            self.generate(contents, **kwargs), self._loop
+        )
+
+    def run(self, contents, **kwargs):
+        """Blocking single request."""
+        return self.submit(contents, **kwargs).result()
+
+    def map(self, items, to_request, window=None):
+        """
+        Run to_request(item) for each item concurrently and yield
+        (item, text) pairs in input order. A failed request yields the
+        exception in place of the text. items is consumed lazily, at most
+        window requests ahead of the one being yielded.
+        """
+        window = window or 2 * self.max_concurrency
+        pending = deque()
+        for item in items:
+            pending.append((item, self.submit(**to_request(item))))
+            if len(pending) >= window:
+                yield self._collect(*pending.popleft())
+        while pending:
+            yield self._collect(*pending.popleft())
+
+    def _collect(self, item, future):
+        try:
+            return item, future.result()
+        except Exception as e:
+            return item, e
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def default_client():
+    """The process-wide LLMClient shared by the pipeline stages."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = LLMClient()
+        return _default_client
@@ -0,0 +1,158 @@
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from src.unification import UnionFind, blocking_keys, normalize_name
+
+# Trailing tokens that do not tell two names apart, e.g. 'पोखरा, नेपाल'
+GENERIC_SUFFIXES = {'नेपाल', 'nepal'}
+
+# MinHash/LSH settings: NUM_PERM = LSH_BANDS * rows per band. With 16
+# bands of 4 rows, pairs above ~0.5 Jaccard similarity usually collide in
+# some band; candidates are then checked against DEDUP_THRESHOLD exactly.
+NUM_PERM = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 3
+DEDUP_THRESHOLD = 0.8
+
+_PRIME = (1 << 32) + 15
+_NUMBER = re.compile(r'\d+')
+
+
+def match_key(name):
+    """Normalized name without generic trailing tokens."""
+    tokens = normalize_name(name).split()
+    while len(tokens) > 1 and tokens[-1] in GENERIC_SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def numbers(key):
+    """
+    Numeric tokens of a match key. Devanagari digits are already ASCII
+    there, so 'वडा नं. १०' and 'वडा नं 10' give the same numbers.
+    """
+    return tuple(_NUMBER.findall(key))
+
+
+def shingles(key, size=SHINGLE_SIZE):
+    """Character n-grams of a match key, padded at both ends."""
+    padded = f' {key} '
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i : i + size] for i in range(len(padded) - size + 1)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class MinHasher:
+    """MinHash signatures of shingle sets over num_perm hash functions."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=0):
+        rng = np.random.default_rng(seed)
+        # a < 2**31 keeps a * hash + b inside 64 bits
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_set):
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode('utf-8')) for s in shingle_set),
+            dtype=np.uint64,
+            count=len(shingle_set),
+        )
+        values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % (
+            _PRIME
+        )
+        return values.min(axis=1)
+
+
+def lsh_candidate_pairs(signatures, bands=LSH_BANDS):
+    """
+    Pairs of indexes whose signatures agree on every row of at least one
+    band.
+    """
+    pairs = set()
+    if not signatures:
+        return pairs
+    rows = len(signatures[0]) // bands
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for index, signature in enumerate(signatures):
+            part = signature[band * rows : (band + 1) * rows].tobytes()
+            buckets[part].append(index)
+        for members in buckets.values():
+            for i, first in enumerate(members):
+                for second in members[i + 1 :]:
+                    pairs.add((first, second))
+    return pairs
+
+
+_default_hasher = None
+
+
+def lsh_keys(name, bands=LSH_BANDS):
+    """
+    LSH bucket of a name's match key in each band, as 'band:hex' strings.
+    Names meeting in a bucket are the pairs dedupe_names compares.
+    """
+    global _default_hasher
+    if _default_hasher is None:
+        _default_hasher = MinHasher()
+    signature = _default_hasher.signature(shingles(match_key(name)))
+    rows = len(signature) // bands
+    return [
+        f'{band}:{signature[band * rows : (band + 1) * rows].tobytes().hex()}'
+        for band in range(bands)
+    ]
+
+
+def name_keys(name):
+    """
+    Keys under which a name can be found as a candidate duplicate: its
+    blocking keys (for the LLM buckets) and its LSH buckets (for
+    dedupe_names).
+    """
+    return {f'b:{key}' for key in blocking_keys(name)} | {
+        f'l:{key}' for key in lsh_keys(name)
+    }
+
+
+def dedupe_names(names, preferred=(), threshold=DEDUP_THRESHOLD):
+    """
+    Collapse obvious duplicates without the LLM. Names with the same match
+    key (Devanagari-normalized, punctuation, case and generic suffixes
+    ignored) are merged, and so are keys whose character n-gram Jaccard
+    similarity reaches threshold, found through MinHash/LSH, as long as
+    they carry the same numbers: 'Ward 4' and 'Ward 5' are different
+    places however alike they look. Returns
+    {representative: [names]}; the representative of a group is a
+    preferred name when it has one, otherwise its shortest name.
+    """
+    preferred = set(preferred)
+    by_key = defaultdict(list)
+    for name in sorted(set(names)):
+        by_key[match_key(name)].append(name)
+    keys = sorted(by_key)
+    groups = UnionFind()
+    for key in keys:
+        groups.find(key)
+    key_shingles = [shingles(key) for key in keys]
+    hasher = MinHasher()
+    signatures = [hasher.signature(s) for s in key_shingles]
+    for first, second in lsh_candidate_pairs(signatures):
+        if numbers(keys[first]) != numbers(keys[second]):
+            continue
+        if jaccard(key_shingles[first], key_shingles[second]) >= threshold:
+            groups.union(keys[first], keys[second])
+    result = {}
+    for group_keys in groups.groups():
+        members = sorted(name for key in group_keys for name in by_key[key])
+        representative = min(
+            members, key=lambda n: (n not in preferred, len(n), n)
+        )
+        result[representative] = members
+    return dict(sorted(result.items()))
@@ -0,0 +1,223 @@
+"""
+In-process pipeline runner.
+
+The steps run as a DAG of stages in one interpreter. Each stage runs on its
+own thread and passes records to the next stage through a bounded queue, so
+stages overlap and a slow stage holds back the ones feeding it instead of
+letting records pile up in memory. Every stage still writes its usual
+output file, so any stage can also be run on its own from the files left by
+an earlier run:
+
+    uv run -m src.pipeline              # the whole pipeline
+    uv run -m src.pipeline step4        # only step4
+    uv run -m src.pipeline step3 step4  # step3 feeding step4 in memory
+"""
+
+import queue
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from src import (
+    extract_gexf,
+    step1_scrape_and_preprocess_articles as step1,
+    step2_extract_events as step2,
+    step3_clean_extracted_events as step3,
+    step4_create_narrative as step4,
+    step5_insert_narratives_into_db as step5,
+)
+
+# Records buffered between two stages
+QUEUE_SIZE = 64
+
+_END = object()
+
+
+class PipelineError(Exception):
+    """A stage stopped because another stage failed."""
+
+
+class Stage:
+    """
+    One pipeline step. run is called with the iterator of records from the
+    input stage, or with no arguments when input is None or the input
+    stage is not part of the run (it then reads its input file). It
+    returns an iterable of output records, or None for a sink. The stage
+    starts only once every stage in after has finished.
+    """
+
+    def __init__(self, name, run, input=None, after=()):
+        self.name = name
+        self.run = run
+        self.input = input
+        self.after = after
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.records_in = 0
+        self.records_out = 0
+        self.started = None
+        self.finished = None
+        self.error = None
+
+    @property
+    def seconds(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    @property
+    def throughput(self):
+        """Output records per second."""
+        return self.records_out / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        status = f'  FAILED: {self.error!r}' if self.error else ''
+        return (
+            f'{self.name:<6} {self.seconds:9.2f} s  '
+            f'in {self.records_in:>7}  out {self.records_out:>7}  '
+            f'{self.throughput:9.1f} records/s{status}'
+        )
+
+
+class _Running:
+    # Per-run state of one stage
+    def __init__(self, stage, queue_size):
+        self.stage = stage
+        self.stats = StageStats(stage.name)
+        self.inbox = queue.Queue(queue_size)
+        self.consumers = []
+        self.done = threading.Event()
+
+
+STAGES = [
+    Stage('step1', step1.run_stage),
+    Stage('step2', step2.run_stage, input='step1'),
+    Stage('step3', step3.run_stage, input='step2'),
+    Stage('step4', step4.run_stage, input='step3'),
+    # step5 reloads actors.json, which step3 writes before finishing
+    Stage('step5', step5.run_stage, input='step4', after=('step3',)),
+    Stage('gexf', extract_gexf.run_stage, after=('step5',)),
+]
+
+
+class Pipeline:
+    def __init__(self, stages=STAGES, queue_size=QUEUE_SIZE):
+        self.stages = {stage.name: stage for stage in stages}
+        self.queue_size = queue_size
+        self.stats = []
+        self._failed = threading.Event()
+
+    def run(self, names=None):
+        """
+        Run the named stages (all by default) and return their StageStats
+        in stage order, also kept in self.stats. If a stage fails the
+        others are stopped and its error is raised.
+        """
+        names = list(names or self.stages)
+        unknown = [name for name in names if name not in self.stages]
+        if unknown:
+            raise ValueError(f'Unknown stages: {", ".join(unknown)}')
+        self._failed.clear()
+        running = {
+            name: _Running(stage, self.queue_size)
+            for name, stage in self.stages.items()
+            if name in names
+        }
+        for item in running.values():
+            if item.stage.input in running:
+                running[item.stage.input].consumers.append(item)
+        threads = [
+            threading.Thread(
+                target=self._run_stage,
+                args=(item, running),
+                name=f'stage-{item.stage.name}',
+                daemon=True,
+            )
+            for item in running.values()
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stats = [item.stats for item in running.values()]
+        errors = [stats.error for stats in self.stats if stats.error]
+        # Report the stage that failed, not the ones it stopped
+        for error in errors:
+            if not isinstance(error, PipelineError):
+                raise error
+        if errors:
+            raise errors[0]
+        return self.stats
+
+    def _run_stage(self, item, running):
+        stats = item.stats
+        try:
+            for name in item.stage.after:
+                if name in running:
+                    running[name].done.wait()
+            if self._failed.is_set():
+                raise PipelineError('Not started, another stage failed')
+            stats.started = time.perf_counter()
+            if item.stage.input in running:
+                outputs = item.stage.run(self._receive(item))
+            else:
+                outputs = item.stage.run()
+            for record in outputs or ():
+                stats.records_out += 1
+                for consumer in item.consumers:
+                    self._send(consumer, record)
+        except BaseException as e:
+            stats.error = e
+            self._failed.set()
+        finally:
+            if stats.started is not None:
+                stats.finished = time.perf_counter()
+            item.done.set()
+            for consumer in item.consumers:
+                self._send(consumer, _END)
+
+    def _receive(self, item):
+        while True:
+            try:
+                record = item.inbox.get(timeout=0.1)
+            except queue.Empty:
+                if self._failed.is_set():
+                    raise PipelineError('Stopped, another stage failed')
+                continue
+            if record is _END:
+                if self._failed.is_set():
+                    raise PipelineError('Stopped, another stage failed')
+                return
+            item.stats.records_in += 1
+            yield record
+
+    def _send(self, consumer, record):
+        # Records for a consumer that has stopped are dropped rather than
+        # blocking the producer on a full queue
+        while not consumer.done.is_set():
+            try:
+                consumer.inbox.put(record, timeout=0.1)
+                return
+            except queue.Full:
+                if self._failed.is_set() and record is not _END:
+                    raise PipelineError('Stopped, another stage failed')
+
+
+def main(names=None):
+    load_dotenv()
+    pipeline = Pipeline()
+    try:
+        pipeline.run(names)
+    finally:
+        print('\n=== Stage timings ===')
+        for stats in pipeline.stats:
+            print(stats)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or None)
@@ -1,14 +1,84 @@
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
+import lxml.html
+from lxml.etree import ParserError
 import datetime
+import functools
+import re
 import nepali_datetime
+import os
+import multiprocessing
+from collections import defaultdict, deque
+from itertools import islice
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from src.checkpoint import Checkpoint, input_hash
+from src.http_cache import HTTPCache
+from src.jsonl_io import ARTICLE_CONTENTS_PATH, written_records
+
+# Concurrency limits for the fetch stage
+MAX_CONCURRENT_FETCHES = 16
+MAX_FETCHES_PER_HOST = 4
+FETCH_RETRIES = 3
+FETCH_BACKOFF_FACTOR = 0.5
+
+# Process pool for the CPU-bound parse/normalize stage (None = all cores)
+PARSE_PROCESSES = None
+PARSE_CHUNKSIZE = 8
+
+
+def make_session(
+    pool_size=MAX_CONCURRENT_FETCHES,
+    retries=FETCH_RETRIES,
+    backoff_factor=FETCH_BACKOFF_FACTOR,
+):
+    """
+    Build a requests session with pooled keep-alive connections that retries
+    connection errors and 429/5xx responses with exponential backoff.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
 
-def fetch_url_content(url):
+def fetch_url_content(url, session=None, cache=None):
     try:
-        response = requests.get(url, timeout=10)
+        cached = cache.get(url) if cache else None
+        if cached and cache.is_fresh(cached):
+            return cached.body.decode('utf-8', errors='replace')
+        headers = cache.conditional_headers(cached) if cached else {}
+        response = (session or requests).get(url, timeout=10, headers=headers)
+        if response.status_code == 304 and cached:
+            cache.refresh(url)
+            return cached.body.decode('utf-8', errors='replace')
         response.raise_for_status()
+        if cache:
+            cache.put(
+                url,
+                response.content,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
         # Always decode as UTF-8 to avoid mojibake
         return response.content.decode('utf-8', errors='replace')
     except Exception as e:
@@ -16,7 +86,122 @@ def fetch_url_content(url):
         return None
 
 
+def fetch_urls_concurrently(
+    urls,
+    max_workers=MAX_CONCURRENT_FETCHES,
+    per_host_limit=MAX_FETCHES_PER_HOST,
+    session=None,
+    cache=None,
+):
+    """
+    Fetch urls on a thread pool and yield (url, html) pairs as each download
+    finishes. At most max_workers requests are in flight overall and at most
+    per_host_limit against any single host. A url is only submitted once
+    its host has a free slot, so a host with many urls cannot hold the
+    workers while other hosts wait.
+    """
+    session = session or make_session(pool_size=max_workers)
+    waiting = defaultdict(deque)
+    for url in urls:
+        waiting[urlsplit(url).netloc].append(url)
+    in_flight = defaultdict(int)
+    # Hosts with waiting urls and a free slot, served round-robin
+    ready = deque(waiting)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        while ready or running:
+            while ready and len(running) < max_workers:
+                host = ready.popleft()
+                url = waiting[host].popleft()
+                future = pool.submit(fetch_url_content, url, session, cache)
+                running[future] = host, url
+                in_flight[host] += 1
+                if waiting[host] and in_flight[host] < per_host_limit:
+                    ready.append(host)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                host, url = running.pop(future)
+                in_flight[host] -= 1
+                if waiting[host] and in_flight[host] == per_host_limit - 1:
+                    ready.append(host)
+                yield url, future.result()
+
+
+def _has_class(class_name):
+    # XPath equivalent of BeautifulSoup's class_= match on one class
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+_TITLE_XPATH = f'(//h1[{_has_class("entry-title")}])[1]'
+_DATE_XPATH = f'((//div[{_has_class("ok-news-post-hour")}])[1]//span)[1]'
+_CONTENT_XPATH = f'(//div[{_has_class("ok18-single-post-content-wrap")}])[1]'
+# BeautifulSoup does not count the contents of these tags as text
+_NON_TEXT_TAGS = {'script', 'style', 'template'}
+
+
+def _stripped_text(element):
+    """
+    Same result as BeautifulSoup's get_text(strip=True) for an lxml element.
+    """
+    # lxml parses the children of <template>, but BeautifulSoup still
+    # reports no text for them
+    if any(a.tag in _NON_TEXT_TAGS for a in element.iterancestors()):
+        return ''
+    parts = []
+
+    def walk(node):
+        if not isinstance(node.tag, str) or node.tag in _NON_TEXT_TAGS:
+            return
+        parts.append(node.text)
+        for child in node:
+            walk(child)
+            parts.append(child.tail)
+
+    walk(element)
+    return ''.join(part.strip() for part in parts if part)
+
+
+def extract_title_and_content_fast(html):
+    """
+    Read the title, published date and content with targeted XPath queries
+    on an lxml tree instead of building a BeautifulSoup tree. Returns None
+    if lxml cannot parse the document.
+    """
+    try:
+        doc = lxml.html.document_fromstring(html)
+    except (ParserError, ValueError):
+        return None
+
+    title_tags = doc.xpath(_TITLE_XPATH)
+    title = _stripped_text(title_tags[0]) if title_tags else ''
+
+    date_tags = doc.xpath(_DATE_XPATH)
+    published_date = _stripped_text(date_tags[0]) if date_tags else ''
+
+    content_divs = doc.xpath(_CONTENT_XPATH)
+    if content_divs:
+        paragraphs = content_divs[0].iter('p')
+    else:
+        # fallback: get all <p> tags
+        paragraphs = doc.iter('p')
+    content = '\n'.join(_stripped_text(p) for p in paragraphs)
+
+    return title, published_date, content
+
+
 def extract_title_and_content(html):
+    extracted = extract_title_and_content_fast(html) if html else None
+    if extracted is None:
+        extracted = extract_title_and_content_full(html)
+    return extracted
+
+
+def extract_title_and_content_full(html):
+    """
+    Full-tree BeautifulSoup extraction, used as the fallback for pages the
+    fast path cannot parse.
+    """
     soup = BeautifulSoup(html, 'lxml')
     # Get title from <h1 class="entry-title">
     title_tag = soup.find('h1', class_='entry-title')
@@ -44,71 +229,113 @@ def extract_title_and_content(html):
     return title, published_date, content
 
 
+NEPALI_MONTHS = {
+    'बैशाख': 1,
+    'जेठ': 2,
+    'असार': 3,
+    'साउन': 4,
+    'भदौ': 5,
+    'आश्विन': 6,
+    'कार्तिक': 7,
+    'मंसिर': 8,
+    'पुष': 9,
+    'माघ': 10,
+    'फागुन': 11,
+    'चैत्र': 12,
+    'Baisakh': 1,
+    'Jestha': 2,
+    'Ashar': 3,
+    'Shrawan': 4,
+    'Bhadra': 5,
+    'Ashwin': 6,
+    'Kartik': 7,
+    'Mangsir': 8,
+    'Poush': 9,
+    'Magh': 10,
+    'Falgun': 11,
+    'Chaitra': 12,
+}
+ENGLISH_DAYS = [
+    'Sunday',
+    'Monday',
+    'Tuesday',
+    'Wednesday',
+    'Thursday',
+    'Friday',
+    'Saturday',
+]
+NEPALI_DAY_MAP = dict(
+    zip(
+        [
+            'आइतबार',
+            'सोमबार',
+            'मंगलबार',
+            'बुधबार',
+            'बिहीबार',
+            'शुक्रबार',
+            'शनिबार',
+        ],
+        ENGLISH_DAYS,
+    )
+)
+
+_DIGIT = r'[१२३४५६७८९०\d]'
+_WORD = r'[\w\u0900-\u097F]'
+_MONTH = '|'.join(sorted(map(re.escape, NEPALI_MONTHS), key=len, reverse=True))
+
+_PUBLISHED_TIME_PATTERN = re.compile(r'[\d१२३४५६७८९०]{1,2}:\d{2}')
+_PUBLISHED_DATE_PATTERN = re.compile(
+    r'([१२३४५६७८९०\d]{4})\s*([\w\u0900-\u097F]+)\s*([१२३४५६७८९०\d]{1,2})'
+)
+
+# The three date forms, rewritten in this order, each pass over the output
+# of the previous one. A "word" includes digits and every Devanagari sign
+# (the danda too), and a candidate is only rewritten when its word is a
+# month name, so e.g. "साउन५मा" is read as साउन 5.
+_YMD_PATTERN = re.compile(
+    rf'({_DIGIT}{{4}})\s*({_WORD}+)\s*({_DIGIT}{{1,2}})\s*गते?'
+)
+_MD_PATTERN = re.compile(rf'({_WORD}+)\s*({_DIGIT}{{1,2}})')
+_DM_PATTERN = re.compile(rf'({_DIGIT}{{1,2}})\s*({_WORD}+)')
+_WEEKDAY_PATTERN = re.compile('|'.join(NEPALI_DAY_MAP))
+# No pass can rewrite a text without a month name in it
+_MONTH_PATTERN = re.compile(_MONTH)
+
+
+@functools.lru_cache(maxsize=4096)
+def _bs_to_ad(year, month, day):
+    """
+    Memoized BS -> AD conversion. Returns (nepali_date, gregorian_date), or
+    the exception message if the date does not exist.
+    """
+    try:
+        ndt = nepali_datetime.date(year, month, day)
+        return ndt, ndt.to_datetime_date()
+    except Exception as e:
+        return str(e)
+
+
 def parse_nepali_date(date_str):
     """
     Parse a Nepali date string and return (nepali_datetime.date, gregorian_date, day_name) or (None, None, None) if parsing fails.
     """
-    nepali_months = {
-        'बैशाख': 1,
-        'जेठ': 2,
-        'असार': 3,
-        'साउन': 4,
-        'भदौ': 5,
-        'आश्विन': 6,
-        'कार्तिक': 7,
-        'मंसिर': 8,
-        'पुष': 9,
-        'माघ': 10,
-        'फागुन': 11,
-        'चैत्र': 12,
-        'Baisakh': 1,
-        'Jestha': 2,
-        'Ashar': 3,
-        'Shrawan': 4,
-        'Bhadra': 5,
-        'Ashwin': 6,
-        'Kartik': 7,
-        'Mangsir': 8,
-        'Poush': 9,
-        'Magh': 10,
-        'Falgun': 11,
-        'Chaitra': 12,
-    }
-    import re
-
     date_part = date_str.split('गते')[0].strip()
-    date_part = re.sub(r'[\d१२३४५६७८९०]{1,2}:\d{2}', '', date_part).strip()
-    nepali_date_pattern = re.compile(
-        r'([१२३४५६७८९०\d]{4})\s*([\w\u0900-\u097F]+)\s*([१२३४५६७८९०\d]{1,2})'
-    )
-    m = nepali_date_pattern.search(date_part)
+    date_part = _PUBLISHED_TIME_PATTERN.sub('', date_part).strip()
+    m = _PUBLISHED_DATE_PATTERN.search(date_part)
     if m:
-
-        def dev_to_ascii(s):
-            dev_map = str.maketrans('०१२३४५६७८९', '0123456789')
-            return s.translate(dev_map)
-
-        year = int(dev_to_ascii(m.group(1)))
+        year = int(m.group(1))
         month_raw = m.group(2).strip()
-        day = int(dev_to_ascii(m.group(3)))
-        month = nepali_months.get(month_raw, None)
+        day = int(m.group(3))
+        month = NEPALI_MONTHS.get(month_raw, None)
         if month:
-            try:
-                ndt = nepali_datetime.date(year, month, day)
-                gdt = ndt.to_datetime_date()
-                nepali_days = [
-                    'Sunday',
-                    'Monday',
-                    'Tuesday',
-                    'Wednesday',
-                    'Thursday',
-                    'Friday',
-                    'Saturday',
-                ]
-                day_name = nepali_days[ndt.weekday()]
-                return ndt, gdt, day_name
-            except Exception as e:
-                print(f'[DEBUG] Exception in nepali_datetime.date: {e}')
+            converted = _bs_to_ad(year, month, day)
+            if isinstance(converted, str):
+                print(
+                    f'[DEBUG] Exception in nepali_datetime.date: {converted}'
+                )
+            else:
+                ndt, gdt = converted
+                return ndt, gdt, ENGLISH_DAYS[ndt.weekday()]
     return None, None, None
 
 
@@ -140,176 +367,226 @@ def get_gregorian_and_day(date_str):
     return gdt, day_name
 
 
+@functools.lru_cache(maxsize=4096)
+def _format_ad_date(year, month, day):
+    converted = _bs_to_ad(year, month, day)
+    if isinstance(converted, str):
+        print(f'[DEBUG] Exception in replace_date_match: {converted}')
+        return None
+    gdt = converted[1]
+    return f'{gdt.strftime("%Y-%m-%d")} ({gdt.strftime("%A")})'
+
+
 def replace_dates_and_days_in_text(text):
     """
     Find Nepali month/day/year mentions in text, replace with Gregorian date and English weekday.
     Also replace Nepali weekday names with English.
     """
-    import re
-
-    # Nepali months and days
-    nepali_months = {
-        'बैशाख': 1,
-        'जेठ': 2,
-        'असार': 3,
-        'साउन': 4,
-        'भदौ': 5,
-        'आश्विन': 6,
-        'कार्तिक': 7,
-        'मंसिर': 8,
-        'पुष': 9,
-        'माघ': 10,
-        'फागुन': 11,
-        'चैत्र': 12,
-        'Baisakh': 1,
-        'Jestha': 2,
-        'Ashar': 3,
-        'Shrawan': 4,
-        'Bhadra': 5,
-        'Ashwin': 6,
-        'Kartik': 7,
-        'Mangsir': 8,
-        'Poush': 9,
-        'Magh': 10,
-        'Falgun': 11,
-        'Chaitra': 12,
-    }
-    nepali_days = [
-        'आइतबार',
-        'सोमबार',
-        'मंगलबार',
-        'बुधबार',
-        'बिहीबार',
-        'शुक्रबार',
-        'शनिबार',
-    ]
-    english_days = [
-        'Sunday',
-        'Monday',
-        'Tuesday',
-        'Wednesday',
-        'Thursday',
-        'Friday',
-        'Saturday',
-    ]
-    nepali_day_map = dict(zip(nepali_days, english_days))
-
-    # Replace Nepali weekday names with English
-    for np_day, en_day in nepali_day_map.items():
-        # if re.search(np_day, text):
-        # print(f"[DEBUG] Replacing Nepali weekday '{np_day}' with '{en_day}'")
-        text = re.sub(np_day, en_day, text)
-
-    # Regex for Nepali date: year month day, month day, or day month (Devanagari or ASCII digits)
-    # Handles: YYYY month DD, month DD, DD month, with or without whitespace
-    date_patterns = [
-        re.compile(
-            r'([१२३४५६७८९०\d]{4})\s*([\w\u0900-\u097F]+)\s*([१२३४५६७८९०\d]{1,2})\s*गते?'
-        ),  # YYYY month DD
-        re.compile(
-            r'([\w\u0900-\u097F]+)\s*([१२३४५६७८९०\d]{1,2})'
-        ),  # month DD
-        re.compile(
-            r'([१२३४५६७८९०\d]{1,2})\s*([\w\u0900-\u097F]+)'
-        ),  # DD month
-    ]
-
-    def dev_to_ascii(s):
-        dev_map = str.maketrans('०१२३४५६७८९', '0123456789')
-        return s.translate(dev_map)
-
-    def replace_date_match(m, order):
-        try:
-            # print(f"[DEBUG] Date match: {m.groups()} | order: {order}")
-            if order == 'ymd':
-                year = int(dev_to_ascii(m.group(1)))
-                month_raw = m.group(2).strip()
-                day = int(dev_to_ascii(m.group(3)))
-            elif order == 'md':
-                year = nepali_datetime.date.today().year
-                month_raw = m.group(1).strip()
-                day = int(dev_to_ascii(m.group(2)))
-            elif order == 'dm':
-                year = nepali_datetime.date.today().year
-                day = int(dev_to_ascii(m.group(1)))
-                month_raw = m.group(2).strip()
-            else:
-                return m.group(0)
-            # print(f"[DEBUG] Parsed: year={year}, month_raw={month_raw}, day={day}")
-            month = nepali_months.get(month_raw, None)
-            # print(f"[DEBUG] Mapped month: {month}")
-            if month:
-                ndt = nepali_datetime.date(year, month, day)
-                gdt = ndt.to_datetime_date()
-                weekday = gdt.strftime('%A')
-                # print(f"[DEBUG] Replacing Nepali date with: {gdt.strftime('%Y-%m-%d')} ({weekday})")
-                return f'{gdt.strftime("%Y-%m-%d")} ({weekday})'
-        except Exception as e:
-            print(f'[DEBUG] Exception in replace_date_match: {e}')
-        return m.group(0)
-
-    # Replace all Nepali date mentions with Gregorian date and weekday
-    # 1. YYYY month DD
-    text = date_patterns[0].sub(lambda m: replace_date_match(m, 'ymd'), text)
-    # 2. month DD
-    text = date_patterns[1].sub(lambda m: replace_date_match(m, 'md'), text)
-    # 3. DD month
-    text = date_patterns[2].sub(lambda m: replace_date_match(m, 'dm'), text)
-
-    return text
+    text = _WEEKDAY_PATTERN.sub(lambda m: NEPALI_DAY_MAP[m.group(0)], text)
+    if not _MONTH_PATTERN.search(text):
+        return text
+    current_year = None
+
+    def convert(m, year, month_raw, day):
+        nonlocal current_year
+        month = NEPALI_MONTHS.get(month_raw)
+        if not month:
+            return m.group(0)
+        if year is None:
+            # Dates without a year are taken to be in the current BS year
+            if current_year is None:
+                current_year = nepali_datetime.date.today().year
+            year = current_year
+        return _format_ad_date(int(year), month, int(day)) or m.group(0)
+
+    text = _YMD_PATTERN.sub(lambda m: convert(m, *m.groups()), text)
+    text = _MD_PATTERN.sub(lambda m: convert(m, None, *m.groups()), text)
+    return _DM_PATTERN.sub(
+        lambda m: convert(m, None, m.group(2), m.group(1)), text
+    )
+
+
+_TIME_CONCEPTS = {
+    'गत': 'last',
+    # Add more replacements here as needed
+}
+_TIME_CONCEPTS_PATTERN = re.compile('|'.join(_TIME_CONCEPTS))
 
 
 def replace_time_concepts(text):
     """
     Replace Nepali time-related words/phrases with English equivalents.
-    Expandable for more words later.
+    Expandable for more words later by adding to _TIME_CONCEPTS.
     """
-    replacements = {
-        'गत': 'last',
-        # Add more replacements here as needed
+    return _TIME_CONCEPTS_PATTERN.sub(
+        lambda m: _TIME_CONCEPTS[m.group(0)], text
+    )
+
+
+def preprocess_article(url, html):
+    """
+    Turn the raw HTML of one article into a normalized article record.
+    """
+    if html:
+        title, published_date_raw, content = extract_title_and_content(html)
+    else:
+        title, published_date_raw, content = '', '', ''
+    gdt, day = get_gregorian_and_day(published_date_raw)
+    published_date = f'{gdt.strftime("%Y-%m-%d")} ({day})' if gdt else ''
+    # Replace Nepali dates, days, and time concepts in content
+    content_replaced = replace_dates_and_days_in_text(content)
+    content_replaced = replace_time_concepts(content_replaced)
+    return {
+        'url': url,
+        'title': title,
+        'published_date': published_date,
+        'content': content_replaced,
     }
-    import re
-
-    for np_word, en_word in replacements.items():
-        text = re.sub(np_word, en_word, text)
-    return text
-
-
-def main():
-    df = pd.read_csv('src/data/temp_data/articles.csv')
-    results = []
-    for url in df['url']:
-        print(f'Fetching: {url}')
-        html = fetch_url_content(url)
-        if html:
-            title, published_date_raw, content = extract_title_and_content(
-                html
+
+
+def _preprocess_chunk(chunk):
+    return [preprocess_article(url, html) for url, html in chunk]
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def preprocess_articles_in_parallel(
+    fetched, processes=PARSE_PROCESSES, chunksize=PARSE_CHUNKSIZE
+):
+    """
+    Parse and normalize (url, html) pairs on a process pool and yield article
+    records as chunks finish. fetched is consumed lazily, so a streaming
+    fetcher keeps feeding the pool while earlier pages are being parsed; at
+    most two chunks per worker are queued at a time.
+    """
+    workers = processes or os.cpu_count() or 1
+    pending = set()
+    # spawn rather than fork: the fetch threads are still running
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for chunk in _chunked(fetched, chunksize):
+            pending.add(pool.submit(_preprocess_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            else:
+                done = {future for future in pending if future.done()}
+                pending -= done
+            for future in done:
+                yield from future.result()
+        for future in as_completed(pending):
+            yield from future.result()
+
+
+ARTICLE_URLS_PATH = 'src/data/temp_data/articles.csv'
+
+
+def read_article_urls(path=ARTICLE_URLS_PATH):
+    df = pd.read_csv(path)
+    return list(df['url'])
+
+
+def scrape_articles(
+    urls,
+    concurrent=True,
+    max_workers=MAX_CONCURRENT_FETCHES,
+    per_host_limit=MAX_FETCHES_PER_HOST,
+    cache=None,
+    parse_processes=PARSE_PROCESSES,
+):
+    """Fetch, parse and normalize urls, yielding article records."""
+    if concurrent:
+        # Pages are parsed as soon as they arrive, in completion order
+        fetched = fetch_urls_concurrently(
+            urls,
+            max_workers=max_workers,
+            per_host_limit=per_host_limit,
+            cache=cache,
+        )
+    else:
+        fetched = ((url, fetch_url_content(url, cache=cache)) for url in urls)
+    if parse_processes == 1:
+        records = (preprocess_article(url, html) for url, html in fetched)
+    else:
+        records = preprocess_articles_in_parallel(
+            fetched, processes=parse_processes
+        )
+    for record in records:
+        print(f'Processed: {record["url"]}')
+        yield record
+
+
+def run_stage(
+    urls=None,
+    concurrent=True,
+    max_workers=MAX_CONCURRENT_FETCHES,
+    per_host_limit=MAX_FETCHES_PER_HOST,
+    use_cache=True,
+    parse_processes=PARSE_PROCESSES,
+    incremental=True,
+):
+    """
+    Pipeline stage: scrape urls (by default those in articles.csv), append
+    the article records to article_contents.jsonl and yield them. With
+    incremental, URLs scraped by an earlier run are not fetched again and
+    their stored records are yielded instead.
+    """
+    if urls is None:
+        urls = read_article_urls()
+    cache = HTTPCache() if use_cache else None
+
+    def scrape(urls):
+        return scrape_articles(
+            urls,
+            concurrent=concurrent,
+            max_workers=max_workers,
+            per_host_limit=per_host_limit,
+            cache=cache,
+            parse_processes=parse_processes,
+        )
+
+    try:
+        if incremental:
+            checkpoint = Checkpoint('step1', ARTICLE_CONTENTS_PATH, key='url')
+            # Articles that could not be fetched are retried on the next run
+            yield from checkpoint.stream(
+                urls,
+                input_hash,
+                scrape,
+                done=lambda record: bool(record['content']),
+                key_fn=lambda url: url,
             )
+            checkpoint.close()
+            print(f'Skipped {checkpoint.skipped} articles scraped earlier')
         else:
-            title, published_date_raw, content = '', '', ''
-        gdt, day = get_gregorian_and_day(published_date_raw)
-        published_date = f'{gdt.strftime("%Y-%m-%d")} ({day})' if gdt else ''
-        # Replace Nepali dates, days, and time concepts in content
-        content_replaced = replace_dates_and_days_in_text(content)
-        content_replaced = replace_time_concepts(content_replaced)
-        results.append(
-            {
-                'url': url,
-                'title': title,
-                'published_date': published_date,
-                'content': content_replaced,
-            }
-        )
-    # Save results to a JSON file
-    import json
-
-    with open(
-        'src/data/temp_data/article_contents.json', 'w', encoding='utf-8'
-    ) as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    print(
-        'Done. Saved to src/temp_data/article_contents.csv and src/temp_data/article_contents.json'
+            yield from written_records(ARTICLE_CONTENTS_PATH, scrape(urls))
+    finally:
+        if cache:
+            cache.close()
+
+
+def main(
+    concurrent=True,
+    max_workers=MAX_CONCURRENT_FETCHES,
+    per_host_limit=MAX_FETCHES_PER_HOST,
+    use_cache=True,
+    parse_processes=PARSE_PROCESSES,
+    incremental=True,
+):
+    records = run_stage(
+        concurrent=concurrent,
+        max_workers=max_workers,
+        per_host_limit=per_host_limit,
+        use_cache=use_cache,
+        parse_processes=parse_processes,
+        incremental=incremental,
     )
+    # Each record is appended to the JSONL file as soon as it is ready
+    count = sum(1 for _ in records)
+    print(f'Done. Saved {count} articles to {ARTICLE_CONTENTS_PATH}')
 
 
 if __name__ == '__main__':
@@ -1,130 +1,352 @@
-from time import sleep
-import google.genai as genai
 from google.genai import types
 from dotenv import load_dotenv
-import os
 import json
+import sys
+import time
+from itertools import zip_longest
+from src.checkpoint import CHECKPOINT_DIR, Checkpoint, input_hash
+from src.jsonl_io import (
+    ARTICLE_CONTENTS_PATH,
+    ARTICLE_ENTITIES_PATH,
+    iter_records,
+)
+from src.llm_batch import (
+    FAILED,
+    SUCCEEDED,
+    GeminiBatchBackend,
+    load_batch_state,
+    save_batch_state,
+)
+from src.llm_cache import LLMCache, cache_key
+from src.llm_client import LLMClient, default_client
 
 
-def call_gemini_llm(article, prompt):
-    event_extraction_schema = {
-        'title': 'Event Extraction Schema',
-        'type': 'array',
-        'items': {
-            'type': 'object',
-            'properties': {
-                'event': {
-                    'type': 'string',
-                    'description': 'Short title or label for the event',
-                },
-                'actors': {
-                    'type': 'array',
-                    'items': {'type': 'string'},
-                    'description': 'People, organizations, or groups directly involved in the event. Do not include generic terms, and actors that do not play a significant role in the event should be excluded.',
-                },
-                'event_date': {
-                    'type': 'string',
-                    'format': 'YYYY-MM-DD',
-                    'description': 'date of the event occurence, use the published date as a reference for constructing the date if not explicitly mentioned',
-                },
-                'event_time': {
-                    'type': ['string', 'null'],
-                    'description': 'time in 24-hour format, or null if unknown',
-                },
-                'location': {
-                    'type': 'array',
-                    'items': {'type': 'string'},
-                    'description': 'List of places associated with the event.',
-                },
-                'details': {
-                    'type': 'string',
-                    'description': 'A short summary of the event, including role of actors, location, and other relevant details',
-                },
+MODEL = 'gemini-2.5-flash'
+# Bump when the extraction prompt changes meaning, to stop reusing cached
+# extractions made with the old prompt
+PROMPT_VERSION = '1'
+
+# Batch mode: articles per batch job, seconds between status polls, and
+# where submitted-but-unmerged jobs are remembered between runs
+BATCH_CHUNK_SIZE = 500
+BATCH_POLL_INTERVAL = 60
+BATCH_STATE_PATH = 'src/data/temp_data/batch_state.json'
+
+EVENT_EXTRACTION_SCHEMA = {
+    'title': 'Event Extraction Schema',
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'event': {
+                'type': 'string',
+                'description': 'Short title or label for the event',
+            },
+            'actors': {
+                'type': 'array',
+                'items': {'type': 'string'},
+                'description': 'People, organizations, or groups directly involved in the event. Do not include generic terms, and actors that do not play a significant role in the event should be excluded.',
+            },
+            'event_date': {
+                'type': 'string',
+                'format': 'YYYY-MM-DD',
+                'description': 'date of the event occurence, use the published date as a reference for constructing the date if not explicitly mentioned',
+            },
+            'event_time': {
+                'type': ['string', 'null'],
+                'description': 'time in 24-hour format, or null if unknown',
+            },
+            'location': {
+                'type': 'array',
+                'items': {'type': 'string'},
+                'description': 'List of places associated with the event.',
+            },
+            'details': {
+                'type': 'string',
+                'description': 'A short summary of the event, including role of actors, location, and other relevant details',
             },
-            'required': [
-                'event',
-                'actors',
-                'event_date',
-                'details',
-                'location',
-            ],
         },
+        'required': [
+            'event',
+            'actors',
+            'event_date',
+            'details',
+            'location',
+        ],
+    },
+}
+
+
+EXTRACTION_PROMPT = """You are an expert in event extraction from Nepali news articles.
+
+    Given the article title, published date, and content below, extract all distinct events. Reply in the same language as the article, Nepali.
+    Only return information that is relevant to the event and the main article.
+    Here is the article metadata and content:
+    """
+
+
+def build_extraction_request(article, prompt):
+    """Keyword arguments for LLMClient.submit for one article."""
+    return {
+        # The new google-genai expects a single string prompt
+        'contents': f'{prompt}\n\n{article.get("content", "")}',
+        'config': types.GenerateContentConfig(
+            response_mime_type='application/json',
+            response_json_schema=EVENT_EXTRACTION_SCHEMA,
+            temperature=0.0,
+        ),
+        'model': MODEL,
+        'cache_key': cache_key(
+            MODEL, prompt, EVENT_EXTRACTION_SCHEMA, article.get('content', '')
+        ),
+        'prompt_version': PROMPT_VERSION,
     }
 
-    client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
+
+def parse_entities(text):
+    # Try to parse the response as JSON, fallback to text
     try:
-        # The new google-genai expects a single string prompt
-        full_prompt = f'{prompt}\n\n{article.get("content", "")}'
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json',
-                response_json_schema=event_extraction_schema,
-                temperature=0.0,
-            ),
-            contents=full_prompt,
-        )
+        entities = text
+        if entities.strip().startswith('{') or entities.strip().startswith(
+            '['
+        ):
+            entities = json.loads(entities)
+    except Exception:
+        entities = text
+    return entities
+
 
-        # Try to parse the response as JSON, fallback to text
-        try:
-            entities = response.text
-            if entities.strip().startswith('{') or entities.strip().startswith(
-                '['
-            ):
-                import json as _json
-
-                entities = _json.loads(entities)
-        except Exception:
-            entities = response.text
-        return {'entities': entities}
+def call_gemini_llm(article, prompt, llm=None):
+    llm = llm or default_client()
+    try:
+        text = llm.run(**build_extraction_request(article, prompt))
+        return {'entities': parse_entities(text)}
     except Exception as e:
         print(f'Gemini API error: {e}')
         return {'entities': []}
 
 
-def main():
-    # Load environment variables from .env
-    load_dotenv()
-    with open(
-        'src/data/temp_data/article_contents.json', 'r', encoding='utf-8'
-    ) as f:
-        articles = json.load(f)
+def minimal_article(article):
+    # Only pass title, content, and published_date
+    return {
+        'title': article.get('title'),
+        'published_date': article.get('published_date'),
+        'content': article.get('content'),
+    }
 
-    prompt = """You are an expert in event extraction from Nepali news articles.
 
-    Given the article title, published date, and content below, extract all distinct events. Reply in the same language as the article, Nepali.
-    Only return information that is relevant to the event and the main article.
-    Here is the article metadata and content:
+def article_entities_record(article, entities):
+    return {
+        'title': article.get('title'),
+        'url': article.get('url'),
+        'published_date': article.get('published_date'),
+        'content': article.get('content'),
+        'entities': entities,
+    }
+
+
+def extract_articles_events(articles, prompt, llm=None):
+    """
+    Extract events for each article, with LLM calls running concurrently
+    under the client's rate limits. Records are yielded in input order.
+    """
+    llm = llm or default_client()
+    results = llm.map(
+        articles,
+        lambda article: build_extraction_request(
+            minimal_article(article), prompt
+        ),
+    )
+    for article, text in results:
+        print(f'Processed: {article.get("url")}')
+        if isinstance(text, Exception):
+            print(f'Gemini API error: {text}')
+            record = article_entities_record(article, [])
+            record['error'] = str(text)
+        else:
+            record = article_entities_record(article, parse_entities(text))
+        yield record
+
+
+def extraction_input_hash(article):
+    """Hash of what an article's extraction depends on."""
+    return input_hash([minimal_article(article), MODEL, PROMPT_VERSION])
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def extract_articles_events_batch(
+    articles,
+    prompt,
+    backend,
+    entities_path=ARTICLE_ENTITIES_PATH,
+    state_path=BATCH_STATE_PATH,
+    chunk_size=BATCH_CHUNK_SIZE,
+    poll_interval=BATCH_POLL_INTERVAL,
+    cache=None,
+    checkpoint_dir=CHECKPOINT_DIR,
+):
+    """
+    Extract events for many articles through batch jobs and merge the
+    results into entities_path by article URL.
+
+    Articles are skipped when the step2 checkpoint has them done with the
+    same content and prompt, the same rule run_stage follows, and when
+    they are found in the cache. The rest are packed into jobs of
+    chunk_size articles. Submitted jobs are recorded in state_path before
+    polling, so an interrupted run picks its jobs up again instead of
+    resubmitting them. Articles whose request or job failed are not
+    marked done and are retried by the next run.
+
+    Returns the number of articles merged and the URLs that failed.
     """
+    checkpoint = Checkpoint(
+        'step2', entities_path, key='url', directory=checkpoint_dir
+    )
+    pending = {
+        article.get('url'): article
+        for article in checkpoint.pending(articles, extraction_input_hash)
+    }
+
+    merged = 0
+    failed = []
+    if cache:
+        hits = []
+        for url, article in pending.items():
+            request = build_extraction_request(
+                minimal_article(article), prompt
+            )
+            text = cache.get(request['cache_key'])
+            if text is not None:
+                hits.append(
+                    article_entities_record(article, parse_entities(text))
+                )
+        merged += checkpoint.write(hits)
+        for record in hits:
+            del pending[record['url']]
+
+    state = load_batch_state(state_path)
+    in_flight = {url for urls in state['jobs'].values() for url in urls}
+    to_submit = [url for url in pending if url not in in_flight]
+    for chunk in _chunks(to_submit, chunk_size):
+        requests = [
+            build_extraction_request(minimal_article(pending[url]), prompt)
+            for url in chunk
+        ]
+        name = backend.submit(
+            [
+                {'contents': r['contents'], 'config': r['config']}
+                for r in requests
+            ],
+            display_name=f'step2-extraction-{len(state["jobs"])}',
+        )
+        state['jobs'][name] = chunk
+        save_batch_state(state_path, state)
+        print(f'Submitted batch job {name} with {len(chunk)} articles')
+
+    while state['jobs']:
+        running = False
+        for name, urls in list(state['jobs'].items()):
+            status = backend.state(name)
+            if status == FAILED:
+                print(f'Batch job {name} failed')
+                failed.extend(urls)
+            elif status == SUCCEEDED:
+                results = backend.results(name)
+                if len(results) != len(urls):
+                    print(
+                        f'Batch job {name} returned {len(results)} results '
+                        f'for {len(urls)} articles'
+                    )
+                records = []
+                # Articles left without a result are retried like failures
+                for url, text in zip_longest(urls, results[: len(urls)]):
+                    article = pending.get(url)
+                    if article is None:
+                        # Merged since the job was submitted
+                        continue
+                    if text is None or isinstance(text, Exception):
+                        failed.append(url)
+                        continue
+                    records.append(
+                        article_entities_record(article, parse_entities(text))
+                    )
+                    if cache:
+                        request = build_extraction_request(
+                            minimal_article(article), prompt
+                        )
+                        cache.put(
+                            request['cache_key'],
+                            text,
+                            prompt_version=PROMPT_VERSION,
+                        )
+                merged += checkpoint.write(records)
+                print(f'Merged batch job {name}: {len(records)} articles')
+            else:
+                running = True
+                continue
+            del state['jobs'][name]
+            save_batch_state(state_path, state)
+        if running:
+            time.sleep(poll_interval)
+    # Re-extracted articles replace their old records
+    checkpoint.close()
+    return merged, failed
+
 
-    results = []
-    for article in articles:
-        print(f'Processing: {article.get("url")}')
-        # Only pass title, content, and published_date
-        minimal_article = {
-            'title': article.get('title'),
-            'published_date': article.get('published_date'),
-            'content': article.get('content'),
-        }
-        response = call_gemini_llm(minimal_article, prompt)
-        results.append(
-            {
-                'title': minimal_article['title'],
-                'url': article.get('url'),
-                'published_date': minimal_article['published_date'],
-                'content': minimal_article['content'],
-                'entities': response.get('entities', []),
-            }
+def run_stage(articles=None, llm=None, cache=None):
+    """
+    Pipeline stage: extract events for articles (by default those in
+    article_contents.jsonl), append the records to article_entities.jsonl
+    and yield them. Articles extracted by an earlier run with the same
+    content and prompt are not sent again and their stored records are
+    yielded instead; failed extractions are retried on the next run.
+    """
+    if articles is None:
+        articles = iter_records(ARTICLE_CONTENTS_PATH)
+    owns_llm = llm is None
+    if owns_llm:
+        llm = LLMClient(cache=cache)
+    checkpoint = Checkpoint('step2', ARTICLE_ENTITIES_PATH, key='url')
+    try:
+        yield from checkpoint.stream(
+            articles,
+            extraction_input_hash,
+            lambda todo: extract_articles_events(todo, EXTRACTION_PROMPT, llm),
+            done=lambda record: 'error' not in record,
         )
-        sleep(1)
+        checkpoint.close()
+        print(f'Skipped {checkpoint.skipped} articles extracted earlier')
+        print(f'Extraction retries: {llm.retries}')
+    finally:
+        if owns_llm:
+            llm.close()
+
 
-    # Save extracted entities to a new JSON file
-    with open(
-        'src/data/temp_data/article_entities.json', 'w', encoding='utf-8'
-    ) as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    print('Done. Saved to src/data/temp_data/article_entities.json')
+def main(batch=False):
+    # Load environment variables from .env
+    load_dotenv()
+    cache = LLMCache()
+    if batch:
+        merged, failed = extract_articles_events_batch(
+            iter_records(ARTICLE_CONTENTS_PATH),
+            EXTRACTION_PROMPT,
+            GeminiBatchBackend(),
+            cache=cache,
+        )
+        print(f'Done. Merged {merged} articles into {ARTICLE_ENTITIES_PATH}')
+        if failed:
+            print(f'{len(failed)} articles failed; re-run to retry them')
+        cache.close()
+        return
+    count = sum(1 for _ in run_stage(cache=cache))
+    print(f'Done. Saved {count} articles to {ARTICLE_ENTITIES_PATH}')
+    print(f'Extraction cache: {cache.stats()}')
+    cache.close()
 
 
 if __name__ == '__main__':
-    main()
+    main(batch='--batch' in sys.argv[1:])
@@ -1,15 +1,16 @@
 import json
-from collections import defaultdict
-import google.genai as genai
-from google.genai import types
-from dotenv import load_dotenv
 import os
-
-# Load the extracted entities
-with open(
-    'src/data/temp_data/article_entities.json', 'r', encoding='utf-8'
-) as f:
-    articles = json.load(f)
+import sys
+from collections import defaultdict
+from src.alias_registry import AliasRegistry
+from src.jsonl_io import (
+    ARTICLE_ENTITIES_PATH,
+    GROUPED_EVENTS_PATH,
+    iter_records,
+    written_records,
+)
+from src.name_dedup import dedupe_names
+from src.unification import resolve_names, unify_names
 
 
 def get_unique_field_values(articles, field, is_list=False):
@@ -28,101 +29,184 @@ def get_unique_field_values(articles, field, is_list=False):
     return unique_values
 
 
-def prompt_gemini_for_unification(unique_items, prompt_text, output_file):
-    item_list = sorted(list(unique_items))
-    prompt = prompt_text + '\n' + '\n'.join(item_list)
-    load_dotenv()
-    api_key = os.getenv('GEMINI_API_KEY')
-    client = genai.Client(api_key=api_key)
-    try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json',
-                temperature=0.0,
-            ),
-            contents=prompt,
+def unify_all_names(unique_items, prompt_text, llm=None, offline=False):
+    """
+    Unify names with the LLM in bounded, concurrent chunks (see
+    src/unification.py) into a {canonical: [names]} mapping. Obvious
+    duplicates are collapsed locally first and only one name per group is
+    sent; with offline, the local grouping is the result.
+    """
+    groups = dedupe_names(unique_items)
+    print(f'{len(groups)} names left after local deduplication')
+    if offline:
+        return groups
+    unified = unify_names(groups, prompt_text, llm)
+    return {
+        canonical: sorted(
+            name for representative in names for name in groups[representative]
+        )
+        for canonical, names in unified.items()
+    }
+
+
+def prompt_gemini_for_unification(
+    unique_items, prompt_text, output_file, llm=None, offline=False
+):
+    """Unify names as unify_all_names does and save the mapping."""
+    mapping = unify_all_names(unique_items, prompt_text, llm, offline)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(mapping, f, ensure_ascii=False, indent=2)
+    print(f'Done. Saved unification mapping to {output_file}')
+    return mapping
+
+
+def resolve_new_names(
+    new_names, canonicals, prompt_text, llm=None, offline=False
+):
+    """
+    {new name: canonical} for names missing from the alias registry,
+    against canonicals, the existing canonical names they could match
+    (AliasRegistry.candidates). New names that are obvious duplicates of
+    each other or of a canonical name are resolved locally; one name per
+    remaining group is sent to the LLM, unless offline.
+    """
+    groups = dedupe_names(
+        set(new_names) | set(canonicals), preferred=canonicals
+    )
+    resolved = {}
+    unresolved = set()
+    for representative, members in groups.items():
+        for member in members:
+            if member in new_names:
+                resolved[member] = representative
+        if representative not in canonicals and representative in resolved:
+            unresolved.add(representative)
+    print(f'{len(unresolved)} groups of new names left for the LLM')
+    if unresolved and not offline:
+        by_llm = resolve_names(unresolved, canonicals, prompt_text, llm)
+        resolved = {
+            name: by_llm.get(target, target)
+            for name, target in resolved.items()
+        }
+    return resolved
+
+
+def update_alias_registry(
+    registry, kind, names, prompt_text, output_file, llm=None, offline=False
+):
+    """
+    Resolve only the names the alias registry has not seen before against
+    the existing canonical names they could match, record them, and save
+    the full {canonical: [names]} mapping to output_file. A registry with
+    no names of this kind is first seeded from output_file, when one
+    exists; with nothing to seed from, the whole name set is unified.
+    """
+    if not registry.count(kind) and os.path.exists(output_file):
+        with open(output_file, 'r', encoding='utf-8') as f:
+            registry.add_mapping(kind, json.load(f))
+    names = set(names)
+    if not registry.count(kind):
+        print(f'No known {kind} names, unifying all {len(names)}')
+        registry.add_mapping(
+            kind, unify_all_names(names, prompt_text, llm, offline)
+        )
+    else:
+        new_names = names - set(registry.lookup(kind, names))
+        print(
+            f'{len(names) - len(new_names)} known names, {len(new_names)} new'
         )
-        try:
-            mapping = response.text
-            if mapping.strip().startswith('{') or mapping.strip().startswith(
-                '['
-            ):
-                import json as _json
-
-                mapping = _json.loads(mapping)
-        except Exception:
-            mapping = response.text
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(mapping, f, ensure_ascii=False, indent=2)
-        print(f'Done. Saved unification mapping to {output_file}')
-        return mapping
-    except Exception as e:
-        print(f'Gemini API error: {e}')
-        return None
+        if new_names:
+            resolved = resolve_new_names(
+                new_names,
+                registry.candidates(kind, new_names),
+                prompt_text,
+                llm,
+                offline,
+            )
+            registry.add(kind, resolved)
+    mapping = registry.mapping(kind)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(mapping, f, ensure_ascii=False, indent=2)
+    print(f'Done. Saved unification mapping to {output_file}')
+    return mapping
+
+
+def build_alias_index(mapping):
+    """
+    Precompute an alias -> canonical name lookup from a {canonical:
+    [aliases]} mapping. When an alias is listed under several canonical
+    names the first one wins, as with a scan of the mapping in order.
+    """
+    index = {}
+    for canonical, variants in (mapping or {}).items():
+        if isinstance(variants, str):
+            variants = [variants]
+        for variant in variants:
+            index.setdefault(variant, canonical)
+    return index
 
 
 def canonicalize_actor(actor, actor_mapping):
-    if not actor_mapping:
-        return actor
-    for canonical, variants in actor_mapping.items():
-        if actor in variants:
-            return canonical
-    return actor
+    return build_alias_index(actor_mapping).get(actor, actor)
 
 
 def canonicalize_location(location, location_mapping):
-    if not location_mapping:
-        return location
-    for canonical, variants in location_mapping.items():
-        if location in variants:
-            return canonical
-    return location
+    return build_alias_index(location_mapping).get(location, location)
 
 
-def canonicalize_articles(articles, actor_mapping, location_mapping):
-    new_articles = []
-    for article in articles:
-        new_entities = []
-        for entity in article.get('entities', []):
-            # Canonicalize actors
-            actors = entity.get('actors', [])
-            new_actors = []
-            for actor in actors:
-                if isinstance(actor, str):
-                    new_actors.append(canonicalize_actor(actor, actor_mapping))
-                elif isinstance(actor, list):
-                    new_actors.extend(
-                        [
-                            canonicalize_actor(a, actor_mapping)
-                            for a in actor
-                            if isinstance(a, str)
-                        ]
-                    )
-            # Canonicalize location
-            location = entity.get('location')
-            if isinstance(location, str):
-                new_location = canonicalize_location(
-                    location, location_mapping
+def canonicalize_article(article, actor_index, location_index):
+    """
+    Replace actor and location names in an article's entities by their
+    canonical names. actor_index and location_index come from
+    build_alias_index.
+    """
+    new_entities = []
+    for entity in article.get('entities', []):
+        # Canonicalize actors
+        actors = entity.get('actors', [])
+        new_actors = []
+        for actor in actors:
+            if isinstance(actor, str):
+                new_actors.append(actor_index.get(actor, actor))
+            elif isinstance(actor, list):
+                new_actors.extend(
+                    [
+                        actor_index.get(a, a)
+                        for a in actor
+                        if isinstance(a, str)
+                    ]
                 )
-            elif isinstance(location, list):
-                # If location is a list, canonicalize each string
-                new_location = [
-                    canonicalize_location(loc, location_mapping)
-                    for loc in location
-                    if isinstance(loc, str)
-                ]
-            else:
-                new_location = location
-            # Copy entity and update
-            new_entity = dict(entity)
-            new_entity['actors'] = new_actors
-            new_entity['location'] = new_location
-            new_entities.append(new_entity)
-        new_article = dict(article)
-        new_article['entities'] = new_entities
-        new_articles.append(new_article)
-    return new_articles
+        # Canonicalize location
+        location = entity.get('location')
+        if isinstance(location, str):
+            new_location = location_index.get(location, location)
+        elif isinstance(location, list):
+            # If location is a list, canonicalize each string
+            new_location = [
+                location_index.get(loc, loc)
+                for loc in location
+                if isinstance(loc, str)
+            ]
+        else:
+            new_location = location
+        # Copy entity and update
+        new_entity = dict(entity)
+        new_entity['actors'] = new_actors
+        new_entity['location'] = new_location
+        new_entities.append(new_entity)
+    new_article = dict(article)
+    new_article['entities'] = new_entities
+    return new_article
+
+
+def canonicalize_articles(articles, actor_mapping, location_mapping):
+    # The alias indexes are built once and shared by every article
+    actor_index = build_alias_index(actor_mapping)
+    location_index = build_alias_index(location_mapping)
+    return [
+        canonicalize_article(article, actor_index, location_index)
+        for article in articles
+    ]
 
 
 def group_events_by_date(articles):
@@ -154,40 +238,82 @@ def group_events_by_date(articles):
     return grouped_by_date, per_date_events
 
 
-if __name__ == '__main__':
-    # Call Gemini to unify actor names and save mapping
+def run_stage(articles=None, registry=None, offline=False):
+    """
+    Pipeline stage: unify actor and location names across all articles
+    (by default those in article_entities.jsonl), group their events by
+    date, write grouped_events_by_date.jsonl and yield the date records.
+    Unification needs every article, so nothing is yielded until the
+    input is exhausted. Only names missing from the alias registry are
+    sent to the LLM. With offline, names are only deduplicated locally
+    and no LLM call is made.
+    """
+    if articles is None:
+        # Read the file once per pass rather than holding it in memory
+        def read_articles():
+            return iter_records(ARTICLE_ENTITIES_PATH)
+    else:
+        articles = list(articles)
+
+        def read_articles():
+            return articles
+
+    owns_registry = registry is None
+    if owns_registry:
+        registry = AliasRegistry()
+
+    # Call Gemini to resolve new actor names and save mapping
     print('Unifying actors...')
-    unique_actors = get_unique_field_values(articles, 'actors', is_list=True)
+    unique_actors = get_unique_field_values(
+        read_articles(), 'actors', is_list=True
+    )
     actor_prompt = (
         'Given the following list of actor names in Nepali, combine and reduce the set by merging different names that refer to the same actor. '
         "Return a key value pair such that the key is unified/canonical name, and the values are names that refer to the same actor, e.g.'Nepal Police' : 'Nepal Police', 'Nepal Police Force'"
     )
-    prompt_gemini_for_unification(
-        unique_actors, actor_prompt, 'src/data/actors.json'
+    update_alias_registry(
+        registry,
+        'actor',
+        unique_actors,
+        actor_prompt,
+        'src/data/actors.json',
+        offline=offline,
     )
 
     print('Unifying locations...')
     unique_locations = get_unique_field_values(
-        articles, 'location', is_list=True
+        read_articles(), 'location', is_list=True
     )
     location_prompt = (
         'Given the following list of location names in Nepali, combine and reduce the set by merging different names that refer to the same location. '
         "Return a key value pair such that the key is unified/canonical name, and the values are names that refer to the same actor, e.g.'पोखरा' : 'पोखरा', 'पोखरा, नेपाल'"
     )
-    prompt_gemini_for_unification(
-        unique_locations, location_prompt, 'src/data/locations.json'
+    update_alias_registry(
+        registry,
+        'location',
+        unique_locations,
+        location_prompt,
+        'src/data/locations.json',
+        offline=offline,
     )
+    if owns_registry:
+        registry.close()
 
     print('Unifying article contents...')
     with open('src/data/actors.json', 'r', encoding='utf-8') as f:
         actor_mapping = json.load(f)
     with open('src/data/locations.json', 'r', encoding='utf-8') as f:
         location_mapping = json.load(f)
-    articles_canonical = canonicalize_articles(
-        articles, actor_mapping, location_mapping
+    actor_index = build_alias_index(actor_mapping)
+    location_index = build_alias_index(location_mapping)
+    # Articles are streamed through canonicalization; only the grouping
+    # by date is held in memory
+    articles_canonical = (
+        canonicalize_article(article, actor_index, location_index)
+        for article in read_articles()
     )
 
-    # Group events by date using canonicalized articles, sort by date, and save only the final grouped events JSON
+    # Group events by date using canonicalized articles, sort by date, and save only the final grouped events
     grouped_by_date, per_date_events = group_events_by_date(articles_canonical)
     grouped_by_date_sorted = dict(sorted(grouped_by_date.items()))
 
@@ -195,10 +321,20 @@ if __name__ == '__main__':
         for idx, event in enumerate(events, 1):
             event['id'] = f'{idx}'
 
-    with open(
-        'src/data/temp_data/grouped_events_by_date.json', 'w', encoding='utf-8'
-    ) as f:
-        json.dump(grouped_by_date_sorted, f, ensure_ascii=False, indent=2)
-    print(
-        'Saved grouped events by date to swrc/data/temp_data/grouped_events_by_date.json'
+    yield from written_records(
+        GROUPED_EVENTS_PATH,
+        (
+            {'date': date, 'events': events}
+            for date, events in grouped_by_date_sorted.items()
+        ),
     )
+    print(f'Saved grouped events by date to {GROUPED_EVENTS_PATH}')
+
+
+def main(offline=False):
+    for _ in run_stage(offline=offline):
+        pass
+
+
+if __name__ == '__main__':
+    main(offline='--offline' in sys.argv[1:])
@@ -1,17 +1,22 @@
 import json
-import google.genai as genai
+import os
+import sys
+from collections import deque
+
 from google.genai import types
 from dotenv import load_dotenv
-import os
-from time import sleep
-
-# Path to the grouped events file
-GROUPED_EVENTS_PATH = os.path.join(
-    os.path.dirname(__file__),
-    'data',
-    'temp_data',
-    'grouped_events_by_date.json',
+from src.checkpoint import Checkpoint, input_hash
+from src.event_clustering import cluster_events, cluster_events_across_dates
+from src.jsonl_io import (
+    GROUPED_EVENTS_PATH,
+    NARRATIVE_PATH,
+    iter_records,
+    records_by_date,
 )
+from src.llm_client import default_client
+
+# Merge events up to this many days apart; 0 merges within a date only
+MERGE_WINDOW_DAYS = int(os.getenv('MERGE_WINDOW_DAYS', '0'))
 
 output_schema = event_extraction_schema = {
     'type': 'array',
@@ -42,30 +47,28 @@ output_schema = event_extraction_schema = {
 }
 
 
+def extract_event_fields(events):
+    return [
+        {
+            'id': event.get('id'),
+            'event': event.get('event'),
+            'details': event.get('details'),
+            'actors': event.get('actors'),
+        }
+        for event in events
+    ]
+
+
 def extract_event_fields_by_date(json_path):
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = records_by_date(iter_records(json_path))
     extracted = {}
     for date, events in data.items():
-        extracted[date] = []
-        for event in events:
-            extracted[date].append(
-                {
-                    'id': event.get('id'),
-                    'event': event.get('event'),
-                    'details': event.get('details'),
-                    'actors': event.get('actors'),
-                }
-            )
-    # print(extracted)
+        extracted[date] = extract_event_fields(events)
     return extracted
 
 
-def prompt_gemini_with_events(events_by_date):
-    # Load environment variables and get API key
-    load_dotenv()
-    api_key = os.getenv('GEMINI_API_KEY')
-    client = genai.Client(api_key=api_key)
+def build_merge_request(events_by_date):
+    """Keyword arguments for LLMClient.submit for one date's events."""
     # Prepare the input for Gemini
     input_data = {'Events': events_by_date}
     # Compose the full prompt
@@ -84,96 +87,275 @@ def prompt_gemini_with_events(events_by_date):
 
         {json.dumps(input_data, ensure_ascii=False, indent=2)}
     """
+    return {
+        'contents': full_prompt,
+        'config': types.GenerateContentConfig(
+            response_mime_type='application/json',
+            response_json_schema=output_schema,
+            temperature=0.0,
+        ),
+    }
+
+
+def parse_merge_response(text):
+    # Try to parse JSON output from Gemini
     try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json',
-                response_json_schema=output_schema,
-                temperature=0.0,
-            ),
-            contents=full_prompt,
-        )
-        # Try to parse JSON output from Gemini
-        try:
-            output_json = json.loads(response.text)
-        except Exception:
-            output_json = response.text
-        return output_json
+        output_json = json.loads(text)
+    except Exception:
+        output_json = text
+    return output_json
+
+
+def prompt_gemini_with_events(events_by_date, llm=None):
+    llm = llm or default_client()
+    try:
+        text = llm.run(**build_merge_request(events_by_date))
+        return parse_merge_response(text)
     except Exception as e:
         print(f'Error calling Gemini: {e}')
         return None
 
 
+def event_locations(event):
+    """An extracted event's locations; older extractions hold one string."""
+    location = event.get('location')
+    if isinstance(location, str):
+        return [location]
+    return [loc for loc in location or [] if isinstance(loc, str)]
+
+
+def entry_event_time(source_events):
+    """
+    Earliest known time of the source events on the earliest of their
+    dates (a cross-date merge is placed on that date), or None.
+    """
+    dates = [e.get('event_date') for e in source_events if e.get('event_date')]
+    first_date = min(dates, default=None)
+    times = [
+        e['event_time']
+        for e in source_events
+        if e.get('event_time') and e.get('event_date') == first_date
+    ]
+    return min(times, default=None)
+
+
+def enrich_entries_with_source_articles(entries, events):
+    """
+    Replace source_event_indices in the merged entries for one date with a
+    sources array of the unique articles those events came from, and add
+    the events' locations and time.
+    """
+    # Build a lookup for id -> event for this date
+    events_by_id = {str(e['id']): e for e in events}
+    for entry in entries:
+        unique_articles = []
+        seen = set()
+        source_events = [
+            events_by_id[str(idx)]
+            for idx in entry.get('source_event_indices', [])
+            if str(idx) in events_by_id
+        ]
+        for event in source_events:
+            art_tuple = (
+                event.get('title'),
+                event.get('article_url'),
+                event.get('published_date'),
+            )
+            if art_tuple not in seen:
+                seen.add(art_tuple)
+                unique_articles.append(
+                    {
+                        'title': event.get('title'),
+                        'article_url': event.get('article_url'),
+                        'published_date': event.get('published_date'),
+                    }
+                )
+        entry['sources'] = unique_articles
+        entry['locations'] = list(
+            dict.fromkeys(
+                location
+                for event in source_events
+                for location in event_locations(event)
+            )
+        )
+        entry['event_time'] = entry_event_time(source_events)
+        if 'source_event_indices' in entry:
+            del entry['source_event_indices']
+    return entries
+
+
 def enrich_narrative_with_source_articles(
     grouped_events_path, narrative_output_path
 ):
-    with open(grouped_events_path, 'r', encoding='utf-8') as f:
-        grouped_data = json.load(f)
+    """Enrich a legacy whole-file narrative JSON in place."""
+    grouped_data = records_by_date(iter_records(grouped_events_path))
     with open(narrative_output_path, 'r', encoding='utf-8') as f:
         narrative_data = json.load(f)
 
     for date, entries in narrative_data.items():
-        # Build a lookup for id -> event for this date
-        events_by_id = {str(e['id']): e for e in grouped_data.get(date, [])}
-        for entry in entries:
-            unique_articles = []
-            seen = set()
-            for idx in entry.get('source_event_indices', []):
-                event = events_by_id.get(str(idx))
-                if event:
-                    art_tuple = (
-                        event.get('title'),
-                        event.get('article_url'),
-                        event.get('published_date'),
-                    )
-                    if art_tuple not in seen:
-                        seen.add(art_tuple)
-                        unique_articles.append(
-                            {
-                                'title': event.get('title'),
-                                'article_url': event.get('article_url'),
-                                'published_date': event.get('published_date'),
-                            }
-                        )
-            entry['sources'] = unique_articles
-            if 'source_event_indices' in entry:
-                del entry['source_event_indices']
+        enrich_entries_with_source_articles(
+            entries, grouped_data.get(date, [])
+        )
 
     with open(narrative_output_path, 'w', encoding='utf-8') as f:
         json.dump(narrative_data, f, ensure_ascii=False, indent=2)
 
 
-if __name__ == '__main__':
-    # Load the original grouped events structure
-    with open(GROUPED_EVENTS_PATH, 'r', encoding='utf-8') as f:
-        original_data = json.load(f)
+def narrative_record(date, events, gemini_result):
+    if isinstance(gemini_result, list):
+        # Enrich the narrative output with source article info
+        enrich_entries_with_source_articles(gemini_result, events)
+    return {'date': date, 'events': gemini_result}
 
-    output_path = os.path.join(
-        os.path.dirname(__file__), 'data', 'reconstructed_narrative.json'
-    )
-    # Use extract_event_fields_by_date to filter fields for Gemini
-    filtered_data = extract_event_fields_by_date(GROUPED_EVENTS_PATH)
-    # Accumulate results for each date
-    narrative_results = {}
-    for date, events in original_data.items():
-        print(f'Processing date: {date}')
-        # For each date, send only the list of filtered events (not a dict with date as key)
-        filtered_events = filtered_data.get(date, [])
-        # print(filtered_events)
-        gemini_result = prompt_gemini_with_events(filtered_events)
-        sleep(2)
-        # Add/update the result for this date
-        narrative_results[date] = gemini_result
-
-        # Write the updated structure to a file after each date
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(narrative_results, f, ensure_ascii=False, indent=2)
-        print(f'Saved progress for {date} to {output_path}')
-    print(f'Narrative output written to {output_path}')
-
-    # Enrich the narrative output with source article info
-    enrich_narrative_with_source_articles(GROUPED_EVENTS_PATH, output_path)
+
+def unmerged_entry(event):
+    """Merge output entry for an event that has nothing to merge with."""
+    return {
+        'event': event.get('event'),
+        'details': event.get('details'),
+        'actors': event.get('actors'),
+        'source_event_indices': [event.get('id')],
+    }
+
+
+def windowed_records(records, window_days):
+    """
+    Regroup date records for merging across dates: events within
+    window_days of each other are clustered together, and each cluster
+    moves to the date of its earliest event. Every event keeps its own
+    event_date. Events are renumbered per date, and the record's
+    'clusters' lists the ids of each cluster. All records are read before
+    the first one is yielded.
+    """
+    events_by_date = {record['date']: record['events'] for record in records}
+    clusters_by_date = cluster_events_across_dates(events_by_date, window_days)
+    for date, clusters in clusters_by_date.items():
+        events, cluster_ids = [], []
+        for cluster in clusters:
+            ids = []
+            for event in cluster:
+                ids.append(str(len(events) + 1))
+                events.append({**event, 'id': ids[-1]})
+            cluster_ids.append(ids)
+        yield {'date': date, 'events': events, 'clusters': cluster_ids}
+
+
+def record_clusters(record):
+    """A record's clusters: precomputed ones, or its own date's."""
+    if 'clusters' not in record:
+        return cluster_events(record['events'])
+    events_by_id = {event['id']: event for event in record['events']}
+    return [[events_by_id[id] for id in ids] for ids in record['clusters']]
+
+
+def merge_input_hash(record):
+    if 'clusters' not in record:
+        return input_hash(record['events'])
+    return input_hash([record['events'], record['clusters']])
+
+
+def submit_clusters(record, llm):
+    """
+    Cluster one date's events locally and submit a merge request for each
+    cluster of more than one event. Returns (cluster, future) pairs; the
+    future is None for single events, which need no LLM call.
+    """
+    submitted = []
+    for cluster in record_clusters(record):
+        future = None
+        if len(cluster) > 1:
+            future = llm.submit(
+                **build_merge_request(extract_event_fields(cluster))
+            )
+        submitted.append((cluster, future))
+    return submitted
+
+
+def collect_clusters(record, submitted):
+    """
+    Narrative record for one date from its submitted clusters. If any
+    merge call fails, the date's events are None so it is retried.
+    """
+    entries = []
+    for cluster, future in submitted:
+        if future is None:
+            entries.append(unmerged_entry(cluster[0]))
+            continue
+        try:
+            merged = parse_merge_response(future.result())
+        except Exception as e:
+            print(f'Error calling Gemini: {e}')
+            merged = None
+        if not isinstance(merged, list):
+            entries = None
+            break
+        entries.extend(merged)
+    calls = sum(1 for _, future in submitted if future is not None)
     print(
-        f'Narrative output enriched with source articles and saved to {output_path}'
+        f'Processed date: {record["date"]} '
+        f'({len(submitted)} clusters, {calls} LLM calls)'
+    )
+    return narrative_record(record['date'], record['events'], entries)
+
+
+def create_narratives(records, llm=None, window=None):
+    """
+    Merge each date's events. Events are first clustered locally by text
+    similarity, and only clusters of more than one event are sent to the
+    LLM, concurrently across clusters and dates; single events are kept
+    as they are. Records are yielded in date order, with at most window
+    merge calls in flight ahead of the record being yielded.
+    """
+    llm = llm or default_client()
+    window = window or 2 * llm.max_concurrency
+    pending = deque()
+    in_flight = 0
+    for record in records:
+        submitted = submit_clusters(record, llm)
+        pending.append((record, submitted))
+        in_flight += sum(1 for _, future in submitted if future is not None)
+        while len(pending) > 1 and in_flight >= window:
+            record, submitted = pending.popleft()
+            in_flight -= sum(1 for _, f in submitted if f is not None)
+            yield collect_clusters(record, submitted)
+    while pending:
+        yield collect_clusters(*pending.popleft())
+
+
+def run_stage(records=None, llm=None, window_days=MERGE_WINDOW_DAYS):
+    """
+    Pipeline stage: merge each date's events (by default those in
+    grouped_events_by_date.jsonl), append the narrative records to
+    reconstructed_narrative.jsonl and yield them. Dates whose events are
+    unchanged since an earlier run are not sent again and their stored
+    records are yielded instead. With window_days, events up to that many
+    days apart are merged too, see windowed_records.
+    """
+    if records is None:
+        records = iter_records(GROUPED_EVENTS_PATH)
+    if window_days:
+        records = windowed_records(records, window_days)
+    checkpoint = Checkpoint('step4', NARRATIVE_PATH, key='date')
+    # Each date is appended to the output as soon as it is merged
+    yield from checkpoint.stream(
+        records,
+        merge_input_hash,
+        lambda todo: create_narratives(todo, llm),
+        done=lambda record: record['events'] is not None,
     )
+    checkpoint.close()
+    print(f'Skipped {checkpoint.skipped} dates merged earlier')
+
+
+def main(window_days=MERGE_WINDOW_DAYS):
+    load_dotenv()
+    count = sum(1 for _ in run_stage(window_days=window_days))
+    print(f'Narrative output for {count} dates written to {NARRATIVE_PATH}')
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--window' in args:
+        main(window_days=int(args[args.index('--window') + 1]))
+    else:
+        main()
@@ -1,49 +1,78 @@
-import psycopg
 import os
+import sys
+import re
 import json
+import hashlib
+from datetime import date
+from src.db import default_database
+from src.jsonl_io import NARRATIVE_PATH, iter_records
 
-# Load DB connection from env
-DB_NAME = os.getenv('DB_NAME')
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = os.getenv('DB_PORT')
+ACTORS_PATH = 'src/data/actors.json'
 
+# Upsert changed rows in one transaction instead of reloading every table
+STEP5_INCREMENTAL = os.getenv('STEP5_INCREMENTAL', '') not in ('', '0')
 
-conn_str = f'dbname={DB_NAME} user={DB_USER} password={DB_PASSWORD} host={DB_HOST} port={DB_PORT}'
 
+def event_hash(event):
+    """Hash of an event's label and details; with its date, its key."""
+    payload = json.dumps(
+        [event['event'], event['details']], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
-with open('src/data/actors.json', 'r', encoding='utf-8') as f:
-    actors_data = json.load(f)
 
+EVENT_TIME = re.compile(r'([01]?\d|2[0-3]):([0-5]\d)(?::[0-5]\d)?')
 
-with open('src/data/reconstructed_narrative.json', 'r', encoding='utf-8') as f:
-    narrative_data = json.load(f)
 
+def event_time(event):
+    """An event's time as HH:MM, or None if it is missing or unreadable."""
+    match = EVENT_TIME.fullmatch((event.get('event_time') or '').strip())
+    if not match:
+        return None
+    return f'{int(match[1]):02d}:{match[2]}'
 
-def insert_actors():
-    """Insert actors and their aliases into the database."""
-    with psycopg.connect(conn_str) as conn:
-        with conn.cursor() as cur:
-            cur.execute('DELETE FROM actor_aliases;')
-            cur.execute('DELETE FROM actors;')
 
-            for label, aliases in actors_data.items():
-                # Insert actor
+def iso_date(value):
+    """
+    The date at the start of value, e.g. '2024-01-01 (Monday)', as
+    YYYY-MM-DD, or None if it is missing or unreadable.
+    """
+    try:
+        return date.fromisoformat((value or '').split(' ')[0]).isoformat()
+    except ValueError:
+        return None
+
+
+def replace_actors(cur):
+    """Replace the actors and their aliases with those in actors.json."""
+    with open(ACTORS_PATH, 'r', encoding='utf-8') as f:
+        actors_data = json.load(f)
+
+    cur.execute('DELETE FROM actor_aliases;')
+    cur.execute('DELETE FROM actors;')
+
+    for label, aliases in actors_data.items():
+        # Insert actor
+        cur.execute(
+            'INSERT INTO actors (label) VALUES (%s) RETURNING id;',
+            (label,),
+        )
+        actor_id = cur.fetchone()[0]
+
+        # Insert aliases
+        for alias in aliases:
+            if alias != label:
                 cur.execute(
-                    'INSERT INTO actors (label) VALUES (%s) RETURNING id;',
-                    (label,),
+                    'INSERT INTO actor_aliases (actor_id, alias) VALUES (%s, %s) ON CONFLICT (alias) DO NOTHING;',
+                    (actor_id, alias),
                 )
-                actor_id = cur.fetchone()[0]
 
-                # Insert aliases
-                for alias in aliases:
-                    if alias != label:
-                        cur.execute(
-                            'INSERT INTO actor_aliases (actor_id, alias) VALUES (%s, %s);',
-                            (actor_id, alias),
-                        )
 
+def insert_actors(db=None):
+    """Insert actors and their aliases into the database."""
+    with (db or default_database()).connection() as conn:
+        with conn.cursor() as cur:
+            replace_actors(cur)
             conn.commit()
 
             # Check data
@@ -58,28 +87,48 @@ def insert_actors():
                 print(row)
 
 
-def insert_narrative():
-    """Insert events, sources, and cross-references into the database."""
-    with psycopg.connect(conn_str) as conn:
+def insert_narrative(records=None, db=None):
+    """
+    Insert events, sources, and cross-references into the database, one
+    row at a time. records are narrative date records, by default read
+    from reconstructed_narrative.jsonl. db is a src.db.Database, by
+    default the shared pool.
+    """
+    if records is None:
+        records = iter_records(NARRATIVE_PATH)
+    with (db or default_database()).connection() as conn:
         with conn.cursor() as cur:
+            cur.execute('DELETE FROM event_locations;')
             cur.execute('DELETE FROM event_actors;')
             cur.execute('DELETE FROM event_sources;')
             cur.execute('DELETE FROM events;')
             cur.execute('DELETE FROM sources;')
 
-            for date_key, events in narrative_data.items():
-                for event in events:
-                    # Insert event first
+            # Narrative records are streamed one date at a time
+            for record in records:
+                for event in record['events'] or []:
+                    # Insert event first; a repeat of an event on the same
+                    # date reuses its row
                     event_label = event['event']
                     details = event['details']
 
                     cur.execute(
                         """
-                        INSERT INTO events (label, details)
-                        VALUES (%s, %s)
+                        INSERT INTO events
+                            (label, details, event_date, event_time,
+                            content_hash)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (event_date, content_hash)
+                        DO UPDATE SET label = EXCLUDED.label
                         RETURNING id;
                         """,
-                        (event_label, details),
+                        (
+                            event_label,
+                            details,
+                            record['date'],
+                            event_time(event),
+                            event_hash(event),
+                        ),
                     )
                     event_id = cur.fetchone()[0]
 
@@ -107,7 +156,7 @@ def insert_narrative():
 
                         # Link event with source
                         cur.execute(
-                            'INSERT INTO event_sources (event_id, source_id) VALUES (%s, %s);',
+                            'INSERT INTO event_sources (event_id, source_id) VALUES (%s, %s) ON CONFLICT DO NOTHING;',
                             (event_id, source_id),
                         )
 
@@ -129,10 +178,32 @@ def insert_narrative():
                             actor_id = cur.fetchone()[0]
 
                         cur.execute(
-                            'INSERT INTO event_actors (event_id, actor_id) VALUES (%s, %s);',
+                            'INSERT INTO event_actors (event_id, actor_id) VALUES (%s, %s) ON CONFLICT DO NOTHING;',
                             (event_id, actor_id),
                         )
 
+                    # For each location in this event
+                    for location_label in event.get('locations', []):
+                        cur.execute(
+                            'SELECT id FROM locations WHERE label = %s;',
+                            (location_label,),
+                        )
+                        result = cur.fetchone()
+
+                        if result:
+                            location_id = result[0]
+                        else:
+                            cur.execute(
+                                'INSERT INTO locations (label) VALUES (%s) RETURNING id;',
+                                (location_label,),
+                            )
+                            location_id = cur.fetchone()[0]
+
+                        cur.execute(
+                            'INSERT INTO event_locations (event_id, location_id) VALUES (%s, %s) ON CONFLICT DO NOTHING;',
+                            (event_id, location_id),
+                        )
+
             conn.commit()
 
             cur.execute('SELECT * FROM events LIMIT 3;')
@@ -151,6 +222,371 @@ def insert_narrative():
                 print(row)
 
 
+# One row per event; its sources and actors are carried as parallel arrays
+# and unnested on the server
+STAGING_TABLE = """
+    CREATE TEMP TABLE staging_events (
+        event_key BIGINT NOT NULL,
+        event_id INTEGER,
+        event_date TEXT NOT NULL,
+        event_time TEXT,
+        content_hash TEXT NOT NULL,
+        label TEXT NOT NULL,
+        details TEXT,
+        source_titles TEXT[] NOT NULL,
+        source_urls TEXT[] NOT NULL,
+        source_dates TEXT[] NOT NULL,
+        actors TEXT[] NOT NULL,
+        locations TEXT[] NOT NULL
+    ) ON COMMIT DROP
+"""
+STAGING_COPY = (
+    'COPY staging_events (event_key, event_date, event_time, content_hash, '
+    'label, details, source_titles, source_urls, source_dates, actors, '
+    'locations) FROM STDIN'
+)
+STAGING_TYPES = [
+    'bigint',
+    'text',
+    'text',
+    'text',
+    'text',
+    'text',
+    'text[]',
+    'text[]',
+    'text[]',
+    'text[]',
+    'text[]',
+]
+
+# Incremental loads only: reuse the ids of events already in the database,
+# catch up their times and drop the events that are no longer in the input,
+# including those of dates with no events left or missing from it
+MATCH_STATEMENTS = [
+    """
+    UPDATE staging_events s
+    SET event_id = e.id
+    FROM events e
+    WHERE e.event_date = s.event_date::date
+        AND e.content_hash = s.content_hash
+    """,
+    """
+    UPDATE events e
+    SET event_time = s.event_time::time, updated_at = now()
+    FROM staging_events s
+    WHERE e.id = s.event_id
+        AND e.event_time IS DISTINCT FROM s.event_time::time
+    """,
+    """
+    DELETE FROM events e
+    WHERE NOT EXISTS (SELECT 1 FROM staging_events s WHERE s.event_id = e.id)
+    """,
+]
+
+# Set-wise ID resolution, run in order after the COPY
+RESOLVE_STATEMENTS = [
+    # New event ids are drawn from the events sequence up front, in input
+    # order, so sources and actors can be linked without reading the ids
+    # back. Repeats of an event on the same date share its id; the CTE is
+    # materialized, so nextval runs once per event.
+    """
+    WITH k AS (
+        SELECT event_date, content_hash,
+            nextval(pg_get_serial_sequence('events', 'id')) AS event_id
+        FROM (
+            SELECT event_date, content_hash, min(event_key) AS first_key
+            FROM staging_events
+            WHERE event_id IS NULL
+            GROUP BY event_date, content_hash
+            ORDER BY first_key
+        ) first_events
+    )
+    UPDATE staging_events s
+    SET event_id = k.event_id
+    FROM k
+    WHERE s.event_id IS NULL
+        AND s.event_date = k.event_date
+        AND s.content_hash = k.content_hash
+    """,
+    """
+    INSERT INTO events
+        (id, label, details, event_date, event_time, content_hash)
+    SELECT DISTINCT ON (event_id)
+        event_id, label, details, event_date::date, event_time::time,
+        content_hash
+    FROM staging_events
+    ORDER BY event_id, event_key
+    ON CONFLICT (event_date, content_hash) DO NOTHING
+    """,
+    # A source seen in several events keeps the details of its first one
+    """
+    INSERT INTO sources (title, url, published_date)
+    SELECT DISTINCT ON (s.url) s.title, s.url, s.published_date::date
+    FROM staging_events e,
+        unnest(e.source_titles, e.source_urls, e.source_dates)
+            AS s(title, url, published_date)
+    ORDER BY s.url, e.event_key
+    ON CONFLICT (url) DO UPDATE
+    SET title = EXCLUDED.title,
+        published_date = EXCLUDED.published_date,
+        updated_at = now()
+    WHERE (sources.title, sources.published_date)
+        IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.published_date)
+    """,
+    """
+    INSERT INTO event_sources (event_id, source_id)
+    SELECT e.event_id, src.id
+    FROM staging_events e,
+        unnest(e.source_urls) WITH ORDINALITY AS s(url, position)
+    JOIN sources src ON src.url = s.url
+    ORDER BY e.event_key, s.position
+    ON CONFLICT (event_id, source_id) DO NOTHING
+    """,
+    """
+    INSERT INTO actors (label)
+    SELECT DISTINCT a.label
+    FROM staging_events e, unnest(e.actors) AS a(label)
+    ON CONFLICT (label) DO NOTHING
+    """,
+    """
+    INSERT INTO event_actors (event_id, actor_id)
+    SELECT e.event_id, act.id
+    FROM staging_events e,
+        unnest(e.actors) WITH ORDINALITY AS a(label, position)
+    JOIN actors act ON act.label = a.label
+    ORDER BY e.event_key, a.position
+    ON CONFLICT (event_id, actor_id) DO NOTHING
+    """,
+    """
+    INSERT INTO locations (label)
+    SELECT DISTINCT l.label
+    FROM staging_events e, unnest(e.locations) AS l(label)
+    ON CONFLICT (label) DO NOTHING
+    """,
+    """
+    INSERT INTO event_locations (event_id, location_id)
+    SELECT e.event_id, loc.id
+    FROM staging_events e,
+        unnest(e.locations) WITH ORDINALITY AS l(label, position)
+    JOIN locations loc ON loc.label = l.label
+    ORDER BY e.event_key, l.position
+    ON CONFLICT (event_id, location_id) DO NOTHING
+    """,
+]
+
+# Incremental loads only: unlink sources, actors and locations the loaded
+# events no longer mention
+PRUNE_STATEMENTS = [
+    """
+    DELETE FROM event_sources es
+    USING staging_events e
+    WHERE es.event_id = e.event_id
+        AND NOT EXISTS (
+            SELECT 1
+            FROM staging_events s, unnest(s.source_urls) AS u(url)
+            JOIN sources src ON src.url = u.url
+            WHERE s.event_id = es.event_id AND src.id = es.source_id
+        )
+    """,
+    """
+    DELETE FROM event_actors ea
+    USING staging_events e
+    WHERE ea.event_id = e.event_id
+        AND NOT EXISTS (
+            SELECT 1
+            FROM staging_events s, unnest(s.actors) AS a(label)
+            JOIN actors act ON act.label = a.label
+            WHERE s.event_id = ea.event_id AND act.id = ea.actor_id
+        )
+    """,
+    """
+    DELETE FROM event_locations el
+    USING staging_events e
+    WHERE el.event_id = e.event_id
+        AND NOT EXISTS (
+            SELECT 1
+            FROM staging_events s, unnest(s.locations) AS l(label)
+            JOIN locations loc ON loc.label = l.label
+            WHERE s.event_id = el.event_id AND loc.id = el.location_id
+        )
+    """,
+    # Sources of the dropped events and links, which a reload would not
+    # insert
+    """
+    DELETE FROM sources src
+    WHERE NOT EXISTS (
+        SELECT 1 FROM event_sources es WHERE es.source_id = src.id
+    )
+    """,
+]
+
+# actors.json as (label, alias) rows; each label is also its own alias
+STAGING_ALIASES_TABLE = """
+    CREATE TEMP TABLE staging_aliases (
+        label TEXT NOT NULL,
+        alias TEXT NOT NULL
+    ) ON COMMIT DROP
+"""
+UPSERT_ACTOR_STATEMENTS = [
+    """
+    INSERT INTO actors (label)
+    SELECT DISTINCT label FROM staging_aliases
+    ON CONFLICT (label) DO NOTHING
+    """,
+    """
+    INSERT INTO actor_aliases (actor_id, alias)
+    SELECT DISTINCT ON (s.alias) act.id, s.alias
+    FROM staging_aliases s
+    JOIN actors act ON act.label = s.label
+    WHERE s.alias <> s.label
+    ORDER BY s.alias, s.label
+    ON CONFLICT (alias) DO UPDATE SET actor_id = EXCLUDED.actor_id
+    WHERE actor_aliases.actor_id <> EXCLUDED.actor_id
+    """,
+    """
+    DELETE FROM actor_aliases aa
+    WHERE NOT EXISTS (
+        SELECT 1 FROM staging_aliases s
+        WHERE s.alias = aa.alias AND s.alias <> s.label
+    )
+    """,
+]
+
+
+def staging_rows(records):
+    """
+    COPY rows for staging_events, one per merged event, in order. Events
+    with an unreadable date and sources with an unreadable published date
+    are left out, since one bad date would abort the whole COPY.
+    """
+    event_key = 0
+    for record in records:
+        record_date = iso_date(record['date'])
+        for event in record['events'] or []:
+            if record_date is None:
+                print(
+                    f'Skipping event {event["event"]!r} with unreadable '
+                    f'date {record["date"]!r}'
+                )
+                continue
+            event_key += 1
+            sources = []
+            for source in event['sources']:
+                published_date = iso_date(source['published_date'])
+                if published_date is None:
+                    print(
+                        f'Skipping source {source["article_url"]} with '
+                        f'unreadable date {source["published_date"]!r}'
+                    )
+                else:
+                    sources.append((source, published_date))
+            yield (
+                event_key,
+                record_date,
+                event_time(event),
+                event_hash(event),
+                event['event'],
+                event['details'],
+                [source['title'] for source, _ in sources],
+                [source['article_url'] for source, _ in sources],
+                [published_date for _, published_date in sources],
+                list(event['actors']),
+                list(event.get('locations', [])),
+            )
+
+
+def copy_events(cur, records):
+    """Stream records into staging_events and return the number of events."""
+    cur.execute(STAGING_TABLE)
+    count = 0
+    with cur.copy(STAGING_COPY) as copy:
+        copy.set_types(STAGING_TYPES)
+        for row in staging_rows(records):
+            copy.write_row(row)
+            count += 1
+    cur.execute('ANALYZE staging_events')
+    return count
+
+
+def bulk_insert_narrative(records=None, db=None, actors=True):
+    """
+    Same result as insert_actors (unless actors is False) followed by
+    insert_narrative, in one transaction, so readers switch from the old
+    data to the new at once. The events are streamed into a staging table
+    with COPY, and sources, actors and the link tables are then filled
+    set-wise on the server, in a fixed number of round trips. Returns the
+    number of events loaded.
+    """
+    if records is None:
+        records = iter_records(NARRATIVE_PATH)
+    with (db or default_database()).connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute('DELETE FROM event_locations;')
+            cur.execute('DELETE FROM event_actors;')
+            cur.execute('DELETE FROM event_sources;')
+            cur.execute('DELETE FROM events;')
+            cur.execute('DELETE FROM sources;')
+            if actors:
+                replace_actors(cur)
+            count = copy_events(cur, records)
+            for statement in RESOLVE_STATEMENTS:
+                cur.execute(statement)
+        conn.commit()
+    print(f'Loaded {count} events')
+    return count
+
+
+def upsert_actors(cur):
+    """Add new actors and aliases from actors.json and drop removed aliases."""
+    with open(ACTORS_PATH, 'r', encoding='utf-8') as f:
+        actors_data = json.load(f)
+    cur.execute(STAGING_ALIASES_TABLE)
+    with cur.copy('COPY staging_aliases (label, alias) FROM STDIN') as copy:
+        for label, aliases in actors_data.items():
+            copy.write_row((label, label))
+            for alias in aliases:
+                copy.write_row((label, alias))
+    for statement in UPSERT_ACTOR_STATEMENTS:
+        cur.execute(statement)
+
+
+def upsert_narrative(records=None, db=None, actors=True):
+    """
+    Incremental load keyed on natural keys: events by date and content
+    hash, sources by URL and actors by label. Only new or changed rows
+    are written. records is the whole narrative: events and sources
+    missing from it are deleted, so the result matches a reload. Actors
+    (unless actors is False) and narratives are loaded in a single
+    transaction, so readers switch from the old data to the new at once.
+    Returns the number of events in records.
+    """
+    if records is None:
+        records = iter_records(NARRATIVE_PATH)
+    with (db or default_database()).connection() as conn:
+        with conn.cursor() as cur:
+            if actors:
+                upsert_actors(cur)
+            count = copy_events(cur, records)
+            for statement in (
+                MATCH_STATEMENTS + RESOLVE_STATEMENTS + PRUNE_STATEMENTS
+            ):
+                cur.execute(statement)
+        conn.commit()
+    print(f'Upserted {count} events')
+    return count
+
+
+def run_stage(records=None, incremental=STEP5_INCREMENTAL):
+    """
+    Pipeline stage: load actors and narrative records into the database
+    in one transaction, replacing its contents, or with incremental
+    upserting only what changed.
+    """
+    if incremental:
+        upsert_narrative(records)
+    else:
+        bulk_insert_narrative(records)
+
+
 if __name__ == '__main__':
-    insert_actors()
-    insert_narrative()
+    run_stage(incremental=STEP5_INCREMENTAL or '--incremental' in sys.argv[1:])
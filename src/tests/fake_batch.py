@@ -0,0 +1,46 @@
+from src.llm_batch import FAILED, RUNNING, SUCCEEDED, BatchBackend, BatchError
+
+
+class FakeBatchBackend(BatchBackend):
+    """
+    In-memory BatchBackend. Each job reports RUNNING for polls_until_done
+    polls, then finishes with respond(contents) as the text of every
+    request. Jobs whose index is in fail_jobs fail as a whole, and requests
+    for which fail_request(contents) is true fail individually.
+    """
+
+    def __init__(
+        self,
+        respond=lambda contents: '[]',
+        polls_until_done=1,
+        fail_jobs=(),
+        fail_request=lambda contents: False,
+    ):
+        self.respond = respond
+        self.polls_until_done = polls_until_done
+        self.fail_jobs = set(fail_jobs)
+        self.fail_request = fail_request
+        self.jobs = {}
+        self._polls = {}
+
+    def submit(self, requests, display_name=None):
+        name = f'batches/fake-{len(self.jobs)}'
+        self.jobs[name] = [request['contents'] for request in requests]
+        self._polls[name] = 0
+        return name
+
+    def state(self, name):
+        self._polls[name] += 1
+        if self._polls[name] <= self.polls_until_done:
+            return RUNNING
+        if int(name.rsplit('-', 1)[1]) in self.fail_jobs:
+            return FAILED
+        return SUCCEEDED
+
+    def results(self, name):
+        return [
+            BatchError('injected failure')
+            if self.fail_request(contents)
+            else self.respond(contents)
+            for contents in self.jobs[name]
+        ]
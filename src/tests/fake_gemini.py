@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 resets connections under load
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class FakeGeminiServer:
+    """
+    Local stand-in for the Gemini generateContent endpoint.
+
+    respond(prompt_text) returns the text the fake model replies with. The
+    first fail_first requests get fail_status instead, and every request
+    waits latency seconds, so retries and throughput can be exercised
+    without network access.
+    """
+
+    def __init__(
+        self,
+        respond=lambda prompt: '[]',
+        latency=0.0,
+        fail_first=0,
+        fail_status=429,
+    ):
+        self.respond = respond
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                status, payload = server._handle(json.loads(body))
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = _Server(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True
+        )
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address
+        return f'http://{host}:{port}'
+
+    def _handle(self, request):
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if number <= self.fail_first:
+                return self.fail_status, {
+                    'error': {
+                        'code': self.fail_status,
+                        'message': 'injected failure',
+                        'status': 'RESOURCE_EXHAUSTED',
+                    }
+                }
+            prompt = ''.join(
+                part.get('text', '')
+                for content in request.get('contents', [])
+                for part in content.get('parts', [])
+            )
+            text = self.respond(prompt)
+            return 200, {
+                'candidates': [
+                    {
+                        'content': {
+                            'role': 'model',
+                            'parts': [{'text': text}],
+                        },
+                        'finishReason': 'STOP',
+                    }
+                ],
+                'usageMetadata': {
+                    'promptTokenCount': len(prompt) // 4,
+                    'candidatesTokenCount': len(text) // 4,
+                    'totalTokenCount': (len(prompt) + len(text)) // 4,
+                },
+            }
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,103 @@
+import json
+
+import networkx as nx
+import numpy as np
+from networkx.algorithms.link_analysis.pagerank_alg import _pagerank_python
+
+from ..actor_analytics import (
+    AnalyticsCache,
+    export_analytics,
+    label_propagation,
+    modularity,
+    pagerank,
+)
+from ..graph_store import GraphStore
+from .test_graph_store import _database
+
+EDGES = [(0, 1, 3), (1, 2, 1), (0, 2, 2), (2, 3, 1), (3, 4, 5)]
+
+
+def test_pagerank_matches_networkx():
+    G = nx.Graph()
+    # Node 5 has no edges
+    G.add_nodes_from(range(6))
+    G.add_weighted_edges_from(EDGES)
+    a, b, w = (np.array(column) for column in zip(*EDGES))
+    rank = pagerank(6, a, b, w, tol=1e-10)
+    expected = _pagerank_python(G, tol=1e-10)
+    assert np.allclose(rank, [expected[node] for node in range(6)])
+    assert np.isclose(rank.sum(), 1)
+
+
+def test_label_propagation_separates_cliques():
+    # Two 4-cliques joined by one light edge
+    edges = [
+        (x + offset, y + offset, 5)
+        for offset in (0, 4)
+        for x in range(4)
+        for y in range(x + 1, 4)
+    ] + [(3, 4, 1)]
+    a, b, w = (np.array(column) for column in zip(*edges))
+    community = label_propagation(8, a, b, w)
+    assert community.tolist() == [0, 0, 0, 0, 1, 1, 1, 1]
+    strength = np.bincount(a, w, 8) + np.bincount(b, w, 8)
+    assert modularity(community, a, b, w, strength) > 0.4
+    # Nodes without edges keep their own community
+    assert label_propagation(2, a[:0], b[:0], w[:0]).tolist() == [0, 1]
+
+
+def _records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_export_caches_windows(tmp_path):
+    db = _database()
+    db.insert('actors', (3, 'Actor C'))
+    db.insert('events', (13, '2025-09-15', 'Event Z', None))
+    db.insert('event_actors', (5, 13, 1), (6, 13, 3))
+    db.insert('event_sources', (4, 13, 20))
+    store = GraphStore(tmp_path / 'graph.npz')
+    store.sync(db)
+    paths = {
+        'output_path': tmp_path / 'analytics.jsonl',
+        'gexf_path': tmp_path / 'actors.gexf',
+    }
+    cache = AnalyticsCache(tmp_path / 'cache')
+    assert export_analytics(store, '2025-01-01', 30, cache=cache, **paths)
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    july, september = _records(paths['output_path'])
+    assert (july['window_start'], july['window_end']) == (
+        '2025-07-11',
+        '2025-08-10',
+    )
+    assert july['events'] == 2
+    # Both actors have the same PageRank and stay in id order
+    assert [actor['id'] for actor in july['actors']] == [1, 2]
+    assert [actor['events'] for actor in july['actors']] == [1, 2]
+    assert july['pairs'] == 1
+    assert september['window_start'] == '2025-09-09'
+    assert {actor['label'] for actor in september['actors']} == {
+        'Actor A',
+        'Actor C',
+    }
+
+    G = nx.read_gexf(paths['gexf_path'])
+    assert set(G.nodes) == {'actor_1', 'actor_2', 'actor_3'}
+    assert G.edges['actor_1', 'actor_2']['weight'] == 1
+    assert G.nodes['actor_1']['events'] == 2
+    assert G.nodes['actor_1']['degree'] == 2
+
+    cache = AnalyticsCache(tmp_path / 'cache')
+    export_analytics(store, '2025-01-01', 30, cache=cache, **paths)
+    assert (cache.hits, cache.misses) == (3, 0)
+    # New data only recomputes its window and the whole period
+    db.insert('events', (14, '2025-09-20', 'Event W', None))
+    db.insert('event_actors', (7, 14, 3), (8, 14, 1))
+    db.insert('event_sources', (5, 14, 21))
+    store.sync(db)
+    cache = AnalyticsCache(tmp_path / 'cache')
+    export_analytics(store, '2025-01-01', 30, cache=cache, **paths)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert _records(paths['output_path'])[1]['actors'][0]['strength'] == 2
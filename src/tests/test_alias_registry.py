@@ -0,0 +1,76 @@
+from ..alias_registry import AliasRegistry
+
+
+def test_add_and_lookup(tmp_path):
+    registry = AliasRegistry(str(tmp_path / 'aliases.sqlite'))
+    registry.add('actor', {'Nepal Police Force': 'Nepal Police'})
+    assert registry.lookup(
+        'actor', ['Nepal Police Force', 'Nepal Police', 'Army']
+    ) == {
+        'Nepal Police Force': 'Nepal Police',
+        'Nepal Police': 'Nepal Police',
+    }
+    assert registry.lookup('location', ['Nepal Police']) == {}
+    assert registry.canonicals('actor') == {'Nepal Police'}
+    registry.close()
+
+
+def test_known_aliases_are_kept(tmp_path):
+    registry = AliasRegistry(str(tmp_path / 'aliases.sqlite'))
+    registry.add('actor', {'Police': 'Nepal Police'})
+    registry.add('actor', {'Police': 'Police HQ'})
+    assert registry.lookup('actor', ['Police']) == {'Police': 'Nepal Police'}
+    registry.close()
+
+
+def test_canonicals_that_are_aliases_are_followed(tmp_path):
+    registry = AliasRegistry(str(tmp_path / 'aliases.sqlite'))
+    registry.add('actor', {'Police': 'Nepal Police'})
+    registry.add('actor', {'NP': 'Police', 'Army': 'NA', 'NA': 'Nepal Army'})
+    registry.add('actor', {'X': 'Y', 'Y': 'X'})
+    assert registry.mapping('actor') == {
+        'Nepal Army': ['Army', 'NA', 'Nepal Army'],
+        'Nepal Police': ['NP', 'Nepal Police', 'Police'],
+        'X': ['X', 'Y'],
+    }
+    registry.close()
+
+
+def test_candidates_share_name_keys(tmp_path):
+    path = str(tmp_path / 'aliases.sqlite')
+    registry = AliasRegistry(path)
+    registry.add(
+        'actor',
+        {'Nepal Police': 'Nepal Police', 'Nepal Army': 'Nepal Army'},
+    )
+    registry.add('location', {'पोखरा': 'पोखरा'})
+    assert registry.candidates('actor', ['Police HQ']) == {'Nepal Police'}
+    assert registry.candidates('location', ['पोखरा, नेपाल']) == {'पोखरा'}
+    assert registry.candidates('actor', ['Gorkhapatra']) == set()
+    # A registry written before the index is indexed on first use
+    for table in ('canonical_keys', 'indexed_kinds'):
+        registry._conn.execute(f'DELETE FROM {table}')
+    registry._conn.commit()
+    registry.close()
+    registry = AliasRegistry(path)
+    assert registry.candidates('actor', ['Army HQ']) == {'Nepal Army'}
+    registry.close()
+
+
+def test_mapping_round_trip(tmp_path):
+    path = str(tmp_path / 'aliases.sqlite')
+    registry = AliasRegistry(path)
+    registry.add_mapping('location', {'पोखरा': ['पोखरा', 'पोखरा, नेपाल']})
+    registry.close()
+    registry = AliasRegistry(path)
+    assert registry.mapping('location') == {'पोखरा': ['पोखरा', 'पोखरा, नेपाल']}
+    assert registry.count('location') == 2
+    registry.close()
+
+
+def test_lookup_in_batches(tmp_path):
+    registry = AliasRegistry(str(tmp_path / 'aliases.sqlite'))
+    registry.add('actor', {f'name {i}': 'canonical' for i in range(1200)})
+    names = [f'name {i}' for i in range(1300)]
+    assert len(registry.lookup('actor', names)) == 1200
+    registry.close()
@@ -0,0 +1,85 @@
+from ..checkpoint import Checkpoint, input_hash
+from ..jsonl_io import iter_records
+
+
+def _run(tmp_path, inputs, process, done=lambda record: True):
+    output = str(tmp_path / 'out.jsonl')
+    checkpoint = Checkpoint(
+        'stage', output, key='url', directory=str(tmp_path / 'checkpoints')
+    )
+    pending = list(
+        checkpoint.pending(inputs, lambda record: input_hash(record['v']))
+    )
+    checkpoint.write((process(record) for record in pending), done=done)
+    checkpoint.close()
+    return [record['url'] for record in pending], list(iter_records(output))
+
+
+def _double(record):
+    return {'url': record['url'], 'v': record['v'] * 2}
+
+
+def test_finished_records_are_skipped(tmp_path):
+    inputs = [{'url': 'u1', 'v': 1}, {'url': 'u2', 'v': 2}]
+    processed, _ = _run(tmp_path, inputs, _double)
+    assert processed == ['u1', 'u2']
+
+    inputs.append({'url': 'u3', 'v': 3})
+    processed, output = _run(tmp_path, inputs, _double)
+    assert processed == ['u3']
+    assert [record['v'] for record in output] == [2, 4, 6]
+
+
+def test_changed_records_are_redone_and_compacted(tmp_path):
+    _run(tmp_path, [{'url': 'u1', 'v': 1}, {'url': 'u2', 'v': 2}], _double)
+    processed, output = _run(
+        tmp_path, [{'url': 'u1', 'v': 10}, {'url': 'u2', 'v': 2}], _double
+    )
+    assert processed == ['u1']
+    assert output == [{'url': 'u2', 'v': 4}, {'url': 'u1', 'v': 20}]
+
+
+def test_failed_records_are_retried(tmp_path):
+    inputs = [{'url': 'u1', 'v': 1}, {'url': 'u2', 'v': 2}]
+    _run(tmp_path, inputs, _double, done=lambda record: record['url'] != 'u2')
+    processed, output = _run(tmp_path, inputs, _double)
+    assert processed == ['u2']
+    assert [record['url'] for record in output] == ['u1', 'u2']
+
+
+def test_records_missing_from_output_are_redone(tmp_path):
+    inputs = [{'url': 'u1', 'v': 1}]
+    _run(tmp_path, inputs, _double)
+    (tmp_path / 'out.jsonl').unlink()
+    processed, output = _run(tmp_path, inputs, _double)
+    assert processed == ['u1']
+    assert output == [{'url': 'u1', 'v': 2}]
+
+
+def test_stream_yields_stored_output_of_skipped_records(tmp_path):
+    inputs = [{'url': 'u1', 'v': 1}, {'url': 'u2', 'v': 2}]
+    _run(tmp_path, inputs[:1], _double)
+    checkpoint = Checkpoint(
+        'stage',
+        str(tmp_path / 'out.jsonl'),
+        key='url',
+        directory=str(tmp_path / 'checkpoints'),
+    )
+    processed = []
+
+    def process(records):
+        for record in records:
+            processed.append(record['url'])
+            yield _double(record)
+
+    output = list(
+        checkpoint.stream(
+            inputs, lambda record: input_hash(record['v']), process
+        )
+    )
+    checkpoint.close()
+    assert processed == ['u2']
+    assert sorted(output, key=lambda r: r['url']) == [
+        {'url': 'u1', 'v': 2},
+        {'url': 'u2', 'v': 4},
+    ]
@@ -0,0 +1,95 @@
+import itertools
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+
+from .. import extract_gexf
+from ..compact_graph import CompactGraph
+from ..graph_store import GraphStore
+from .test_graph_store import _database
+
+# (actor_id, actor_label, event_id, event_label, event_details,
+#  source_id, source_title, source_url, published_date)
+ROWS = [
+    (1, 'A1', 10, 'E10', 'D10', 20, 'S20', 'u20', '2025-07-30'),
+    (2, 'A2', 10, 'E10', 'D10', 20, 'S20', 'u20', '2025-07-30'),
+    (3, 'A3', 10, 'E10', 'D10', 21, 'S21', 'u21', '2025-07-31'),
+    (2, 'A2', 11, 'E11', None, 21, 'S21', 'u21', '2025-07-31'),
+    (3, 'A3', 11, 'E11', None, 21, 'S21', 'u21', '2025-07-31'),
+    (4, 'A4', 12, 'E12', 'D12', 22, 'S22', 'u22', '2025-08-01'),
+]
+
+
+def _same_graph(G, H):
+    assert set(G.edges) == set(H.edges)
+    assert dict(G.nodes(data=True)) == dict(H.nodes(data=True))
+
+
+def test_to_networkx_matches_build_graph():
+    graph = CompactGraph.from_rows(ROWS)
+    _same_graph(graph.to_networkx(), extract_gexf.build_graph(ROWS))
+    assert graph.num_nodes == 4 + 3 + 3
+    assert graph.key(graph.node('event_11')) == 'event_11'
+
+
+def test_degree_and_neighborhood_match_networkx():
+    graph = CompactGraph.from_rows(ROWS)
+    G = extract_gexf.build_graph(ROWS)
+    keys = [graph.key(node) for node in range(graph.num_nodes)]
+    for mode, expected in (
+        ('all', G.degree),
+        ('in', G.in_degree),
+        ('out', G.out_degree),
+    ):
+        assert graph.degree(mode).tolist() == [expected[k] for k in keys]
+    undirected = G.to_undirected()
+    for hops in (1, 2, 3):
+        found = graph.neighborhood([graph.node('actor_1')], hops)
+        expected = nx.single_source_shortest_path_length(
+            undirected, 'actor_1', cutoff=hops
+        )
+        assert {keys[node] for node in found} == set(expected)
+
+
+def test_cooccurrence_counts_shared_events():
+    graph = CompactGraph.from_rows(ROWS)
+    actors_by_event = {}
+    for actor_id, _, event_id, *_ in ROWS:
+        actors_by_event.setdefault(event_id, set()).add(actor_id)
+    expected = Counter(
+        pair
+        for actors in actors_by_event.values()
+        for pair in itertools.combinations(sorted(actors), 2)
+    )
+    a, b, weights = graph.cooccurrence()
+    found = {
+        (int(graph.db_ids[x]), int(graph.db_ids[y])): int(w)
+        for x, y, w in zip(a, b, weights)
+    }
+    assert found == dict(expected)
+    # Restricted to one event
+    a, b, weights = graph.cooccurrence(np.array([graph.node('event_11')]))
+    assert [graph.key(x) for x in a] == ['actor_2']
+    assert [graph.key(y) for y in b] == ['actor_3']
+    assert weights.tolist() == [1]
+
+
+def test_from_store_matches_export(tmp_path):
+    store = GraphStore(tmp_path / 'graph.npz')
+    store.sync(_database())
+    graph = CompactGraph.from_store(store, '2025-01-01')
+    path = tmp_path / 'graph.gexf'
+    store.export_gexf(path, '2025-01-01')
+    exported = nx.read_gexf(path)
+    G = graph.to_networkx()
+    assert set(G.edges) == set(exported.edges)
+    for node, data in G.nodes(data=True):
+        data = {k: v for k, v in data.items() if v is not None}
+        assert exported.nodes[node] == data
+    assert graph.event_dates.tolist() == [
+        np.datetime64('2025-07-30'),
+        np.datetime64('2025-07-31'),
+    ]
+    # Without a date the old event is considered too, but it has no source
+    assert CompactGraph.from_store(store).kind_start.tolist() == [0, 2, 4, 6]
@@ -0,0 +1,63 @@
+import pytest
+
+from src.db import CheckoutStats, db_conninfo
+
+
+class _FakePool:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def get_stats(self):
+        return self.stats
+
+
+@pytest.mark.database
+def test_db_conninfo_reads_environment(monkeypatch):
+    monkeypatch.setenv('DB_NAME', 'news')
+    monkeypatch.setenv('DB_USER', 'reader')
+    monkeypatch.setenv('DB_PASSWORD', 'secret')
+    monkeypatch.setenv('DB_HOST', 'db')
+    monkeypatch.setenv('DB_PORT', '5433')
+    parts = dict(item.split('=') for item in db_conninfo().split())
+    assert parts == {
+        'dbname': 'news',
+        'user': 'reader',
+        'password': 'secret',
+        'host': 'db',
+        'port': '5433',
+    }
+
+
+@pytest.mark.database
+def test_metrics_combine_pool_counters_and_checkouts():
+    stats = CheckoutStats()
+    for seconds in (0.001, 0.003):
+        stats.record(seconds)
+    stats.release()
+    pool = _FakePool(
+        {
+            'pool_size': 4,
+            'pool_available': 1,
+            'requests_waiting': 2,
+            'requests_num': 5,
+            'requests_wait_ms': 50,
+        }
+    )
+    metrics = stats.metrics(pool)
+    assert metrics['in_use'] == 1
+    assert metrics['available'] == 1
+    assert metrics['waiting'] == 2
+    assert metrics['wait_ms_avg'] == 10
+    assert metrics['checkouts'] == 2
+    assert abs(metrics['checkout_ms_avg'] - 2.0) < 1e-9
+    assert abs(metrics['checkout_ms_max'] - 3.0) < 1e-9
+    # Counters psycopg_pool has not reported yet count as zero
+    assert metrics['connection_errors'] == 0
+
+
+@pytest.mark.database
+def test_metrics_of_an_unused_pool():
+    metrics = CheckoutStats().metrics(_FakePool({}))
+    assert metrics['in_use'] == 0
+    assert metrics['wait_ms_avg'] == 0.0
+    assert metrics['checkout_ms_avg'] == 0.0
@@ -0,0 +1,109 @@
+import pytest
+
+from ..event_clustering import (
+    candidate_pairs,
+    cluster_events,
+    cluster_events_across_dates,
+    event_vectors,
+    linked_clusters,
+    similar_roots,
+)
+
+
+def _event(id, event, details, actors=()):
+    return {'id': id, 'event': event, 'details': details, 'actors': actors}
+
+
+EVENTS = [
+    _event(
+        1,
+        'Flood in Kathmandu',
+        'Heavy rain flooded the Bagmati river in Kathmandu',
+        ['Nepal Army'],
+    ),
+    _event(2, 'Budget announced', 'The finance minister presented the budget'),
+    _event(
+        3,
+        'Kathmandu floods',
+        'The Bagmati river flooded parts of Kathmandu after heavy rain',
+        ['Nepal Army'],
+    ),
+]
+
+
+@pytest.mark.datatransform
+def test_event_vectors_are_unit_length():
+    vectors = event_vectors(EVENTS)
+    assert vectors.shape[0] == 3
+    assert abs(float((vectors[0] ** 2).sum()) - 1) < 1e-5
+
+
+@pytest.mark.datatransform
+def test_similar_events_are_clustered():
+    clusters = cluster_events(EVENTS)
+    assert [[e['id'] for e in cluster] for cluster in clusters] == [
+        [1, 3],
+        [2],
+    ]
+
+
+@pytest.mark.datatransform
+def test_oversized_clusters_are_split():
+    events = [EVENTS[0], EVENTS[2], EVENTS[0], EVENTS[2]]
+    clusters = cluster_events(events, max_cluster_size=3)
+    assert [len(cluster) for cluster in clusters] == [3, 1]
+
+
+@pytest.mark.datatransform
+def test_single_and_empty_dates():
+    assert cluster_events([]) == []
+    assert cluster_events(EVENTS[:1]) == [EVENTS[:1]]
+
+
+@pytest.mark.datatransform
+def test_similar_roots_in_blocks_match_full_matrix():
+    import numpy as np
+
+    vectors = event_vectors(EVENTS * 3)
+    similarity = vectors @ vectors.T
+    rows, cols = np.nonzero(np.triu(similarity >= 0.25, k=1))
+    expected = [
+        min(cluster)
+        for index in range(len(vectors))
+        for cluster in linked_clusters(len(vectors), zip(rows, cols), 100)
+        if index in cluster
+    ]
+    for block in (1, 2, 5, 100):
+        roots = similar_roots(vectors, 0.25, block=block)
+        assert roots.tolist() == expected
+    assert len(similar_roots(vectors[:0])) == 0
+
+
+@pytest.mark.datatransform
+def test_candidate_pairs_use_window_and_actors():
+    events = [
+        _event(1, 'a', 'a', ['Police']),
+        _event(2, 'b', 'b', ['Army']),
+        _event(3, 'c', 'c', ['Police']),
+        _event(4, 'd', 'd', ['Police']),
+    ]
+    dates = ['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-05']
+    pairs = candidate_pairs(events, dates, window_days=1)
+    # Police one day apart; not four days apart, and same-date pairs are
+    # left to similar_roots
+    assert pairs == {(0, 2)}
+
+
+@pytest.mark.datatransform
+def test_clusters_are_anchored_at_earliest_date():
+    clusters = cluster_events_across_dates(
+        {
+            '2024-01-02': [EVENTS[2]],
+            '2024-01-01': [EVENTS[0], EVENTS[1]],
+        },
+        window_days=1,
+    )
+    assert {
+        date: [[e['id'] for e in cluster] for cluster in date_clusters]
+        for date, date_clusters in clusters.items()
+    } == {'2024-01-01': [[1, 3], [2]], '2024-01-02': []}
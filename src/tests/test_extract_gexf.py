@@ -1,11 +1,12 @@
+from contextlib import contextmanager
 import networkx as nx
 from .. import extract_gexf
 
 
-def test_fetch_joined_tuples(monkeypatch):
+def test_fetch_joined_tuples():
     """
-    Test fetch_joined_tuples by monkeypatching psycopg.connect
-    to return fake joined rows.
+    Test fetch_joined_tuples against a fake database that returns fake
+    joined rows.
     """
 
     # Fake DB rows
@@ -41,12 +42,12 @@ def test_fetch_joined_tuples(monkeypatch):
         def cursor(self):
             return FakeCursor()
 
-    # Patch psycopg.connect
-    monkeypatch.setattr(
-        extract_gexf.psycopg, 'connect', lambda *a, **kw: FakeConnection()
-    )
+    class FakeDatabase:
+        @contextmanager
+        def connection(self):
+            yield FakeConnection()
 
-    rows = extract_gexf.fetch_joined_tuples('2025-01-01')
+    rows = extract_gexf.fetch_joined_tuples('2025-01-01', db=FakeDatabase())
     assert rows == fake_rows
     assert isinstance(rows, list)
     assert len(rows) == 1
@@ -102,3 +103,94 @@ def test_build_graph_creates_expected_graph():
     assert source_node['url'] == 'http://example.com'
     assert source_node['published_date'] == '2025-07-31'
     assert source_node['role'] == 'source'
+
+
+def test_stream_gexf_matches_build_graph(tmp_path):
+    """
+    stream_gexf reads the actor and source links separately; the file it
+    writes must hold the same graph as build_graph on the joined rows.
+    """
+    actors = {1: 'Actor A', 2: 'Actor "B" & co'}
+    events = {10: ('Event X', 'Details <X>'), 11: ('Event Y', None)}
+    sources = {
+        20: ('Source P', 'http://example.com/p', '2025-07-30'),
+        21: ('Source Q', 'http://example.com/q', '2025-07-31'),
+    }
+    event_actors = [(10, 1), (10, 2), (11, 2)]
+    event_sources = [(10, 20), (10, 21), (11, 21)]
+    joined_rows = [
+        (a, actors[a], e, *events[e], s, *sources[s])
+        for e, a in event_actors
+        for e2, s in event_sources
+        if e2 == e
+    ]
+    results = {
+        extract_gexf.EVENT_NODES_QUERY: [
+            (e, label, details) for e, (label, details) in events.items()
+        ],
+        extract_gexf.ACTOR_EDGES_QUERY: [
+            (a, actors[a], e) for e, a in event_actors
+        ],
+        extract_gexf.SOURCE_EDGES_QUERY: [
+            (s, *sources[s], e) for e, s in event_sources
+        ],
+    }
+
+    statements = []
+
+    class FakeCursor:
+        def __init__(self, name):
+            self.name = name
+            self.rows = []
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *a):
+            pass
+
+        def execute(self, query, params):
+            assert params == {'date_from': '2025-01-01'}
+            statements.append(query)
+            self.rows = results[query]
+
+        def __iter__(self):
+            return iter(self.rows)
+
+    class FakeConnection:
+        def execute(self, query):
+            statements.append(query)
+
+        def cursor(self, name):
+            return FakeCursor(name)
+
+    class FakeDatabase:
+        @contextmanager
+        def connection(self):
+            yield FakeConnection()
+
+    path = tmp_path / 'graph.gexf'
+    counts = extract_gexf.stream_gexf(
+        '2025-01-01', path, db=FakeDatabase(), batch_size=2
+    )
+    streamed = nx.read_gexf(path)
+    expected = extract_gexf.build_graph(joined_rows)
+    assert counts == (6, 6)
+    # Every query runs in the same snapshot
+    assert statements[0].startswith(
+        'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ'
+    )
+    assert len(statements) == 4
+    assert set(streamed.edges) == set(expected.edges)
+    for node, data in expected.nodes(data=True):
+        data = {k: v for k, v in data.items() if v is not None}
+        assert streamed.nodes[node] == data
+
+
+def test_id_set_adds_each_id_once():
+    ids = extract_gexf.IdSet()
+    assert ids.add(0)
+    assert ids.add(70_000)
+    assert not ids.add(70_000)
+    assert ids.add(7)
+    assert not ids.add(0)
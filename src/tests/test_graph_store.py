@@ -0,0 +1,212 @@
+import sqlite3
+from contextlib import contextmanager
+
+import networkx as nx
+
+from .. import extract_gexf
+from ..graph_store import SYNC_FROM_QUERY, GraphStore, StringTable
+
+_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+_UPDATED_AT = f'updated_at TEXT NOT NULL DEFAULT ({_NOW})'
+SCHEMA = f"""
+    CREATE TABLE actors (id INTEGER PRIMARY KEY, label TEXT, {_UPDATED_AT});
+    CREATE TABLE events (
+        id INTEGER PRIMARY KEY, event_date TEXT, label TEXT, details TEXT,
+        {_UPDATED_AT}
+    );
+    CREATE TABLE sources (
+        id INTEGER PRIMARY KEY, published_date TEXT, title TEXT, url TEXT,
+        {_UPDATED_AT}
+    );
+    CREATE TABLE event_actors (
+        id INTEGER PRIMARY KEY, event_id INTEGER, actor_id INTEGER,
+        {_UPDATED_AT}
+    );
+    CREATE TABLE event_sources (
+        id INTEGER PRIMARY KEY, event_id INTEGER, source_id INTEGER,
+        {_UPDATED_AT}
+    );
+"""
+
+
+class _SQLiteCursor:
+    """Runs the graph store's Postgres queries on SQLite."""
+
+    def __init__(self, conn):
+        self.cur = conn.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        pass
+
+    def execute(self, query, params=()):
+        if query == SYNC_FROM_QUERY:
+            query = f'SELECT {_NOW}'
+        if not query.startswith('SET TRANSACTION'):
+            self.cur.execute(query.replace('%s', '?'), params)
+
+    def fetchone(self):
+        return self.cur.fetchone()
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+
+class _SQLiteDatabase:
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.executescript(SCHEMA)
+
+    def insert(self, table, *rows):
+        columns = [
+            row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')
+        ][: len(rows[0])]
+        marks = ', '.join('?' * len(rows[0]))
+        self.conn.executemany(
+            f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({marks})',
+            rows,
+        )
+
+    @contextmanager
+    def connection(self):
+        conn = self.conn
+
+        class Connection:
+            def cursor(self):
+                return _SQLiteCursor(conn)
+
+            def commit(self):
+                conn.commit()
+
+        yield Connection()
+
+
+def _database():
+    db = _SQLiteDatabase()
+    db.insert('actors', (1, 'Actor A'), (2, 'अभिनेता B'))
+    db.insert(
+        'events',
+        (10, '2025-07-30', 'Event X', 'Details <X>'),
+        (11, '2025-07-31', 'Event Y', None),
+        (12, '2024-01-01', 'Old event', 'old'),
+    )
+    db.insert(
+        'sources',
+        (20, '2025-07-30', 'Source P', 'http://example.com/p'),
+        (21, '2025-07-31', 'Source Q', 'http://example.com/q'),
+    )
+    db.insert('event_actors', (1, 10, 1), (2, 10, 2), (3, 11, 2), (4, 12, 1))
+    db.insert('event_sources', (1, 10, 20), (2, 10, 21), (3, 11, 21))
+    return db
+
+
+def test_string_table_take_and_concat():
+    table = StringTable.from_strings(['ab', '', 'नेपाल', None])
+    assert list(table) == ['ab', '', 'नेपाल', '']
+    assert list(table.take([2, 0])) == ['नेपाल', 'ab']
+    assert len(table.take([])) == 0
+    joined = table.concat(StringTable.from_strings(['c']))
+    assert list(joined) == ['ab', '', 'नेपाल', '', 'c']
+    assert joined[4] == 'c'
+
+
+def test_sync_applies_inserts_and_deletes(tmp_path):
+    db = _database()
+    store = GraphStore(tmp_path / 'graph.npz')
+    assert store.sync(db) == (14, 0)
+    assert store.high_water['events'] == 12
+
+    db.insert('events', (13, '2025-08-01', 'Event Z', 'new'))
+    db.insert('event_actors', (5, 13, 1))
+    db.insert('event_sources', (4, 13, 20))
+    db.conn.execute('DELETE FROM event_actors WHERE id = 2')
+    assert store.sync(db) == (3, 1)
+
+    # The snapshot is saved and reloaded as it was synced
+    reloaded = GraphStore(tmp_path / 'graph.npz')
+    assert reloaded.tables['events']['id'].tolist() == [10, 11, 12, 13]
+    assert reloaded.tables['event_actors']['id'].tolist() == [1, 3, 4, 5]
+    assert list(reloaded.tables['events']['label'])[-1] == 'Event Z'
+    assert reloaded.high_water['event_actors'] == 5
+
+
+def test_sync_picks_up_updated_and_late_rows(tmp_path):
+    db = _database()
+    store = GraphStore(tmp_path / 'graph.npz')
+    store.sync(db)
+    db.conn.execute(
+        f"UPDATE sources SET title = 'Source P2', updated_at = {_NOW} "
+        'WHERE id = 20'
+    )
+    # A link committed after the sync with an id below its high-water mark
+    db.conn.execute('DELETE FROM event_actors WHERE id = 2')
+    store.sync(db)
+    db.insert('event_actors', (2, 10, 2))
+    assert store.sync(db) == (1, 0)
+
+    reloaded = GraphStore(tmp_path / 'graph.npz')
+    assert list(reloaded.tables['sources']['title']) == [
+        'Source P2',
+        'Source Q',
+    ]
+    assert reloaded.tables['event_actors']['id'].tolist() == [1, 2, 3, 4]
+
+
+def test_sync_rebuilds_when_ids_go_backwards(tmp_path):
+    db = _database()
+    store = GraphStore(tmp_path / 'graph.npz')
+    store.sync(db)
+    for table in ('event_actors', 'event_sources', 'events'):
+        db.conn.execute(f'DELETE FROM {table}')
+    db.insert('events', (1, '2025-08-01', 'Fresh', None))
+    store.sync(db)
+    assert store.tables['events']['id'].tolist() == [1]
+    assert store.high_water['events'] == 1
+    assert len(store.tables['event_actors']) == 0
+
+
+def test_export_matches_build_graph(tmp_path):
+    db = _database()
+    store = GraphStore(tmp_path / 'graph.npz')
+    store.sync(db)
+    path = tmp_path / 'graph.gexf'
+    store.export_gexf(path, '2025-01-01')
+    joined_rows = db.conn.execute(
+        """
+        SELECT a.id, a.label, e.id, e.label, e.details,
+            s.id, s.title, s.url, s.published_date
+        FROM events e
+        JOIN event_sources es ON e.id = es.event_id
+        JOIN sources s ON es.source_id = s.id
+        JOIN event_actors ea ON e.id = ea.event_id
+        JOIN actors a ON ea.actor_id = a.id
+        WHERE e.event_date >= '2025-01-01'
+        """
+    ).fetchall()
+    expected = extract_gexf.build_graph(joined_rows)
+    exported = nx.read_gexf(path)
+    assert set(exported.edges) == set(expected.edges)
+    for node, data in expected.nodes(data=True):
+        data = {k: v for k, v in data.items() if v is not None}
+        assert exported.nodes[node] == data
+
+
+def test_neighborhood_follows_links_both_ways(tmp_path):
+    store = GraphStore(tmp_path / 'graph.npz')
+    store.sync(_database())
+    assert sorted(store.neighborhood('actor_2')) == [
+        'actor_2',
+        'event_10',
+        'event_11',
+    ]
+    assert sorted(store.neighborhood('actor_2', hops=2)) == [
+        'actor_1',
+        'actor_2',
+        'event_10',
+        'event_11',
+        'source_20',
+        'source_21',
+    ]
+    assert 'event_12' in store.neighborhood('actor_1')
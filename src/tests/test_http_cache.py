@@ -0,0 +1,48 @@
+from ..http_cache import HTTPCache
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'))
+    cache.put('u1', b'body', etag='"abc"', last_modified='Mon, 28 Jul 2025')
+    entry = cache.get('u1')
+    assert entry.body == b'body'
+    assert cache.is_fresh(entry)
+    assert cache.conditional_headers(entry) == {
+        'If-None-Match': '"abc"',
+        'If-Modified-Since': 'Mon, 28 Jul 2025',
+    }
+    assert cache.get('missing') is None
+    cache.close()
+
+
+def test_entries_expire_after_ttl_and_refresh(tmp_path):
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'), ttl=0)
+    cache.put('u1', b'body', etag='"abc"')
+    assert not cache.is_fresh(cache.get('u1'))
+    cache.ttl = 60
+    cache.refresh('u1')
+    assert cache.is_fresh(cache.get('u1'))
+    cache.close()
+
+
+def test_lru_eviction_respects_size_cap(tmp_path):
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'), max_bytes=10)
+    cache.put('old', b'12345')
+    cache.put('recent', b'12345')
+    cache.get('old')
+    cache.put('new', b'12345')
+    assert cache.get('recent') is None
+    assert cache.get('old') is not None
+    assert cache.get('new') is not None
+    assert cache.total_bytes() <= 10
+    cache.close()
+
+
+def test_cache_persists_on_disk(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = HTTPCache(path)
+    cache.put('u1', b'body')
+    cache.close()
+    reopened = HTTPCache(path)
+    assert reopened.get('u1').body == b'body'
+    reopened.close()
@@ -0,0 +1,43 @@
+import json
+import pytest
+from ..jsonl_io import (
+    iter_records,
+    legacy_json_path,
+    records_by_date,
+    write_records,
+)
+
+
+@pytest.mark.datatransform
+def test_write_and_iter_records_round_trip(tmp_path):
+    path = str(tmp_path / 'articles.jsonl')
+    records = [{'url': 'u1', 'title': 'शीर्षक'}, {'url': 'u2', 'title': 'T'}]
+    assert write_records(path, iter(records)) == 2
+    assert list(iter_records(path)) == records
+
+
+@pytest.mark.datatransform
+def test_write_records_appends(tmp_path):
+    path = str(tmp_path / 'articles.jsonl')
+    write_records(path, [{'url': 'u1'}])
+    write_records(path, [{'url': 'u2'}], append=True)
+    assert [r['url'] for r in iter_records(path)] == ['u1', 'u2']
+
+
+@pytest.mark.datatransform
+def test_iter_records_falls_back_to_legacy_json_array(tmp_path):
+    path = str(tmp_path / 'articles.jsonl')
+    with open(legacy_json_path(path), 'w', encoding='utf-8') as f:
+        json.dump([{'url': 'u1'}], f)
+    assert list(iter_records(path)) == [{'url': 'u1'}]
+
+
+@pytest.mark.datatransform
+def test_iter_records_reads_legacy_date_keyed_json(tmp_path):
+    path = str(tmp_path / 'grouped.json')
+    grouped = {'2024-01-01': [{'id': '1'}], '2024-01-02': [{'id': '1'}]}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(grouped, f)
+    records = list(iter_records(path))
+    assert records[0] == {'date': '2024-01-01', 'events': [{'id': '1'}]}
+    assert records_by_date(records) == grouped
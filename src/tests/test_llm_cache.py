@@ -0,0 +1,44 @@
+from ..llm_cache import LLMCache, cache_key
+
+
+def test_cache_key_depends_on_every_input():
+    base = cache_key('model', 'prompt', {'type': 'array'}, 'content')
+    assert base == cache_key('model', 'prompt', {'type': 'array'}, 'content')
+    assert base != cache_key('other', 'prompt', {'type': 'array'}, 'content')
+    assert base != cache_key('model', 'other', {'type': 'array'}, 'content')
+    assert base != cache_key('model', 'prompt', {'type': 'object'}, 'content')
+    assert base != cache_key('model', 'prompt', {'type': 'array'}, 'other')
+
+
+def test_hits_and_misses_are_counted(tmp_path):
+    cache = LLMCache(str(tmp_path / 'llm.sqlite'))
+    assert cache.get('k') is None
+    cache.put('k', [{'event': 'घटना'}])
+    assert cache.get('k') == [{'event': 'घटना'}]
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+    cache.close()
+
+
+def test_invalidate_prompt_version(tmp_path):
+    cache = LLMCache(str(tmp_path / 'llm.sqlite'))
+    cache.put('old', [], prompt_version='1')
+    cache.put('new', [], prompt_version='2')
+    assert cache.invalidate_prompt_version('1') == 1
+    assert cache.get('old') is None
+    assert cache.get('new') == []
+    cache.close()
+
+
+def test_size_bounded_lru_eviction(tmp_path):
+    cache = LLMCache(str(tmp_path / 'llm.sqlite'), max_bytes=20)
+    cache.put('a', 'x' * 6)
+    cache.put('b', 'x' * 6)
+    cache.get('a')
+    cache.put('c', 'x' * 6)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.stats()['bytes'] <= 20
+    cache.close()
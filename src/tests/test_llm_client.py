@@ -0,0 +1,63 @@
+import asyncio
+import time
+import pytest
+from ..llm_client import LLMClient, TokenBucket
+from .fake_gemini import FakeGeminiServer
+
+
+def test_map_returns_results_in_input_order():
+    with FakeGeminiServer(respond=str.upper, latency=0.02) as server:
+        llm = LLMClient(api_key='test', base_url=server.base_url)
+        results = list(llm.map(range(10), lambda i: {'contents': f'req {i}'}))
+        llm.close()
+    assert results == [(i, f'REQ {i}') for i in range(10)]
+    assert server.peak_in_flight > 1
+
+
+def test_concurrency_is_capped():
+    with FakeGeminiServer(latency=0.05) as server:
+        llm = LLMClient(
+            api_key='test',
+            base_url=server.base_url,
+            max_concurrency=3,
+            requests_per_minute=6000,
+        )
+        list(llm.map(range(12), lambda i: {'contents': str(i)}))
+        llm.close()
+    assert server.peak_in_flight <= 3
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_retryable_errors_are_retried(status):
+    with FakeGeminiServer(fail_first=2, fail_status=status) as server:
+        llm = LLMClient(
+            api_key='test', base_url=server.base_url, backoff_base=0.01
+        )
+        assert llm.run('hello') == '[]'
+        llm.close()
+    assert llm.retries == 2
+    assert server.requests == 3
+
+
+def test_client_errors_are_not_retried():
+    with FakeGeminiServer(fail_first=1, fail_status=400) as server:
+        llm = LLMClient(
+            api_key='test', base_url=server.base_url, backoff_base=0.01
+        )
+        results = list(llm.map(['a'], lambda item: {'contents': item}))
+        llm.close()
+    assert isinstance(results[0][1], Exception)
+    assert server.requests == 1
+
+
+def test_token_bucket_throttles_to_rate():
+    async def take(bucket, count):
+        for _ in range(count):
+            await bucket.acquire()
+
+    bucket = TokenBucket(rate_per_minute=600)
+    bucket.tokens = 0
+    start = time.monotonic()
+    asyncio.run(take(bucket, 5))
+    # 600 per minute refills one token every 0.1s
+    assert time.monotonic() - start >= 0.45
@@ -0,0 +1,74 @@
+from ..name_dedup import (
+    MinHasher,
+    dedupe_names,
+    jaccard,
+    lsh_candidate_pairs,
+    match_key,
+    shingles,
+)
+
+
+def test_match_key_folds_devanagari_variants():
+    # Nukta, chandrabindu/anusvara and zero-width joiners
+    assert match_key('क़ानून') == match_key('कानून')
+    assert match_key('काठमाडौँ') == match_key('काठमाडौं')
+    assert match_key('प्र‍हरी') == match_key('प्रहरी')
+    # Punctuation, whitespace and generic suffixes
+    assert match_key('पोखरा, नेपाल।') == match_key('पोखरा')
+    assert match_key('Nepal  Police.') == 'nepal police'
+    assert match_key('नेपाल') == 'नेपाल'
+
+
+def test_minhash_estimates_jaccard():
+    a = shingles('nepal police force')
+    b = shingles('nepal police forces')
+    hasher = MinHasher(num_perm=256)
+    estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+    assert abs(estimate - jaccard(a, b)) < 0.15
+
+
+def test_lsh_finds_similar_pairs_only():
+    hasher = MinHasher()
+    keys = ['nepal police force', 'nepal police forces', 'armed forces']
+    signatures = [hasher.signature(shingles(key)) for key in keys]
+    assert (0, 1) in lsh_candidate_pairs(signatures)
+    assert (0, 2) not in lsh_candidate_pairs(signatures)
+
+
+def test_dedupe_names_groups_obvious_duplicates():
+    groups = dedupe_names(
+        [
+            'पोखरा',
+            'पोखरा, नेपाल',
+            'काठमाडौं',
+            'काठमाडौँ',
+            'Nepal Police Force',
+            'Nepal Police Forces',
+            'Nepal Army',
+        ],
+        preferred={'काठमाडौं'},
+    )
+    assert groups == {
+        'Nepal Army': ['Nepal Army'],
+        'Nepal Police Force': ['Nepal Police Force', 'Nepal Police Forces'],
+        'काठमाडौं': ['काठमाडौँ', 'काठमाडौं'],
+        'पोखरा': ['पोखरा', 'पोखरा, नेपाल'],
+    }
+
+
+def test_dedupe_names_keeps_numbered_names_apart():
+    names = [
+        'वडा नं. १०',
+        'वडा नं. ११',
+        'Kathmandu Metropolitan City Ward 4',
+        'Kathmandu Metropolitan City Ward 5',
+        'Lumbini Province 5',
+        'Lumbini Province 6',
+        'प्रदेश नं. १',
+        'प्रदेश नं. २',
+    ]
+    assert dedupe_names(names) == {name: [name] for name in sorted(names)}
+    # The same number in either script is still a duplicate
+    assert dedupe_names(['वडा नं. १०', 'वडा नं 10']) == {
+        'वडा नं 10': ['वडा नं 10', 'वडा नं. १०']
+    }
@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+from ..pipeline import Pipeline, Stage
+
+
+def _source(n, events=None):
+    def run():
+        for i in range(n):
+            if events is not None:
+                events.append(('source', i))
+            yield i
+
+    return run
+
+
+def test_stages_pass_records_in_memory_and_report_stats():
+    seen = []
+
+    def sink(records):
+        seen.extend(records)
+
+    pipeline = Pipeline(
+        [
+            Stage('a', _source(5)),
+            Stage('b', lambda records: (r * 10 for r in records), input='a'),
+            Stage('c', sink, input='b'),
+        ],
+        queue_size=2,
+    )
+    stats = pipeline.run()
+    assert seen == [0, 10, 20, 30, 40]
+    assert [(s.name, s.records_in, s.records_out) for s in stats] == [
+        ('a', 0, 5),
+        ('b', 5, 5),
+        ('c', 5, 0),
+    ]
+    assert all(s.seconds >= 0 for s in stats)
+
+
+def test_stages_overlap():
+    events = []
+
+    def consumer(records):
+        for record in records:
+            events.append(('consumer', record))
+        return ()
+
+    Pipeline(
+        [Stage('a', _source(50, events)), Stage('b', consumer, input='a')],
+        queue_size=1,
+    ).run()
+    # With a one-record queue the consumer starts before the source ends
+    first_consumed = events.index(('consumer', 0))
+    assert first_consumed < events.index(('source', 49))
+
+
+def test_single_stage_runs_without_its_input_stage():
+    calls = []
+    pipeline = Pipeline(
+        [
+            Stage('a', _source(3)),
+            Stage('b', lambda records=None: calls.append(records), input='a'),
+        ]
+    )
+    pipeline.run(['b'])
+    assert calls == [None]
+
+
+def test_after_waits_for_dependency():
+    order = []
+    release = threading.Event()
+
+    def slow():
+        release.wait(1)
+        order.append('a')
+
+    def fast():
+        order.append('b')
+
+    pipeline = Pipeline([Stage('a', slow), Stage('b', fast, after=('a',))])
+    thread = threading.Thread(target=pipeline.run)
+    thread.start()
+    release.set()
+    thread.join()
+    assert order == ['a', 'b']
+
+
+def test_failing_stage_stops_the_others_and_is_raised():
+    def broken(records):
+        for record in records:
+            if record == 3:
+                raise ValueError('bad record')
+            yield record
+
+    pipeline = Pipeline(
+        [
+            Stage('a', _source(10_000)),
+            Stage('b', broken, input='a'),
+            Stage('c', lambda records: list(records), input='b'),
+        ],
+        queue_size=2,
+    )
+    with pytest.raises(ValueError, match='bad record'):
+        pipeline.run()
+    assert pipeline.stats[1].error is not None
+
+
+def test_unknown_stage_is_rejected():
+    with pytest.raises(ValueError):
+        Pipeline([Stage('a', _source(1))]).run(['missing'])
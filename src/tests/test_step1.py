@@ -1,3 +1,4 @@
+import json
 import pytest
 import os
 import requests
@@ -107,3 +108,225 @@ def test_extract_title_and_content_empty_html():
     assert title == ''
     assert published_date == ''
     assert content == ''
+
+
+def test_make_session_retries_with_backoff():
+    session = spa.make_session(pool_size=4, retries=2, backoff_factor=0.1)
+    adapter = session.get_adapter('https://www.onlinekhabar.com/')
+    assert adapter.max_retries.total == 2
+    assert adapter.max_retries.backoff_factor == 0.1
+    assert 503 in adapter.max_retries.status_forcelist
+
+
+def test_fetch_urls_concurrently_yields_every_url(monkeypatch):
+    monkeypatch.setattr(
+        spa,
+        'fetch_url_content',
+        lambda url, session=None, cache=None: f'<p>{url}</p>',
+    )
+    urls = [f'https://example.com/{i}' for i in range(10)]
+    results = dict(spa.fetch_urls_concurrently(urls, max_workers=4))
+    assert set(results) == set(urls)
+    assert results['https://example.com/3'] == '<p>https://example.com/3</p>'
+
+
+def test_fetch_urls_concurrently_respects_per_host_limit(monkeypatch):
+    import threading
+    import time
+
+    in_flight = {}
+    peak = {}
+    lock = threading.Lock()
+
+    def fake_fetch(url, session=None, cache=None):
+        host = url.split('/')[2]
+        with lock:
+            in_flight[host] = in_flight.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), in_flight[host])
+        time.sleep(0.01)
+        with lock:
+            in_flight[host] -= 1
+        return ''
+
+    monkeypatch.setattr(spa, 'fetch_url_content', fake_fetch)
+    urls = [f'https://a.com/{i}' for i in range(12)]
+    urls += [f'https://b.com/{i}' for i in range(12)]
+    list(spa.fetch_urls_concurrently(urls, max_workers=8, per_host_limit=2))
+    assert peak['a.com'] <= 2
+    assert peak['b.com'] <= 2
+
+
+def test_fetch_urls_concurrently_does_not_stall_behind_one_host(monkeypatch):
+    import time
+
+    def fake_fetch(url, session=None, cache=None):
+        time.sleep(0.01)
+        return ''
+
+    monkeypatch.setattr(spa, 'fetch_url_content', fake_fetch)
+    urls = [f'https://a.com/{i}' for i in range(20)]
+    urls += ['https://b.com/0', 'https://b.com/1']
+    fetched = [
+        url
+        for url, _ in spa.fetch_urls_concurrently(
+            urls, max_workers=4, per_host_limit=2
+        )
+    ]
+    assert sorted(fetched) == sorted(urls)
+    # b.com uses the workers a.com cannot, instead of queueing behind it
+    assert {'https://b.com/0', 'https://b.com/1'} <= set(fetched[:4])
+
+
+@pytest.mark.datatransform
+def test_preprocess_article_without_html():
+    record = spa.preprocess_article('https://example.com/x', None)
+    assert record == {
+        'url': 'https://example.com/x',
+        'title': '',
+        'published_date': '',
+        'content': '',
+    }
+
+
+def test_fetch_url_content_reuses_cached_body_on_304(tmp_path):
+    from ..http_cache import HTTPCache
+
+    class FakeResponse:
+        def __init__(self, status_code, content=b'', headers=None):
+            self.status_code = status_code
+            self.content = content
+            self.headers = headers or {}
+
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise requests.HTTPError(self.status_code)
+
+    class FakeSession:
+        def __init__(self):
+            self.sent_headers = []
+
+        def get(self, url, timeout=None, headers=None):
+            self.sent_headers.append(headers)
+            if headers:
+                return FakeResponse(304)
+            return FakeResponse(200, '<p>नेपाल</p>'.encode(), {'ETag': '"v1"'})
+
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'), ttl=0)
+    session = FakeSession()
+    url = 'https://example.com/a'
+    assert spa.fetch_url_content(url, session, cache) == '<p>नेपाल</p>'
+    assert spa.fetch_url_content(url, session, cache) == '<p>नेपाल</p>'
+    assert session.sent_headers[1] == {'If-None-Match': '"v1"'}
+    cache.close()
+
+
+@pytest.mark.datatransform
+def test_preprocess_articles_in_parallel_returns_every_record():
+    html = """
+    <html><body>
+      <h1 class="entry-title">Title</h1>
+      <div class="ok18-single-post-content-wrap"><p>Body</p></div>
+    </body></html>
+    """
+    fetched = [(f'https://example.com/{i}', html) for i in range(5)]
+    fetched.append(('https://example.com/missing', None))
+    records = list(
+        spa.preprocess_articles_in_parallel(
+            iter(fetched), processes=2, chunksize=2
+        )
+    )
+    by_url = {record['url']: record for record in records}
+    assert set(by_url) == {url for url, _ in fetched}
+    assert by_url['https://example.com/0']['title'] == 'Title'
+    assert by_url['https://example.com/0']['content'] == 'Body'
+    assert by_url['https://example.com/missing']['title'] == ''
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'html')
+
+
+@pytest.mark.contentextract
+@pytest.mark.parametrize('name', sorted(os.listdir(FIXTURES_DIR)))
+def test_fast_extraction_matches_full_parse_on_fixtures(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        html = f.read()
+    fast = spa.extract_title_and_content_fast(html)
+    assert fast == spa.extract_title_and_content_full(html)
+    assert fast[0] and fast[2]
+
+
+@pytest.mark.contentextract
+def test_fast_extraction_matches_full_parse_on_markup_edge_cases():
+    html = """
+    <html><body>
+      <h1 class="big entry-title"> Foo <!-- c --> <b> bar </b>
+        <script>ignored()</script> &amp; baz</h1>
+      <div class="ok-news-post-hour"><i>x</i><b><span> 2024-06-01 </span></b>
+        <span>second</span></div>
+      <p>outside</p>
+      <div class="ok18-single-post-content-wrap">
+        <p> one <style>p {}</style></p><div><p>two&nbsp;</p></div>
+        <template><p>hidden</p></template>
+      </div>
+    </body></html>
+    """
+    fast = spa.extract_title_and_content_fast(html)
+    assert fast == spa.extract_title_and_content_full(html)
+    assert fast == ('Foobar& baz', '2024-06-01', 'one\ntwo\n')
+
+
+@pytest.mark.contentextract
+def test_extract_title_and_content_falls_back_to_full_parse():
+    html = (
+        '<?xml version="1.0" encoding="utf-8"?><h1 class="entry-title">T</h1>'
+    )
+    assert spa.extract_title_and_content_fast(html) is None
+    title, _, _ = spa.extract_title_and_content(html)
+    assert title == 'T'
+
+
+CORPUS_PATH = os.path.join(
+    os.path.dirname(__file__), 'fixtures', 'date_rewrite_corpus.json'
+)
+
+
+@pytest.fixture
+def bs_year_2082(monkeypatch):
+    # The corpus was recorded with 2082 as the current BS year
+    monkeypatch.setattr(
+        spa.nepali_datetime.date,
+        'today',
+        classmethod(lambda cls: cls(2082, 4, 1)),
+    )
+
+
+@pytest.mark.datatransform
+def test_replace_dates_and_days_matches_regression_corpus(bs_year_2082):
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        corpus = json.load(f)
+    for case in corpus['texts']:
+        assert (
+            spa.replace_dates_and_days_in_text(case['input'])
+            == (case['output'])
+        )
+
+
+@pytest.mark.datatransform
+def test_parse_nepali_date_matches_regression_corpus():
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        corpus = json.load(f)
+    for case in corpus['published_dates']:
+        ndt, gdt, day = spa.parse_nepali_date(case['input'])
+        result = [str(ndt) if ndt else None, str(gdt) if gdt else None, day]
+        assert result == case['output']
+
+
+@pytest.mark.datatransform
+def test_replace_dates_and_days_in_text_forms(bs_year_2082):
+    text = 'सोमबार २०८२ साउन १२ गते, साउन १३ र १४ साउन'
+    assert spa.replace_dates_and_days_in_text(text) == (
+        'Monday 2025-07-28 (Monday), 2025-07-29 (Tuesday) '
+        'र 2025-07-30 (Wednesday)'
+    )
+    # Month names inside longer words are left alone
+    assert spa.replace_dates_and_days_in_text('साउनमा १२') == 'साउनमा १२'
@@ -1,3 +1,4 @@
+import json
 import os
 import pytest
 
@@ -19,3 +20,222 @@ def test_gemini_api_key_in_env():
     assert 'GEMINI_API_KEY' in env_content, (
         'GEMINI_API_KEY entry not found in .env file.'
     )
+
+
+def test_call_gemini_llm_returns_cached_entities(tmp_path):
+    from .. import step2_extract_events as step2
+    from ..llm_cache import LLMCache
+    from ..llm_client import LLMClient
+    from .fake_gemini import FakeGeminiServer
+
+    cache = LLMCache(str(tmp_path / 'llm.sqlite'))
+    article = {'title': 'T', 'published_date': 'D', 'content': 'C'}
+    with FakeGeminiServer(respond=lambda p: '[{"event": "E1"}]') as server:
+        llm = LLMClient(api_key='test', base_url=server.base_url, cache=cache)
+        first = step2.call_gemini_llm(article, 'prompt', llm)
+        second = step2.call_gemini_llm(article, 'prompt', llm)
+        llm.close()
+    assert first == second == {'entities': [{'event': 'E1'}]}
+    assert server.requests == 1
+    assert cache.stats()['hits'] == 1
+    cache.close()
+
+
+def test_extract_articles_events_keeps_input_order():
+    from .. import step2_extract_events as step2
+    from ..llm_client import LLMClient
+    from .fake_gemini import FakeGeminiServer
+
+    def respond(prompt):
+        return json.dumps([{'event': prompt.rsplit('\n', 1)[-1]}])
+
+    articles = [{'url': f'u{i}', 'content': f'article {i}'} for i in range(6)]
+    with FakeGeminiServer(respond=respond, latency=0.05) as server:
+        llm = LLMClient(api_key='test', base_url=server.base_url)
+        records = list(step2.extract_articles_events(articles, 'P', llm))
+        llm.close()
+    assert [r['url'] for r in records] == [a['url'] for a in articles]
+    assert records[3]['entities'] == [{'event': 'article 3'}]
+    assert server.peak_in_flight > 1
+
+
+def _batch_articles(n):
+    return [
+        {
+            'url': f'https://example.com/{i}',
+            'title': f'T{i}',
+            'published_date': 'D',
+            'content': f'content {i}',
+        }
+        for i in range(n)
+    ]
+
+
+def _run_batch(tmp_path, articles, backend, **kwargs):
+    from .. import step2_extract_events as step2
+
+    return step2.extract_articles_events_batch(
+        articles,
+        'prompt',
+        backend,
+        entities_path=str(tmp_path / 'entities.jsonl'),
+        state_path=str(tmp_path / 'batch_state.json'),
+        poll_interval=0,
+        checkpoint_dir=str(tmp_path / 'checkpoints'),
+        **kwargs,
+    )
+
+
+def _extracted_earlier(tmp_path, records, articles):
+    """Write records as a step2 run over articles would have."""
+    from .. import step2_extract_events as step2
+    from ..checkpoint import Checkpoint
+
+    checkpoint = Checkpoint(
+        'step2',
+        str(tmp_path / 'entities.jsonl'),
+        key='url',
+        directory=str(tmp_path / 'checkpoints'),
+    )
+    list(checkpoint.pending(articles, step2.extraction_input_hash))
+    checkpoint.write(records, done=lambda record: 'error' not in record)
+
+
+def test_batch_mode_chunks_and_merges_by_url(tmp_path):
+    from ..jsonl_io import iter_records
+    from .fake_batch import FakeBatchBackend
+
+    entities_path = str(tmp_path / 'entities.jsonl')
+    _extracted_earlier(
+        tmp_path,
+        [{'url': 'https://example.com/0', 'entities': ['kept']}],
+        _batch_articles(1),
+    )
+    backend = FakeBatchBackend(
+        respond=lambda contents: json.dumps([{'event': contents[-1]}])
+    )
+    merged, failed = _run_batch(
+        tmp_path, _batch_articles(7), backend, chunk_size=3
+    )
+
+    assert (merged, failed) == (6, [])
+    assert [len(contents) for contents in backend.jobs.values()] == [3, 3]
+    records = list(iter_records(entities_path))
+    assert [r['url'] for r in records] == [
+        f'https://example.com/{i}' for i in range(7)
+    ]
+    assert records[0]['entities'] == ['kept']
+    assert records[5]['entities'] == [{'event': '5'}]
+    assert not json.loads((tmp_path / 'batch_state.json').read_text())['jobs']
+
+
+def test_batch_mode_resumes_submitted_jobs(tmp_path):
+    from .fake_batch import FakeBatchBackend
+
+    class Interrupted(Exception):
+        pass
+
+    backend = FakeBatchBackend()
+    state = backend.state
+
+    def interrupt(name):
+        raise Interrupted
+
+    backend.state = interrupt
+    with pytest.raises(Interrupted):
+        _run_batch(tmp_path, _batch_articles(4), backend, chunk_size=2)
+    assert len(backend.jobs) == 2
+
+    backend.state = state
+    merged, failed = _run_batch(
+        tmp_path, _batch_articles(4), backend, chunk_size=2
+    )
+    assert (merged, failed) == (4, [])
+    assert len(backend.jobs) == 2
+
+
+def test_batch_mode_retries_failures_on_next_run(tmp_path):
+    from .fake_batch import FakeBatchBackend
+
+    articles = _batch_articles(4)
+    backend = FakeBatchBackend(
+        fail_jobs={1}, fail_request=lambda contents: contents.endswith(' 0')
+    )
+    merged, failed = _run_batch(tmp_path, articles, backend, chunk_size=2)
+    assert merged == 1
+    assert sorted(failed) == [
+        'https://example.com/0',
+        'https://example.com/2',
+        'https://example.com/3',
+    ]
+
+    merged, failed = _run_batch(
+        tmp_path, articles, FakeBatchBackend(), chunk_size=2
+    )
+    assert (merged, failed) == (3, [])
+
+
+def test_batch_mode_fails_articles_missing_from_results(tmp_path):
+    from .fake_batch import FakeBatchBackend
+
+    class ShortResults(FakeBatchBackend):
+        def results(self, name):
+            return super().results(name)[:1]
+
+    articles = _batch_articles(3)
+    merged, failed = _run_batch(tmp_path, articles, ShortResults())
+    assert merged == 1
+    assert failed == ['https://example.com/1', 'https://example.com/2']
+
+    merged, failed = _run_batch(tmp_path, articles, FakeBatchBackend())
+    assert (merged, failed) == (2, [])
+
+
+def test_batch_mode_uses_cache(tmp_path):
+    from ..llm_cache import LLMCache
+    from .fake_batch import FakeBatchBackend
+
+    cache = LLMCache(str(tmp_path / 'llm.sqlite'))
+    articles = _batch_articles(3)
+    first_run = tmp_path / 'first'
+    first_run.mkdir()
+    _run_batch(first_run, articles, FakeBatchBackend(), cache=cache)
+    backend = FakeBatchBackend()
+    merged, _ = _run_batch(tmp_path, articles, backend, cache=cache)
+    assert merged == 3
+    assert backend.jobs == {}
+
+
+def test_batch_mode_retries_errors_and_changed_articles(tmp_path):
+    from ..jsonl_io import iter_records
+    from .fake_batch import FakeBatchBackend
+
+    articles = _batch_articles(3)
+    _extracted_earlier(
+        tmp_path,
+        [
+            {'url': 'https://example.com/0', 'entities': ['kept']},
+            {'url': 'https://example.com/1', 'entities': [], 'error': 'x'},
+            {'url': 'https://example.com/2', 'entities': ['stale']},
+        ],
+        articles,
+    )
+    articles[2]['content'] = 'changed'
+    backend = FakeBatchBackend(
+        respond=lambda contents: json.dumps([{'event': contents[-7:]}])
+    )
+    merged, failed = _run_batch(tmp_path, articles, backend)
+
+    assert (merged, failed) == (2, [])
+    records = {
+        r['url']: r for r in iter_records(str(tmp_path / 'entities.jsonl'))
+    }
+    assert len(records) == 3
+    assert records['https://example.com/0']['entities'] == ['kept']
+    assert 'error' not in records['https://example.com/1']
+    assert records['https://example.com/2']['entities'] == [
+        {'event': 'changed'}
+    ]
+    # Nothing is left to do
+    merged, _ = _run_batch(tmp_path, articles, FakeBatchBackend())
+    assert merged == 0
@@ -1,5 +1,6 @@
 import pytest
 from src.step3_clean_extracted_events import (
+    build_alias_index,
     get_unique_field_values,
     canonicalize_actor,
     canonicalize_location,
@@ -95,3 +96,118 @@ def test_group_events_by_date():
     assert '2024-01-02' in grouped
     assert grouped['2024-01-01'][0]['event'] == 'E1'
     assert per_date['2024-01-02'][0]['event'] == 'E2'
+
+
+@pytest.mark.datatransform
+def test_build_alias_index_matches_linear_scan():
+    mapping = {
+        'Nepal Police': ['Nepal Police', 'Nepal Police Force'],
+        # An alias listed twice resolves to the first canonical name
+        'Police': ['Nepal Police Force', 'Police'],
+        'पोखरा': 'पोखरा',
+    }
+    index = build_alias_index(mapping)
+    for name in ['Nepal Police Force', 'Police', 'Random']:
+        assert index.get(name, name) == canonicalize_actor(name, mapping)
+    assert index['पोखरा'] == 'पोखरा'
+    assert build_alias_index(None) == {}
+
+
+@pytest.mark.datatransform
+def test_update_alias_registry_sends_only_new_names(tmp_path):
+    import json
+    from src.alias_registry import AliasRegistry
+    from src.step3_clean_extracted_events import update_alias_registry
+
+    class EchoLLM:
+        def __init__(self):
+            self.names = []
+
+        def map(self, items, to_request):
+            for bucket, candidates in items:
+                self.names.extend(bucket)
+                yield (bucket, candidates), '{}'
+
+    registry = AliasRegistry(str(tmp_path / 'aliases.sqlite'))
+    output = str(tmp_path / 'actors.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'Nepal Police': ['Nepal Police', 'Police']}, f)
+
+    llm = EchoLLM()
+    update_alias_registry(
+        registry, 'actor', {'Police', 'Police HQ'}, 'prompt', output, llm
+    )
+    assert llm.names == ['Police HQ']
+
+    llm = EchoLLM()
+    mapping = update_alias_registry(
+        registry, 'actor', {'Police', 'Police HQ'}, 'prompt', output, llm
+    )
+    assert llm.names == []
+    assert mapping == {
+        'Nepal Police': ['Nepal Police', 'Police'],
+        'Police HQ': ['Police HQ'],
+    }
+    registry.close()
+
+
+@pytest.mark.datatransform
+def test_update_alias_registry_unifies_everything_on_cold_start(tmp_path):
+    import json
+    from src.alias_registry import AliasRegistry
+    from src.step3_clean_extracted_events import update_alias_registry
+
+    class BucketLLM:
+        def __init__(self):
+            self.buckets = []
+
+        def map(self, items, to_request):
+            for bucket in items:
+                self.buckets.append(bucket)
+                reply = {'Police HQ': ['Police HQ', 'Police Headquarters']}
+                yield bucket, json.dumps(reply)
+
+    registry = AliasRegistry(str(tmp_path / 'aliases.sqlite'))
+    llm = BucketLLM()
+    mapping = update_alias_registry(
+        registry,
+        'actor',
+        {'Police HQ', 'Police Headquarters', 'Army'},
+        'prompt',
+        str(tmp_path / 'actors.json'),
+        llm,
+    )
+    # The names went through unify_names' buckets, not resolve_names
+    assert llm.buckets == [('Police HQ', 'Police Headquarters')]
+    assert mapping == {
+        'Army': ['Army'],
+        'Police HQ': ['Police HQ', 'Police Headquarters'],
+    }
+    registry.close()
+
+
+@pytest.mark.datatransform
+def test_offline_unification_needs_no_llm(tmp_path):
+    from src.alias_registry import AliasRegistry
+    from src.step3_clean_extracted_events import update_alias_registry
+
+    class NoLLM:
+        def map(self, items, to_request):
+            raise AssertionError('LLM called in offline mode')
+
+    registry = AliasRegistry(str(tmp_path / 'aliases.sqlite'))
+    registry.add('location', {'पोखरा': 'पोखरा'})
+    mapping = update_alias_registry(
+        registry,
+        'location',
+        {'पोखरा, नेपाल', 'काठमाडौं', 'काठमाडौँ'},
+        'prompt',
+        str(tmp_path / 'locations.json'),
+        NoLLM(),
+        offline=True,
+    )
+    assert mapping == {
+        'काठमाडौँ': ['काठमाडौँ', 'काठमाडौं'],
+        'पोखरा': ['पोखरा', 'पोखरा, नेपाल'],
+    }
+    registry.close()
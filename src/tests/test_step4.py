@@ -2,8 +2,12 @@ import pytest
 import json
 import tempfile
 import os
+from concurrent.futures import Future
 from src.step4_create_narrative import (
+    create_narratives,
+    windowed_records,
     extract_event_fields_by_date,
+    enrich_entries_with_source_articles,
     enrich_narrative_with_source_articles,
 )
 
@@ -100,3 +104,138 @@ def test_enrich_narrative_with_source_articles():
     assert 'source_event_indices' not in enriched['2024-01-01'][0]
     os.remove(f1.name)
     os.remove(f2.name)
+
+
+@pytest.mark.datatransform
+def test_enrich_entries_adds_locations_and_event_time():
+    events = [
+        {
+            'id': '1',
+            'event_date': '2024-01-02',
+            'event_time': '18:00',
+            'location': ['Kathmandu', 'Lalitpur'],
+        },
+        {
+            'id': '2',
+            'event_date': '2024-01-01',
+            'event_time': '20:00',
+            'location': 'Kathmandu',
+        },
+        {'id': '3', 'event_date': '2024-01-01', 'event_time': None},
+    ]
+    entries = [
+        {'event': 'E1', 'source_event_indices': ['1', '2', '3']},
+        {'event': 'E2', 'source_event_indices': ['3']},
+    ]
+    enriched = enrich_entries_with_source_articles(entries, events)
+    assert enriched[0]['locations'] == ['Kathmandu', 'Lalitpur']
+    # The earliest date's time, not the earliest time overall
+    assert enriched[0]['event_time'] == '20:00'
+    assert enriched[1]['locations'] == []
+    assert enriched[1]['event_time'] is None
+
+
+class _FakeLLM:
+    """Answers each merge request by merging all of its events into one."""
+
+    max_concurrency = 2
+
+    def __init__(self):
+        self.requests = []
+
+    def submit(self, contents, **kwargs):
+        self.requests.append(contents)
+        ids = [
+            int(line.split(':')[1].strip(' ,"'))
+            for line in contents.splitlines()
+            if line.strip().startswith('"id"')
+        ]
+        future = Future()
+        future.set_result(
+            json.dumps(
+                [
+                    {
+                        'event': 'merged',
+                        'details': 'merged',
+                        'actors': [],
+                        'source_event_indices': ids,
+                    }
+                ]
+            )
+        )
+        return future
+
+
+def _grouped_event(id, event, details):
+    return {
+        'id': id,
+        'event': event,
+        'details': details,
+        'actors': [],
+        'title': f'T{id}',
+        'article_url': f'U{id}',
+        'published_date': '2024-01-01',
+    }
+
+
+@pytest.mark.datatransform
+def test_create_narratives_only_sends_clusters():
+    records = [
+        {
+            'date': '2024-01-01',
+            'events': [
+                _grouped_event(1, 'Flood in Kathmandu', 'Bagmati flooded'),
+                _grouped_event(2, 'Budget announced', 'Minister spoke'),
+                _grouped_event(3, 'Kathmandu flood', 'Bagmati river flooded'),
+            ],
+        },
+        {
+            'date': '2024-01-02',
+            'events': [_grouped_event(4, 'Strike', 'Transport strike')],
+        },
+    ]
+    llm = _FakeLLM()
+    output = list(create_narratives(records, llm))
+    assert len(llm.requests) == 1
+    assert [record['date'] for record in output] == [
+        '2024-01-01',
+        '2024-01-02',
+    ]
+    merged, single = output[0]['events']
+    assert [s['article_url'] for s in merged['sources']] == ['U1', 'U3']
+    assert single['event'] == 'Budget announced'
+    assert single['sources'][0]['article_url'] == 'U2'
+    assert output[1]['events'][0]['event'] == 'Strike'
+
+
+@pytest.mark.datatransform
+def test_windowed_records_merge_across_dates():
+    records = [
+        {
+            'date': '2024-01-01',
+            'events': [
+                _grouped_event('1', 'Flood in Kathmandu', 'Bagmati flooded')
+            ],
+        },
+        {
+            'date': '2024-01-02',
+            'events': [
+                _grouped_event('2', 'Kathmandu flood', 'Bagmati flooded'),
+                _grouped_event('3', 'Budget announced', 'Minister spoke'),
+            ],
+        },
+    ]
+    for record in records:
+        for event in record['events']:
+            event['actors'] = ['Nepal Army']
+    windowed = list(windowed_records(records, window_days=1))
+    assert [record['clusters'] for record in windowed] == [
+        [['1', '2']],
+        [['1']],
+    ]
+    llm = _FakeLLM()
+    output = list(create_narratives(windowed, llm))
+    assert len(llm.requests) == 1
+    merged = output[0]['events'][0]
+    assert [s['title'] for s in merged['sources']] == ['T1', 'T2']
+    assert output[1]['events'][0]['event'] == 'Budget announced'
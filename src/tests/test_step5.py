@@ -20,3 +20,91 @@ def test_db_connection():
                 assert cur.fetchone()[0] == 1
     except Exception as e:
         pytest.fail(f'Database connection failed: {e}')
+
+
+@pytest.mark.datatransform
+def test_staging_rows_carry_sources_and_actors_as_arrays():
+    from src.step5_insert_narratives_into_db import event_hash, staging_rows
+
+    source = {
+        'title': 'T1',
+        'article_url': 'https://example.com/1',
+        'published_date': '2024-01-01 (Monday)',
+    }
+    records = [
+        {
+            'date': '2024-01-01',
+            'events': [
+                {
+                    'event': 'E1',
+                    'details': 'D1',
+                    'actors': ['A', 'B'],
+                    'sources': [source],
+                    'locations': ['Kathmandu'],
+                    'event_time': '9:05',
+                },
+                {'event': 'E2', 'details': None, 'actors': [], 'sources': []},
+            ],
+        },
+        {'date': '2024-01-02', 'events': None},
+        {
+            'date': '2024-01-03',
+            'events': [
+                {
+                    'event': 'E3',
+                    'details': 'D3',
+                    'actors': ['A'],
+                    'sources': [
+                        source,
+                        dict(source, published_date='२०८१-०९-१६'),
+                    ],
+                }
+            ],
+        },
+        # Unreadable dates would abort the COPY
+        {'date': '2024-02-30', 'events': [{'event': 'E4'}]},
+        {'date': None, 'events': [{'event': 'E5'}]},
+    ]
+    rows = list(staging_rows(records))
+    assert [row[0] for row in rows] == [1, 2, 3]
+    assert [row[1] for row in rows] == ['2024-01-01'] * 2 + ['2024-01-03']
+    # The source with an unreadable published date is dropped
+    assert rows[2][6:9] == (['T1'], ['https://example.com/1'], ['2024-01-01'])
+    assert rows[0] == (
+        1,
+        '2024-01-01',
+        '09:05',
+        event_hash(records[0]['events'][0]),
+        'E1',
+        'D1',
+        ['T1'],
+        ['https://example.com/1'],
+        ['2024-01-01'],
+        ['A', 'B'],
+        ['Kathmandu'],
+    )
+    assert rows[1][2] is None
+    assert rows[1][4:] == ('E2', None, [], [], [], [], [])
+
+
+@pytest.mark.datatransform
+def test_event_hash_keys_on_label_and_details_only():
+    from src.step5_insert_narratives_into_db import event_hash
+
+    event = {'event': 'E1', 'details': 'D1', 'actors': ['A'], 'sources': []}
+    moved = dict(event, actors=['A', 'B'], sources=[{'article_url': 'u'}])
+    assert event_hash(event) == event_hash(moved)
+    assert event_hash(event) != event_hash(dict(event, details='D2'))
+    assert event_hash(event) != event_hash(dict(event, details=None))
+
+
+@pytest.mark.datatransform
+def test_event_time_normalizes_or_drops_times():
+    from src.step5_insert_narratives_into_db import event_time
+
+    assert event_time({'event_time': '7:30'}) == '07:30'
+    assert event_time({'event_time': ' 18:45:10 '}) == '18:45'
+    assert event_time({'event_time': 'evening'}) is None
+    assert event_time({'event_time': '25:00'}) is None
+    assert event_time({'event_time': None}) is None
+    assert event_time({}) is None
@@ -0,0 +1,135 @@
+import json
+
+from ..unification import (
+    UnionFind,
+    build_buckets,
+    merge_partial_mappings,
+    normalize_name,
+    parse_unification_response,
+    unify_names,
+)
+
+
+def test_normalize_name():
+    assert normalize_name('  Nepal   Police, HQ.') == 'nepal police hq'
+    assert normalize_name('पोखरा, नेपाल') == 'पोखरा नेपाल'
+
+
+def test_buckets_are_bounded_and_skip_singletons():
+    names = [f'Police {i}' for i in range(25)] + ['Army']
+    buckets = build_buckets(names, max_bucket_size=10)
+    assert all(1 < len(bucket) <= 10 for bucket in buckets)
+    assert not any('Army' in bucket for bucket in buckets)
+    covered = {name for bucket in buckets for name in bucket}
+    assert covered == set(names) - {'Army'}
+
+
+def test_union_find_groups():
+    groups = UnionFind()
+    groups.union('a', 'b')
+    groups.union('c', 'd')
+    groups.union('b', 'd')
+    groups.find('e')
+    assert sorted(sorted(g) for g in groups.groups()) == [
+        ['a', 'b', 'c', 'd'],
+        ['e'],
+    ]
+
+
+def test_partial_mappings_merge_across_buckets():
+    names = ['Nepal Police', 'Police', 'Nepal Police Force', 'Army']
+    merged = merge_partial_mappings(
+        names,
+        [
+            {'Nepal Police': ['Nepal Police', 'Police']},
+            {'Nepal Police': ['Nepal Police Force', 'Made Up Name']},
+        ],
+    )
+    assert merged == {
+        'Army': ['Army'],
+        'Nepal Police': ['Nepal Police', 'Nepal Police Force', 'Police'],
+    }
+
+
+def test_parse_unification_response():
+    assert parse_unification_response('{"A": "a", "B": ["b", 1]}') == {
+        'A': ['a'],
+        'B': ['b'],
+    }
+    assert parse_unification_response('not json') == {}
+    assert parse_unification_response('[1]') == {}
+
+
+def test_unify_names_runs_buckets_concurrently(tmp_path):
+    from ..llm_client import LLMClient
+    from .fake_gemini import FakeGeminiServer
+
+    def respond(prompt):
+        # Group the bucket's names by their last word
+        groups = {}
+        for name in prompt.split('\n')[1:]:
+            groups.setdefault(name.split()[-1], []).append(name)
+        return json.dumps({min(v, key=len): v for v in groups.values()})
+
+    names = [f'Unit {i} Police' for i in range(30)]
+    names += [f'Unit {i} Army' for i in range(30)]
+    with FakeGeminiServer(respond=respond, latency=0.01) as server:
+        llm = LLMClient(api_key='test', base_url=server.base_url)
+        mapping = unify_names(names, 'prompt', llm, max_bucket_size=8)
+        llm.close()
+    assert server.requests > 1
+    assert server.peak_in_flight > 1
+    assert sorted(len(v) for v in mapping.values()) == [30, 30]
+    assert all(
+        len({name.split()[-1] for name in members}) == 1
+        for members in mapping.values()
+    )
+
+
+def test_failed_bucket_leaves_names_unmerged():
+    class FailingLLM:
+        def map(self, items, to_request):
+            for item in items:
+                yield item, RuntimeError('quota')
+
+    mapping = unify_names(['Police A', 'Police B'], 'prompt', FailingLLM())
+    assert mapping == {'Police A': ['Police A'], 'Police B': ['Police B']}
+
+
+class _RecordingLLM:
+    """Answers every bucket with the given reply and keeps the prompts."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    def map(self, items, to_request):
+        for item in items:
+            self.prompts.append(to_request(item)['contents'])
+            yield item, json.dumps(self.reply)
+
+
+def test_resolve_names_prefers_existing_canonical_names():
+    from ..unification import resolve_names
+
+    llm = _RecordingLLM(
+        {
+            'Nepal Police Force': ['Nepal Police Force', 'Police Nepal'],
+            'Nepal Police': ['Nepal Police', 'Nepal Police Force'],
+        }
+    )
+    resolved = resolve_names(
+        ['Nepal Police Force', 'Police Nepal', 'Lone'],
+        {'Nepal Police', 'Army'},
+        'prompt',
+        llm,
+    )
+    assert resolved == {
+        'Nepal Police Force': 'Nepal Police',
+        'Police Nepal': 'Nepal Police',
+        'Lone': 'Lone',
+    }
+    # Only canonical names sharing a blocking key are sent as context,
+    # and a lone name with nothing to compare to costs no call
+    assert all('Army' not in prompt for prompt in llm.prompts)
+    assert all('Lone' not in prompt for prompt in llm.prompts)
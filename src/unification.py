@@ -0,0 +1,280 @@
+import json
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from google.genai import types
+
+from src.llm_client import default_client
+
+# Most names sent to the LLM in one unification call
+MAX_BUCKET_SIZE = 200
+# Length of the token prefixes names are blocked on
+BLOCK_PREFIX_LENGTH = 3
+
+# Word characters and Devanagari letters and signs, without the dandas
+_TOKEN = re.compile(r'[\w\u0900-\u0963\u0966-\u097F]+')
+_NUKTA = '\u093c'
+_DEVANAGARI_FOLDS = str.maketrans(
+    {
+        # Chandrabindu is written as anusvara about as often
+        '\u0901': '\u0902',
+        # Zero-width (non-)joiners only change how conjuncts are drawn
+        '\u200c': None,
+        '\u200d': None,
+        _NUKTA: None,
+        **{chr(0x0966 + d): str(d) for d in range(10)},
+    }
+)
+
+
+def normalize_name(name):
+    """
+    Name reduced to the form its spelling variants share: case-folded,
+    Latin accents and Devanagari nukta dropped, chandrabindu folded into
+    anusvara, zero-width joiners removed, Devanagari digits made ASCII,
+    and punctuation and extra whitespace dropped.
+    """
+    # NFD splits precomposed nukta letters and accented Latin letters
+    decomposed = unicodedata.normalize('NFD', name.casefold())
+    folded = ''.join(
+        char
+        for char in decomposed.translate(_DEVANAGARI_FOLDS)
+        if unicodedata.category(char) != 'Mn' or '\u0900' <= char <= '\u097f'
+    )
+    tokens = _TOKEN.findall(folded)
+    return unicodedata.normalize('NFC', ' '.join(tokens))
+
+
+def blocking_keys(name):
+    """
+    Keys of the buckets a name is compared within: the normalized prefix
+    of each of its tokens. Variants of a name usually share at least one
+    token, e.g. 'Nepal Police' and 'Police HQ'.
+    """
+    return {
+        token[:BLOCK_PREFIX_LENGTH]
+        for token in normalize_name(name).split()
+        if token
+    }
+
+
+def build_buckets(names, max_bucket_size=MAX_BUCKET_SIZE, min_size=2):
+    """
+    Group names into buckets of candidate duplicates, each at most
+    max_bucket_size names. A name appears in a bucket for each of its
+    blocking keys, so overlapping buckets link up when the results are
+    merged. Buckets smaller than min_size are dropped; by default that is
+    single names, which have nothing to be unified with.
+    """
+    blocks = defaultdict(set)
+    for name in names:
+        for key in blocking_keys(name):
+            blocks[key].add(name)
+    buckets = set()
+    # Consecutive chunks of an oversized block share one name, so that
+    # duplicates split across chunks can still be linked through it
+    stride = max(1, max_bucket_size - 1)
+    for key in sorted(blocks):
+        members = sorted(blocks[key])
+        for start in range(0, max(1, len(members) - 1), stride):
+            chunk = members[start : start + max_bucket_size]
+            if len(chunk) >= min_size:
+                buckets.add(tuple(chunk))
+    return sorted(buckets)
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+    def groups(self):
+        groups = defaultdict(list)
+        for item in self.parent:
+            groups[self.find(item)].append(item)
+        return groups.values()
+
+
+def parse_unification_response(text):
+    """The {canonical: [variants]} mapping in an LLM reply, or {}."""
+    try:
+        mapping = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(mapping, dict):
+        return {}
+    parsed = {}
+    for canonical, variants in mapping.items():
+        if isinstance(variants, str):
+            variants = [variants]
+        elif not isinstance(variants, list):
+            continue
+        parsed[canonical] = [v for v in variants if isinstance(v, str)]
+    return parsed
+
+
+def merge_partial_mappings(names, partial_mappings):
+    """
+    Merge per-bucket {canonical: [variants]} mappings into one mapping
+    over names. Names linked in any bucket end up in the same group, and
+    each group takes the canonical name proposed for most of its members.
+    Variants the LLM made up are ignored; names it left out map to
+    themselves.
+    """
+    names = set(names)
+    groups = UnionFind()
+    for name in sorted(names):
+        groups.find(name)
+    votes = defaultdict(Counter)
+    for mapping in partial_mappings:
+        for canonical, variants in mapping.items():
+            members = {v for v in variants if v in names}
+            if canonical in names:
+                members.add(canonical)
+            members = sorted(members)
+            for member in members:
+                groups.union(members[0], member)
+                votes[member][canonical] += 1
+    result = {}
+    for members in groups.groups():
+        counts = Counter()
+        for member in members:
+            counts.update(votes[member])
+        candidates = counts or Counter(members)
+        canonical = min(candidates, key=lambda c: (-candidates[c], len(c), c))
+        result.setdefault(canonical, []).extend(sorted(members))
+    return dict(sorted(result.items()))
+
+
+def build_unification_request(names, prompt_text):
+    """Keyword arguments for LLMClient.submit for one bucket."""
+    return {
+        'contents': prompt_text + '\n' + '\n'.join(names),
+        'config': types.GenerateContentConfig(
+            response_mime_type='application/json',
+            temperature=0.0,
+        ),
+    }
+
+
+def unify_names(names, prompt_text, llm=None, max_bucket_size=MAX_BUCKET_SIZE):
+    """
+    Unify a large set of names with the LLM without putting them all in
+    one prompt. Names are blocked into buckets of likely duplicates, the
+    buckets are unified by concurrent LLM calls, and the partial mappings
+    are merged with union-find. A failed call only leaves its bucket's
+    names un-merged. Returns a {canonical: [names]} mapping covering every
+    name.
+    """
+    llm = llm or default_client()
+    names = sorted(set(names))
+    buckets = build_buckets(names, max_bucket_size)
+    print(f'Unifying {len(names)} names in {len(buckets)} buckets')
+    partial_mappings = []
+    for bucket, text in llm.map(
+        buckets,
+        lambda bucket: build_unification_request(bucket, prompt_text),
+    ):
+        if isinstance(text, Exception):
+            print(f'Gemini API error: {text}')
+            continue
+        partial_mappings.append(parse_unification_response(text))
+    return merge_partial_mappings(names, partial_mappings)
+
+
+def build_resolution_request(names, candidates, prompt_text):
+    """Keyword arguments for LLMClient.submit for one bucket of new names."""
+    contents = prompt_text
+    if candidates:
+        contents += (
+            '\nThese canonical names already exist. When a new name refers '
+            'to one of them, use that existing name as the key:\n'
+            + '\n'.join(candidates)
+        )
+    contents += '\nNew names:\n' + '\n'.join(names)
+    return {
+        'contents': contents,
+        'config': types.GenerateContentConfig(
+            response_mime_type='application/json',
+            temperature=0.0,
+        ),
+    }
+
+
+def resolve_names(
+    new_names,
+    canonicals,
+    prompt_text,
+    llm=None,
+    max_bucket_size=MAX_BUCKET_SIZE,
+):
+    """
+    Resolve names that are not in the alias registry yet against the
+    existing canonical names. New names are blocked into buckets as in
+    unify_names, and each bucket is sent with the existing canonical names
+    that share a blocking key with it. A new name linked to an existing
+    canonical name takes that name; new names linked only to each other
+    are unified among themselves. Existing canonical names are never
+    merged with each other. Returns {new name: canonical}.
+    """
+    new_names = sorted(set(new_names))
+    canonicals = set(canonicals)
+    by_key = defaultdict(set)
+    for canonical in canonicals:
+        for key in blocking_keys(canonical):
+            by_key[key].add(canonical)
+    jobs = []
+    for bucket in build_buckets(new_names, max_bucket_size, min_size=1):
+        candidates = set()
+        for name in bucket:
+            for key in blocking_keys(name):
+                candidates |= by_key.get(key, set())
+        candidates = sorted(candidates)[:max_bucket_size]
+        # A lone name with nothing to compare against resolves to itself
+        if len(bucket) > 1 or candidates:
+            jobs.append((bucket, candidates))
+    print(
+        f'Resolving {len(new_names)} new names against {len(canonicals)} '
+        f'canonical names in {len(jobs)} buckets'
+    )
+    llm = llm or default_client()
+    partial_mappings = []
+    for _, text in llm.map(
+        jobs,
+        lambda job: build_resolution_request(job[0], job[1], prompt_text),
+    ):
+        if isinstance(text, Exception):
+            print(f'Gemini API error: {text}')
+            continue
+        partial_mappings.append(parse_unification_response(text))
+
+    linked = {name for job in jobs for name in job[1]}
+    merged = merge_partial_mappings(set(new_names) | linked, partial_mappings)
+    resolved = {}
+    for canonical, members in merged.items():
+        existing = sorted(m for m in members if m in canonicals)
+        if canonical in canonicals:
+            target = canonical
+        elif existing:
+            target = existing[0]
+        else:
+            target = canonical
+        for member in members:
+            if member not in canonicals:
+                resolved[member] = target
+    return resolved